@@ -0,0 +1,105 @@
+"""
+Admission Control
+Reject requests up front when their expected queue wait would outlive their deadline
+"""
+
+import math
+import os
+import time
+from typing import Optional
+import structlog
+from prometheus_client import Counter, Histogram
+
+from request_scheduler import RequestPriority, WeightedFairScheduler
+
+logger = structlog.get_logger()
+
+ADMISSION_ESTIMATED_WAIT = Histogram(
+    'admission_estimated_wait_seconds', 'Estimated queue wait at admission', ['priority']
+)
+ADMISSION_REJECTIONS = Counter(
+    'admission_rejections_total', 'Requests shed at admission', ['priority', 'reason']
+)
+
+DEADLINE_HEADER = "X-Request-Deadline"
+
+class AdmissionRejected(Exception):
+    """Raised when a request cannot finish before its deadline"""
+
+    def __init__(self, reason: str, estimated_wait: float, retry_after: float):
+        super().__init__(f"Request rejected at admission: {reason}")
+        self.reason = reason
+        self.estimated_wait = estimated_wait
+        self.retry_after = retry_after
+
+    @property
+    def retry_after_header(self) -> str:
+        return str(max(1, math.ceil(self.retry_after)))
+
+def parse_deadline(header_value: Optional[str], default_budget: float) -> float:
+    """
+    X-Request-Deadline as a time.monotonic() deadline
+    The header is Unix time in seconds (fractions allowed); values below 1e9 are
+    taken as a relative budget in seconds. Missing or malformed means the default budget.
+    """
+    now = time.monotonic()
+    if header_value:
+        try:
+            value = float(header_value)
+        except ValueError:
+            value = None
+        if value is not None and math.isfinite(value):
+            if value < 1e9:
+                return now + value
+            return now + (value - time.time())
+    return now + default_budget
+
+class AdmissionController:
+    """
+    Queue-wait estimate from the scheduler's backlog and observed provider latency
+    - wait ~= requests ahead * service time / dispatch slots, plus the worst
+      provider-level queue when providers are saturated
+    - A request is admitted only if wait + service time fits in its remaining budget
+    """
+
+    def __init__(self, scheduler: WeightedFairScheduler, llm_client=None,
+                 default_budget: Optional[float] = None, initial_service_time: float = 2.0):
+        self.scheduler = scheduler
+        self.llm_client = llm_client
+        self.default_budget = default_budget or float(os.getenv("ADMISSION_DEFAULT_DEADLINE_SECONDS", "60"))
+        self.service_time = initial_service_time  # EWMA of provider call duration
+
+    def observe_service_time(self, seconds: float):
+        self.service_time = 0.8 * self.service_time + 0.2 * seconds
+
+    def _provider_wait(self) -> float:
+        if self.llm_client is None:
+            return 0.0
+        wait = 0.0
+        for limiter in self.llm_client.concurrency_limiters.values():
+            if limiter.waiters:
+                rtt = limiter.smoothed_rtt or self.service_time
+                wait = max(wait, len(limiter.waiters) * rtt / limiter.current_limit)
+        return wait
+
+    def estimated_wait(self, priority: RequestPriority) -> float:
+        ahead = self.scheduler.requests_ahead(priority)
+        scheduler_wait = ahead * self.service_time / self.scheduler.max_concurrency
+        return scheduler_wait + self._provider_wait()
+
+    def admit(self, priority: RequestPriority, deadline: float) -> float:
+        """Return the estimated wait, or raise AdmissionRejected"""
+        remaining = deadline - time.monotonic()
+        if remaining <= 0:
+            ADMISSION_REJECTIONS.labels(priority=priority.value, reason="deadline_expired").inc()
+            raise AdmissionRejected("deadline_expired", 0.0, 1.0)
+
+        wait = self.estimated_wait(priority)
+        ADMISSION_ESTIMATED_WAIT.labels(priority=priority.value).observe(wait)
+        if wait + self.service_time > remaining:
+            ADMISSION_REJECTIONS.labels(priority=priority.value, reason="queue_wait").inc()
+            logger.info("Shedding request at admission", priority=priority.value,
+                        estimated_wait=round(wait, 3), remaining=round(remaining, 3))
+            # By then the backlog ahead of a retry should have drained
+            raise AdmissionRejected("queue_wait", wait, wait)
+        return wait
@@ -0,0 +1,57 @@
+"""
+Bulk learning ingestion microbenchmarks: record validation and batch loading
+"""
+
+import time
+
+import pytest
+
+from learning_ingestion import LearningIngestor, validate_record
+from self_learning import BACKFILL_INTERACTIONS_KEY, SelfLearningEngine
+from serialization import dumps_json
+from vibecoding_core import VibeCodingCore
+
+def _chat_path_interaction(index: int) -> dict:
+    # Built the way record_vibecoding_interaction in main builds it
+    return {
+        "request_id": f"req-{index:08d}",
+        "timestamp": time.time(),
+        "prompt_analysis": {"length": 120, "complexity": 24, "vibecoding_emphasis": "balanced"},
+        "response_analysis": {"length": 800, "processing_time": 0.42, "filtered": False},
+        "vibecoding_scores": {"overall_vibecoding_score": 0.87},
+        "learning_mode": True,
+        "improvements": ["timing"]
+    }
+
+@pytest.fixture(scope="module")
+def learning_engine(fake_redis):
+    return SelfLearningEngine(redis_client=fake_redis, vibecoding_core=VibeCodingCore())
+
+def test_validate_chat_path_interaction(benchmark):
+    record = _chat_path_interaction(0)
+    assert benchmark(validate_record, record) is None
+
+@pytest.mark.parametrize("batch_size", [1, 500])
+def test_load_batch(benchmark, event_loop_runner, fake_redis, learning_engine, batch_size):
+    ingestor = LearningIngestor(fake_redis, learning_engine, batch_size=batch_size)
+    lines = [dumps_json(_chat_path_interaction(index)) + b"\n" for index in range(batch_size)]
+    lines.append(dumps_json({"category": "trading_wisdom", "content": "Cut losers early"}) + b"\n")
+
+    def load():
+        state = {"lines": 0, "accepted": 0, "rejected": 0, "dropped": 0}
+        event_loop_runner(ingestor._load_batch(lines, state, []))
+        return state
+
+    state = benchmark(load)
+    assert state["rejected"] == 0
+    assert state["accepted"] == batch_size + 1
+
+def test_learning_cycle_reads_backfill(event_loop_runner, fake_redis, learning_engine):
+    event_loop_runner(fake_redis.delete(BACKFILL_INTERACTIONS_KEY))
+    kept = event_loop_runner(learning_engine.ingest_interactions(
+        [_chat_path_interaction(index) for index in range(20)]
+    ))
+    assert kept == 20
+
+    interactions = event_loop_runner(learning_engine._get_recent_interactions())
+    assert [item["request_id"] for item in interactions[-20:]] == [f"req-{index:08d}" for index in range(20)]
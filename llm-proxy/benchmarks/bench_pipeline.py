@@ -0,0 +1,36 @@
+"""
+Per-request pipeline microbenchmarks: content filtering and wisdom scoring
+"""
+
+import pytest
+
+from content_filter import ContentFilter
+from corpus import PROMPT_SIZES, PROMPTS, RESPONSES
+from vibecoding_core import VibeCodingCore
+
+@pytest.fixture(scope="module")
+def vibecoding_core():
+    return VibeCodingCore()
+
+@pytest.fixture(scope="module")
+def content_filter(vibecoding_core):
+    return ContentFilter(vibecoding_core=vibecoding_core)
+
+@pytest.mark.parametrize("size", PROMPT_SIZES)
+def test_filter_input(benchmark, event_loop_runner, content_filter, size):
+    prompt = PROMPTS[size]
+    result = benchmark(lambda: event_loop_runner(content_filter.filter_input(prompt)))
+    assert result is not None
+
+@pytest.mark.parametrize("size", PROMPT_SIZES)
+def test_filter_output(benchmark, event_loop_runner, content_filter, size):
+    response = RESPONSES[size]
+    result = benchmark(lambda: event_loop_runner(content_filter.filter_output(response)))
+    assert result is not None
+
+@pytest.mark.parametrize("size", PROMPT_SIZES)
+def test_assess_response_wisdom(benchmark, event_loop_runner, vibecoding_core, size):
+    prompt = PROMPTS[min(size, 10_000)]
+    response = RESPONSES[size]
+    result = benchmark(lambda: event_loop_runner(vibecoding_core.assess_response_wisdom(response, prompt)))
+    assert result is not None
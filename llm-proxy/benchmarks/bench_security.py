@@ -0,0 +1,130 @@
+"""
+Security hot-path microbenchmarks: threat analysis, encryption and request IDs
+"""
+
+import hashlib
+import itertools
+import secrets
+import time
+
+import pytest
+
+from corpus import PROMPT_SIZES, PROMPTS
+from ip_reputation import IP_REPUTATION_LOOKUPS, IPReputationStore
+from key_management import KeyManager
+from quantum_security import QuantumSecurityManager
+from security import SecurityManager
+
+@pytest.fixture(scope="module")
+def quantum_security(fake_redis, tmp_path_factory):
+    # RSA-4096 key generation happens here, once, outside the measured code;
+    # the keystore lives in a temporary directory, not the working tree
+    key_manager = KeyManager(
+        "llm_proxy",
+        keystore_path=str(tmp_path_factory.mktemp("keys") / "llm_proxy_keystore.json"),
+        root_secret=secrets.token_bytes(32)
+    ).load()
+    return QuantumSecurityManager(fake_redis, key_manager=key_manager)
+
+@pytest.fixture(scope="module")
+def security_manager():
+    return SecurityManager()
+
+def _request_data(prompt: str, client_ip: str = "10.0.0.8") -> dict:
+    return {
+        "prompt": prompt,
+        "model": "claude-sonnet-4-20250514",
+        "client_ip": client_ip,
+        "headers": {"user-agent": "trading-agent/2.1"}
+    }
+
+def _client_ips():
+    # A fresh client per round keeps every IP under the hourly behavior budget
+    for index in itertools.count(1):
+        yield f"10.{index >> 16 & 255}.{index >> 8 & 255}.{index & 255}"
+
+@pytest.mark.parametrize("size", PROMPT_SIZES)
+def test_analyze_request_security_uncached(benchmark, event_loop_runner, quantum_security, size):
+    # A unique prefix per round defeats the fingerprint cache so every layer runs
+    counter = itertools.count()
+    client_ips = _client_ips()
+
+    def setup():
+        return (_request_data(f"{next(counter):08d} {PROMPTS[size]}", next(client_ips)),), {}
+
+    result = benchmark.pedantic(
+        lambda data: event_loop_runner(quantum_security.analyze_request_security(data)),
+        setup=setup, rounds=200, warmup_rounds=5
+    )
+    assert result.threat_type == "clean"
+
+@pytest.mark.parametrize("size", PROMPT_SIZES)
+def test_analyze_request_security_cached(benchmark, event_loop_runner, quantum_security, size):
+    data = _request_data(PROMPTS[size])
+    event_loop_runner(quantum_security.analyze_request_security(data))
+    client_ips = _client_ips()
+
+    def analyze():
+        data["client_ip"] = next(client_ips)
+        return event_loop_runner(quantum_security.analyze_request_security(data))
+
+    result = benchmark(analyze)
+    assert result.threat_type == "clean"
+
+def test_analyze_request_security_known_bad_ip(benchmark, event_loop_runner, quantum_security):
+    # Recording goes through the reputation Lua script, so this fails if Lua can't run
+    event_loop_runner(quantum_security.ip_reputation.record("203.0.113.9", 1.0))
+    data = _request_data(PROMPTS[1_000], client_ip="203.0.113.9")
+    result = benchmark(lambda: event_loop_runner(quantum_security.analyze_request_security(data)))
+    assert result.threat_type == "known_bad_ip"
+
+@pytest.mark.parametrize("size", PROMPT_SIZES)
+def test_apply_quantum_encryption(benchmark, event_loop_runner, quantum_security, size):
+    payload = PROMPTS[size]
+    encrypted, _ = benchmark(lambda: event_loop_runner(quantum_security.apply_quantum_encryption(payload)))
+    assert encrypted != payload
+
+def _legacy_request_id(counter=itertools.count()) -> str:
+    # The SHA-256 based generator the time-ordered IDs replaced, kept for comparison
+    id_string = f"{int(time.time() * 1000)}_{next(counter)}_{secrets.token_hex(8)}"
+    return hashlib.sha256(id_string.encode()).hexdigest()[:16]
+
+def test_generate_request_id(benchmark, security_manager):
+    request_id = benchmark(security_manager.generate_request_id)
+    assert request_id
+
+def test_generate_request_id_legacy(benchmark):
+    request_id = benchmark(_legacy_request_id)
+    assert request_id
+
+@pytest.mark.parametrize("batch_size", [1, 64, 1024])
+def test_encrypt_records_batch(benchmark, quantum_security, batch_size):
+    records = [PROMPTS[1_000].encode()] * batch_size
+    envelopes = benchmark(quantum_security.encrypt_records, records)
+    assert quantum_security.decrypt_records(envelopes[:1]) == records[:1]
+
+@pytest.mark.parametrize("batch_size", [1, 256])
+def test_verify_signature_batch(benchmark, quantum_security, batch_size):
+    trades = [{"symbol": "SOL", "side": "buy", "size": 1.5 + index, "meta": {"route": ["jup", "orca"]}}
+              for index in range(batch_size)]
+    signed = list(zip(trades, quantum_security.request_signer.sign_batch(trades)))
+    verdicts = benchmark(quantum_security.request_signer.verify_batch, signed)
+    assert all(verdicts)
+
+class _NoRedisReads:
+    """Stands in for the client after sync: any score read would be a network call"""
+
+    async def get(self, key):
+        raise AssertionError(f"Redis read for {key} after sync")
+
+def test_ip_reputation_score_synced(benchmark, event_loop_runner, fake_redis):
+    store = IPReputationStore(fake_redis)
+    event_loop_runner(store.sync())
+    assert store.synced
+    store.redis_client = _NoRedisReads()
+
+    filter_hits = IP_REPUTATION_LOOKUPS.labels(path="filter")
+    before = filter_hits._value.get()
+    score = benchmark(lambda: event_loop_runner(store.score("10.0.0.8")))
+    assert score == 0.0
+    assert filter_hits._value.get() > before
@@ -0,0 +1,25 @@
+"""
+Shared fixtures for the microbenchmarks
+The proxy modules use flat imports, so llm-proxy/ is put on the path here
+"""
+
+import asyncio
+import sys
+from pathlib import Path
+
+import pytest
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+sys.path.insert(0, str(Path(__file__).resolve().parent))
+
+@pytest.fixture(scope="session")
+def event_loop_runner():
+    """Run coroutines to completion on one loop so loop setup isn't measured"""
+    loop = asyncio.new_event_loop()
+    yield loop.run_until_complete
+    loop.close()
+
+@pytest.fixture(scope="session")
+def fake_redis():
+    from fakeredis import aioredis as fake_aioredis
+    return fake_aioredis.FakeRedis()
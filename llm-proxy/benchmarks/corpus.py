@@ -0,0 +1,62 @@
+"""
+Benchmark Prompt Corpus
+Deterministic prompts and responses shaped like real proxy traffic, from 100 to 50k characters
+"""
+
+import random
+from typing import Dict
+
+PROMPT_SIZES = [100, 1_000, 10_000, 50_000]
+
+_PROMPT_SENTENCES = [
+    "Analyze the recent price action of SOL against USDC on the four hour chart.",
+    "Summarize the key risks in this liquidity pool before we add another position.",
+    "What does the funding rate divergence between Binance and Bybit suggest about positioning?",
+    "Review the following strategy notes and point out anything that looks overfit.",
+    "The order book shows thin bids below the previous weekly low, so slippage could spike.",
+    "Explain how impermanent loss changes if volatility doubles over the next month.",
+    "Our backtest returned a Sharpe of 1.8 but the drawdown clustered in low volume sessions.",
+    "Please compare Raydium and Orca routing for a 250k swap with a 0.5 percent tolerance.",
+    "Draft a short update for the community channel about the validator upgrade schedule.",
+    "Consider the governance proposal text below and list the parameters it would change.",
+]
+
+_CODE_SNIPPET = (
+    "def rebalance(positions, target_weights):\n"
+    "    total = sum(p.value for p in positions)\n"
+    "    return {p.symbol: target_weights[p.symbol] * total - p.value for p in positions}\n"
+)
+
+_RESPONSE_SENTENCES = [
+    "Based on the data you shared, momentum has slowed while volume stayed flat.",
+    "I would be careful with sizing here because liquidity thins out quickly below support.",
+    "It is worth considering that the funding skew often mean-reverts within a few sessions.",
+    "The strategy looks reasonable, but the parameters were tuned on a single market regime.",
+    "Thank you for the context; here is a balanced view of the trade-offs involved.",
+    "Historically, similar setups resolved upward about half the time, so conviction should stay modest.",
+]
+
+def _build(sentences, length: int, seed: int, code_every: int = 0) -> str:
+    rng = random.Random(seed)
+    parts = []
+    size = 0
+    count = 0
+    while size < length:
+        count += 1
+        if code_every and count % code_every == 0:
+            part = _CODE_SNIPPET
+        else:
+            part = rng.choice(sentences)
+        parts.append(part)
+        size += len(part) + 1
+    return " ".join(parts)[:length]
+
+def build_prompt(length: int, seed: int = 0) -> str:
+    """A prompt of exactly `length` characters mixing prose and the odd code block"""
+    return _build(_PROMPT_SENTENCES, length, seed, code_every=12)
+
+def build_response(length: int, seed: int = 0) -> str:
+    return _build(_RESPONSE_SENTENCES, length, seed)
+
+PROMPTS: Dict[int, str] = {size: build_prompt(size) for size in PROMPT_SIZES}
+RESPONSES: Dict[int, str] = {size: build_response(size) for size in PROMPT_SIZES}
@@ -0,0 +1,278 @@
+"""
+llm-proxy Load Test
+Drives the real FastAPI app in-process against the mock provider and records
+throughput, latency percentiles and CPU per request for each concurrency level
+
+Usage (from llm-proxy/):
+    python benchmarks/load_test.py --concurrency 1,8,32,128 --requests 500
+    python benchmarks/load_test.py --latency-ms 800 --error-rate 0.05 --compare benchmarks/results/baseline.json
+
+Requests go through httpx's ASGI transport, so there is no socket between the
+client and the proxy; the mock provider runs in its own process so its CPU is
+not counted. Redis is fakeredis unless --redis-url is given.
+"""
+
+import argparse
+import asyncio
+import json
+import multiprocessing
+import os
+import platform
+import socket
+import subprocess
+import sys
+import time
+from collections import Counter
+from datetime import datetime, timezone
+from pathlib import Path
+from typing import Any, Dict, List, Optional
+
+PROXY_DIR = Path(__file__).resolve().parent.parent
+sys.path.insert(0, str(PROXY_DIR))
+
+import httpx
+
+from mock_provider import MockProviderConfig, serve
+
+API_KEY = "load-test-key"
+RESULTS_DIR = Path(__file__).resolve().parent / "results"
+
+def percentile(sorted_values: List[float], pct: float) -> float:
+    """Linear-interpolated percentile of an already sorted list"""
+    if not sorted_values:
+        return 0.0
+    rank = (len(sorted_values) - 1) * pct / 100.0
+    lower = int(rank)
+    upper = min(lower + 1, len(sorted_values) - 1)
+    return sorted_values[lower] + (sorted_values[upper] - sorted_values[lower]) * (rank - lower)
+
+def free_port() -> int:
+    with socket.socket(socket.AF_INET, socket.SOCK_STREAM) as sock:
+        sock.bind(("127.0.0.1", 0))
+        return sock.getsockname()[1]
+
+def git_commit() -> Optional[str]:
+    try:
+        return subprocess.check_output(
+            ["git", "rev-parse", "--short", "HEAD"], cwd=PROXY_DIR, stderr=subprocess.DEVNULL
+        ).decode().strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+def start_mock_provider(config: MockProviderConfig, port: int) -> multiprocessing.Process:
+    process = multiprocessing.get_context("spawn").Process(
+        target=serve, args=(config, "127.0.0.1", port), daemon=True
+    )
+    process.start()
+
+    deadline = time.time() + 15
+    while time.time() < deadline:
+        try:
+            httpx.get(f"http://127.0.0.1:{port}/stats", timeout=0.5)
+            return process
+        except httpx.HTTPError:
+            time.sleep(0.1)
+    process.terminate()
+    raise RuntimeError("Mock provider did not start")
+
+def configure_environment(mock_url: str, redis_url: Optional[str]):
+    """Point every provider at the mock before the proxy reads its configuration"""
+    os.environ["ANTHROPIC_BASE_URL"] = f"{mock_url}/v1"
+    os.environ["OPENAI_BASE_URL"] = f"{mock_url}/v1"
+    os.environ["IO_INTELLIGENCE_BASE_URL"] = f"{mock_url}/v1"
+    os.environ["ANTHROPIC_API_KEY"] = "mock"
+    os.environ["OPENAI_API_KEY"] = "mock"
+    os.environ["IO_INTELLIGENCE_API_KEY"] = "mock"
+    os.environ["LLM_PROXY_API_KEY"] = API_KEY
+    os.environ["SECURITY_RATE_LIMIT"] = "0"  # Every simulated client shares one address
+    if redis_url:
+        os.environ["REDIS_URL"] = redis_url
+        return
+
+    # All proxy clients share one in-memory server, as they would share a real Redis;
+    # the proxy's client class is kept so pipelining and command metrics stay in the path
+    from fakeredis import FakeServer, aioredis as fake_aioredis
+    import redis_access
+
+    server = FakeServer()
+
+    def create_fake_client(url=None, decode_responses=False, auto_pipeline=None, **kwargs):
+        fake = fake_aioredis.FakeRedis(server=server, decode_responses=decode_responses)
+        return redis_access.InstrumentedRedis(
+            connection_pool=fake.connection_pool,
+            auto_pipeline=os.getenv("REDIS_AUTO_PIPELINE", "1") == "1" if auto_pipeline is None else auto_pipeline
+        )
+
+    redis_access.create_redis_client = create_fake_client
+
+async def run_level(client: httpx.AsyncClient, mock_client: httpx.AsyncClient,
+                    concurrency: int, total_requests: int, payload: Dict[str, Any]) -> Dict[str, Any]:
+    latencies: List[float] = []
+    statuses: Counter = Counter()
+    issued = 0
+
+    async def worker():
+        nonlocal issued
+        while issued < total_requests:
+            issued += 1
+            started = time.perf_counter()
+            try:
+                response = await client.post(
+                    "/v1/chat/completions", json=payload,
+                    headers={"Authorization": f"Bearer {API_KEY}"}
+                )
+                statuses[str(response.status_code)] += 1
+            except httpx.HTTPError as e:
+                statuses[type(e).__name__] += 1
+            latencies.append(time.perf_counter() - started)
+
+    await mock_client.post("/stats/reset")
+    cpu_start = time.process_time()
+    wall_start = time.perf_counter()
+    await asyncio.gather(*(worker() for _ in range(concurrency)))
+    wall_seconds = time.perf_counter() - wall_start
+    cpu_seconds = time.process_time() - cpu_start
+    provider_stats = (await mock_client.get("/stats")).json()
+
+    latencies.sort()
+    completed = len(latencies)
+    return {
+        "concurrency": concurrency,
+        "requests": completed,
+        "wall_seconds": round(wall_seconds, 3),
+        "rps": round(completed / wall_seconds, 2) if wall_seconds else 0.0,
+        "latency_ms": {
+            "mean": round(sum(latencies) / completed * 1000, 2) if completed else 0.0,
+            "p50": round(percentile(latencies, 50) * 1000, 2),
+            "p90": round(percentile(latencies, 90) * 1000, 2),
+            "p99": round(percentile(latencies, 99) * 1000, 2),
+            "max": round(latencies[-1] * 1000, 2) if latencies else 0.0
+        },
+        "cpu_ms_per_request": round(cpu_seconds / completed * 1000, 3) if completed else 0.0,
+        "statuses": dict(statuses),
+        "provider_requests": provider_stats["requests"],
+        "provider_errors": provider_stats["errors"]
+    }
+
+async def run_load_test(args: argparse.Namespace, mock_url: str) -> List[Dict[str, Any]]:
+    # Imported only now: the proxy reads provider and Redis configuration at import and startup
+    import main as proxy
+
+    proxy.limiter.enabled = False  # The per-IP abuse limit would cap the run at 100 requests
+
+    payload = {
+        "prompt": args.prompt,
+        "model": args.model,
+        "max_tokens": args.max_tokens,
+        "task_type": args.task_type,
+        "learning_mode": not args.no_learning
+    }
+    levels = [int(level) for level in args.concurrency.split(",")]
+    results = []
+
+    async with proxy.app.router.lifespan_context(proxy.app):
+        transport = httpx.ASGITransport(app=proxy.app)
+        async with httpx.AsyncClient(transport=transport, base_url="http://llm-proxy",
+                                     timeout=args.timeout) as client, \
+                httpx.AsyncClient(base_url=mock_url) as mock_client:
+            if args.warmup:
+                await run_level(client, mock_client, min(levels), args.warmup, payload)
+
+            for concurrency in levels:
+                result = await run_level(client, mock_client, concurrency, args.requests, payload)
+                results.append(result)
+                print(
+                    f"c={concurrency:<5} rps={result['rps']:<9} p50={result['latency_ms']['p50']:<9} "
+                    f"p99={result['latency_ms']['p99']:<9} cpu/req={result['cpu_ms_per_request']}ms "
+                    f"statuses={result['statuses']}"
+                )
+    return results
+
+def print_comparison(results: List[Dict[str, Any]], baseline_path: Path):
+    baseline = json.loads(baseline_path.read_text())
+    baseline_levels = {level["concurrency"]: level for level in baseline.get("levels", [])}
+    print(f"\nCompared with {baseline_path} (commit {baseline.get('git_commit')}):")
+    for result in results:
+        previous = baseline_levels.get(result["concurrency"])
+        if previous is None:
+            continue
+
+        def change(current: float, before: float) -> str:
+            return f"{(current - before) / before * 100:+.1f}%" if before else "n/a"
+
+        print(
+            f"c={result['concurrency']:<5} "
+            f"rps {change(result['rps'], previous['rps'])}  "
+            f"p50 {change(result['latency_ms']['p50'], previous['latency_ms']['p50'])}  "
+            f"p99 {change(result['latency_ms']['p99'], previous['latency_ms']['p99'])}  "
+            f"cpu/req {change(result['cpu_ms_per_request'], previous['cpu_ms_per_request'])}"
+        )
+
+def parse_args() -> argparse.Namespace:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--concurrency", default="1,8,32,128", help="comma-separated concurrency levels")
+    parser.add_argument("--requests", type=int, default=500, help="requests per concurrency level")
+    parser.add_argument("--warmup", type=int, default=20, help="unmeasured requests before the first level")
+    parser.add_argument("--timeout", type=float, default=60.0)
+    parser.add_argument("--model", default="claude-sonnet-4-20250514")
+    parser.add_argument("--task-type", default="general_chat")
+    parser.add_argument("--max-tokens", type=int, default=256)
+    parser.add_argument("--prompt", default="Summarize the current market sentiment for SOL in two short sentences")
+    parser.add_argument("--no-learning", action="store_true", help="send learning_mode=false")
+    parser.add_argument("--latency-distribution", default="lognormal",
+                        choices=["fixed", "uniform", "exponential", "lognormal"])
+    parser.add_argument("--latency-ms", type=float, default=300.0, help="mean mock provider latency")
+    parser.add_argument("--latency-spread", type=float, default=0.5)
+    parser.add_argument("--error-rate", type=float, default=0.0)
+    parser.add_argument("--error-status", type=int, default=529)
+    parser.add_argument("--completion-tokens", type=int, default=120)
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--redis-url", help="use a real Redis instead of fakeredis")
+    parser.add_argument("--output", type=Path, help="results file (default: benchmarks/results/<timestamp>.json)")
+    parser.add_argument("--compare", type=Path, help="earlier results file to compare against")
+    return parser.parse_args()
+
+def main():
+    args = parse_args()
+    mock_config = MockProviderConfig(
+        latency_distribution=args.latency_distribution,
+        latency_ms=args.latency_ms,
+        latency_spread=args.latency_spread,
+        error_rate=args.error_rate,
+        error_status=args.error_status,
+        completion_tokens=args.completion_tokens,
+        seed=args.seed
+    )
+    port = free_port()
+    mock_url = f"http://127.0.0.1:{port}"
+    mock_process = start_mock_provider(mock_config, port)
+
+    try:
+        configure_environment(mock_url, args.redis_url)
+        results = asyncio.run(run_load_test(args, mock_url))
+    finally:
+        mock_process.terminate()
+        mock_process.join(timeout=5)
+
+    started = datetime.now(timezone.utc)
+    report = {
+        "timestamp": started.isoformat(),
+        "git_commit": git_commit(),
+        "python": platform.python_version(),
+        "platform": platform.platform(),
+        "cpu_count": os.cpu_count(),
+        "redis": "real" if args.redis_url else "fakeredis",
+        "settings": {key: str(value) if isinstance(value, Path) else value for key, value in vars(args).items()},
+        "levels": results
+    }
+
+    output = args.output or RESULTS_DIR / f"load_test_{started.strftime('%Y%m%d-%H%M%S')}.json"
+    output.parent.mkdir(parents=True, exist_ok=True)
+    output.write_text(json.dumps(report, indent=2))
+    print(f"\nResults written to {output}")
+
+    if args.compare:
+        print_comparison(results, args.compare)
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,138 @@
+"""
+Mock LLM Provider
+Anthropic- and OpenAI-compatible completion endpoints with configurable latency and errors
+"""
+
+import asyncio
+import random
+import time
+from dataclasses import dataclass, asdict
+from typing import Any, Dict
+
+from fastapi import FastAPI, Request
+from fastapi.responses import JSONResponse
+
+@dataclass
+class MockProviderConfig:
+    """Latency distribution and failure injection for the mock provider"""
+    latency_distribution: str = "lognormal"  # fixed|uniform|exponential|lognormal
+    latency_ms: float = 300.0  # mean latency
+    latency_spread: float = 0.5  # uniform: +/- fraction of mean, lognormal: sigma
+    error_rate: float = 0.0
+    error_status: int = 529
+    completion_tokens: int = 120
+    seed: int = 0
+
+class MockProvider:
+    """Draws latencies and errors and keeps counters the harness reads back"""
+
+    def __init__(self, config: MockProviderConfig):
+        self.config = config
+        self.random = random.Random(config.seed)
+        self.reset()
+
+    def reset(self):
+        self.requests = 0
+        self.errors = 0
+        self.started_at = time.time()
+
+    def sample_latency(self) -> float:
+        mean = self.config.latency_ms / 1000.0
+        distribution = self.config.latency_distribution
+        if distribution == "fixed":
+            return mean
+        if distribution == "uniform":
+            spread = mean * self.config.latency_spread
+            return max(0.0, self.random.uniform(mean - spread, mean + spread))
+        if distribution == "exponential":
+            return self.random.expovariate(1.0 / mean) if mean > 0 else 0.0
+        if distribution == "lognormal":
+            # Parameterised so the mean matches latency_ms; gives the long tail real providers have
+            sigma = self.config.latency_spread
+            mu = -0.5 * sigma * sigma
+            return mean * self.random.lognormvariate(mu, sigma)
+        raise ValueError(f"Unknown latency distribution: {distribution}")
+
+    async def respond(self) -> bool:
+        """Wait out the sampled latency; returns False when this call should fail"""
+        self.requests += 1
+        await asyncio.sleep(self.sample_latency())
+        if self.random.random() < self.config.error_rate:
+            self.errors += 1
+            return False
+        return True
+
+    def stats(self) -> Dict[str, Any]:
+        return {
+            "requests": self.requests,
+            "errors": self.errors,
+            "elapsed_seconds": time.time() - self.started_at,
+            "config": asdict(self.config)
+        }
+
+def _completion_text(tokens: int) -> str:
+    return " ".join(["mock"] * tokens)
+
+def create_mock_provider_app(config: MockProviderConfig) -> FastAPI:
+    provider = MockProvider(config)
+    app = FastAPI(title="Mock LLM Provider")
+
+    def error_response() -> JSONResponse:
+        return JSONResponse(
+            status_code=config.error_status,
+            content={"error": {"type": "overloaded_error", "message": "Injected mock failure"}}
+        )
+
+    @app.post("/v1/messages")
+    async def anthropic_messages(request: Request):
+        body = await request.json()
+        if not await provider.respond():
+            return error_response()
+        prompt_tokens = sum(len(str(m.get("content", "")).split()) for m in body.get("messages", []))
+        return {
+            "id": f"msg_mock_{provider.requests}",
+            "type": "message",
+            "role": "assistant",
+            "model": body.get("model"),
+            "content": [{"type": "text", "text": _completion_text(config.completion_tokens)}],
+            "stop_reason": "end_turn",
+            "usage": {"input_tokens": prompt_tokens, "output_tokens": config.completion_tokens}
+        }
+
+    @app.post("/v1/chat/completions")
+    async def openai_chat_completions(request: Request):
+        body = await request.json()
+        if not await provider.respond():
+            return error_response()
+        prompt_tokens = sum(len(str(m.get("content", "")).split()) for m in body.get("messages", []))
+        return {
+            "id": f"chatcmpl-mock-{provider.requests}",
+            "object": "chat.completion",
+            "model": body.get("model"),
+            "choices": [{
+                "index": 0,
+                "message": {"role": "assistant", "content": _completion_text(config.completion_tokens)},
+                "finish_reason": "stop"
+            }],
+            "usage": {
+                "prompt_tokens": prompt_tokens,
+                "completion_tokens": config.completion_tokens,
+                "total_tokens": prompt_tokens + config.completion_tokens
+            }
+        }
+
+    @app.get("/stats")
+    async def stats():
+        return provider.stats()
+
+    @app.post("/stats/reset")
+    async def reset_stats():
+        provider.reset()
+        return {"reset": True}
+
+    return app
+
+def serve(config: MockProviderConfig, host: str, port: int):
+    """Process entry point so the mock's CPU never counts against the proxy"""
+    import uvicorn
+    uvicorn.run(create_mock_provider_app(config), host=host, port=port, log_level="warning")
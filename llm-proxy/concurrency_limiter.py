@@ -0,0 +1,224 @@
+"""
+Adaptive Concurrency Limiter
+Per-provider in-flight limits that grow while latency holds and back off on congestion
+"""
+
+import asyncio
+import time
+from collections import deque
+from contextlib import asynccontextmanager
+from typing import Deque, Dict, Optional
+import structlog
+from prometheus_client import Counter, Gauge, Histogram
+
+logger = structlog.get_logger()
+
+CONCURRENCY_LIMIT = Gauge('provider_concurrency_limit', 'Current adaptive concurrency limit', ['provider'])
+IN_FLIGHT = Gauge('provider_in_flight_requests', 'Requests currently in flight', ['provider'])
+QUEUED = Gauge('provider_queued_requests', 'Requests waiting for a concurrency slot', ['provider'])
+QUEUE_WAIT = Histogram('provider_queue_wait_seconds', 'Time spent waiting for a concurrency slot', ['provider'])
+LIMIT_REJECTIONS = Counter('provider_limit_rejections_total', 'Requests rejected after queue deadline', ['provider'])
+
+class ConcurrencyLimitExceeded(Exception):
+    """Raised when no concurrency slot frees up before the caller's deadline"""
+
+    def __init__(self, provider: str, limit: int, queued: int):
+        super().__init__(f"{provider} concurrency limit {limit} reached with {queued} queued")
+        self.provider = provider
+        self.limit = limit
+        self.queued = queued
+
+class LimiterSlot:
+    """Handle for one admitted request; records how the request went"""
+
+    def __init__(self, limiter: "AdaptiveConcurrencyLimiter"):
+        self.limiter = limiter
+        self.start_time = time.monotonic()
+        self.outcome: Optional[str] = None
+        self.output_tokens: Optional[int] = None
+
+    def success(self, output_tokens: Optional[int] = None):
+        """output_tokens lets the latency gradient compare requests of different lengths"""
+        self.outcome = "success"
+        self.output_tokens = output_tokens
+
+    def dropped(self):
+        """Upstream signalled congestion (429, 5xx, timeout)"""
+        self.outcome = "dropped"
+
+    def ignore(self):
+        """Failure unrelated to capacity, e.g. a malformed request"""
+        self.outcome = "ignore"
+
+class AdaptiveConcurrencyLimiter:
+    """
+    AIMD concurrency limiter with Vegas-style latency gradient
+    - The gradient compares per-output-token latency, since raw RTT mostly
+      tracks how much the model wrote; short outputs (dominated by prompt
+      processing) and requests without a token count don't move it
+    - Additive increase while that latency stays within tolerance of its no-load value
+    - Multiplicative decrease on latency inflation or dropped requests
+    - Requests over the limit wait in FIFO order until their deadline
+    """
+
+    def __init__(self, name: str, initial_limit: int = 10, min_limit: int = 1,
+                 max_limit: int = 200, latency_tolerance: float = 2.0,
+                 backoff_ratio: float = 0.9, drop_backoff_ratio: float = 0.5,
+                 default_queue_timeout: float = 10.0, min_rtt_window: float = 60.0,
+                 min_gradient_tokens: int = 32):
+        self.name = name
+        self.limit = float(initial_limit)
+        self.min_limit = min_limit
+        self.max_limit = max_limit
+        self.latency_tolerance = latency_tolerance
+        self.backoff_ratio = backoff_ratio
+        self.drop_backoff_ratio = drop_backoff_ratio
+        self.default_queue_timeout = default_queue_timeout
+        self.min_rtt_window = min_rtt_window
+        self.min_gradient_tokens = min_gradient_tokens
+
+        self.in_flight = 0
+        self.waiters: Deque[asyncio.Future] = deque()
+        self.min_rtt: Optional[float] = None
+        self.min_rtt_reset_at = time.monotonic() + min_rtt_window
+        self.smoothed_rtt: Optional[float] = None
+        self.min_token_latency: Optional[float] = None
+        self.smoothed_token_latency: Optional[float] = None
+        self.last_decrease = 0.0
+
+        CONCURRENCY_LIMIT.labels(provider=name).set(self.limit)
+
+    @property
+    def current_limit(self) -> int:
+        return max(self.min_limit, int(self.limit))
+
+    @asynccontextmanager
+    async def slot(self, deadline: Optional[float] = None):
+        """
+        Admit one request, waiting until the monotonic deadline if at capacity
+        Callers mark the slot success/dropped/ignore before leaving the block
+        """
+        await self._acquire(deadline)
+        handle = LimiterSlot(self)
+        try:
+            yield handle
+        except asyncio.CancelledError:
+            handle.ignore()
+            raise
+        finally:
+            self._release(handle)
+
+    async def _acquire(self, deadline: Optional[float]):
+        if self.in_flight < self.current_limit and not self.waiters:
+            self._admit()
+            return
+
+        if deadline is None:
+            deadline = time.monotonic() + self.default_queue_timeout
+
+        waiter = asyncio.get_running_loop().create_future()
+        self.waiters.append(waiter)
+        QUEUED.labels(provider=self.name).set(len(self.waiters))
+        queued_at = time.monotonic()
+
+        try:
+            await asyncio.wait_for(waiter, max(0.0, deadline - time.monotonic()))
+        except asyncio.TimeoutError:
+            self._return_handed_over(waiter)
+            LIMIT_REJECTIONS.labels(provider=self.name).inc()
+            raise ConcurrencyLimitExceeded(self.name, self.current_limit, len(self.waiters))
+        except asyncio.CancelledError:
+            self._return_handed_over(waiter)
+            raise
+        finally:
+            if waiter in self.waiters:
+                self.waiters.remove(waiter)
+            QUEUED.labels(provider=self.name).set(len(self.waiters))
+
+        QUEUE_WAIT.labels(provider=self.name).observe(time.monotonic() - queued_at)
+
+    def _return_handed_over(self, waiter: asyncio.Future):
+        # A slot may have been handed over just as the wait ended; pass it on
+        if waiter.done() and not waiter.cancelled():
+            self.in_flight -= 1
+            IN_FLIGHT.labels(provider=self.name).set(self.in_flight)
+            self._wake_waiters()
+
+    def _admit(self):
+        self.in_flight += 1
+        IN_FLIGHT.labels(provider=self.name).set(self.in_flight)
+
+    def _wake_waiters(self):
+        while self.waiters and self.in_flight < self.current_limit:
+            waiter = self.waiters.popleft()
+            if not waiter.done():
+                # The slot is transferred to the waiter before it resumes
+                self._admit()
+                waiter.set_result(None)
+
+    def _release(self, handle: LimiterSlot):
+        rtt = time.monotonic() - handle.start_time
+        in_flight_at_completion = self.in_flight
+        self.in_flight -= 1
+        IN_FLIGHT.labels(provider=self.name).set(self.in_flight)
+
+        if handle.outcome == "success":
+            self._on_success(rtt, handle.output_tokens, in_flight_at_completion)
+        elif handle.outcome == "dropped":
+            self._decrease(self.drop_backoff_ratio, reason="dropped")
+
+        self._wake_waiters()
+
+    def _on_success(self, rtt: float, output_tokens: Optional[int], in_flight: int):
+        now = time.monotonic()
+
+        # Periodically forget the minimum so a permanently slower provider isn't punished forever
+        if now >= self.min_rtt_reset_at:
+            self.min_rtt_reset_at = now + self.min_rtt_window
+            self.min_rtt = None
+            self.min_token_latency = None
+        self.min_rtt = rtt if self.min_rtt is None else min(self.min_rtt, rtt)
+
+        # Whole-request RTT still paces decreases and feeds queue-wait estimates
+        self.smoothed_rtt = rtt if self.smoothed_rtt is None else 0.8 * self.smoothed_rtt + 0.2 * rtt
+
+        inflated = False
+        if output_tokens is not None and output_tokens >= self.min_gradient_tokens:
+            token_latency = rtt / output_tokens
+            self.min_token_latency = (token_latency if self.min_token_latency is None
+                                      else min(self.min_token_latency, token_latency))
+            self.smoothed_token_latency = (token_latency if self.smoothed_token_latency is None
+                                           else 0.8 * self.smoothed_token_latency + 0.2 * token_latency)
+            inflated = self.smoothed_token_latency > self.min_token_latency * self.latency_tolerance
+
+        if inflated:
+            self._decrease(self.backoff_ratio, reason="latency_inflation")
+        elif in_flight * 2 >= self.current_limit:
+            # Only grow when we're actually using the capacity we have;
+            # +1/limit per success is roughly +1 per round trip of a full window
+            self.limit = min(float(self.max_limit), self.limit + 1.0 / self.limit)
+            CONCURRENCY_LIMIT.labels(provider=self.name).set(self.limit)
+
+    def _decrease(self, ratio: float, reason: str):
+        now = time.monotonic()
+        # Decrease at most once per RTT so one burst of failures isn't counted many times
+        if self.smoothed_rtt is not None and now - self.last_decrease < self.smoothed_rtt:
+            return
+        self.last_decrease = now
+        previous = self.current_limit
+        self.limit = max(float(self.min_limit), self.limit * ratio)
+        CONCURRENCY_LIMIT.labels(provider=self.name).set(self.limit)
+        if self.current_limit != previous:
+            logger.info("Provider concurrency limit reduced", provider=self.name,
+                        reason=reason, limit=self.current_limit)
+
+    def snapshot(self) -> Dict[str, float]:
+        return {
+            "limit": self.current_limit,
+            "in_flight": self.in_flight,
+            "queued": len(self.waiters),
+            "min_rtt": self.min_rtt or 0.0,
+            "smoothed_rtt": self.smoothed_rtt or 0.0,
+            "min_token_latency": self.min_token_latency or 0.0,
+            "smoothed_token_latency": self.smoothed_token_latency or 0.0
+        }
@@ -0,0 +1,123 @@
+"""
+Conversation History Store
+Server-side multi-turn history in Redis, trimmed to a token budget in prefix-stable steps
+"""
+
+import os
+from typing import Any, Dict, List, Optional, Sequence
+import structlog
+import redis.asyncio as redis
+
+from serialization import record_serializer
+
+logger = structlog.get_logger()
+
+# Append and trim as one step, so concurrent turns on a conversation can't trim
+# from stale counts. A parallel list holds "role:tokens" per turn, because
+# the turn records themselves may be msgpack or JSON. Same rule as fit_history.
+# KEYS: turns, turn metadata
+# ARGV: ttl, token budget, trim target, then (record, metadata) per new turn
+# Returns the number of turns dropped from the front
+APPEND_SCRIPT = """
+for i = 4, #ARGV, 2 do
+    redis.call('RPUSH', KEYS[1], ARGV[i])
+    redis.call('RPUSH', KEYS[2], ARGV[i + 1])
+end
+
+local meta = redis.call('LRANGE', KEYS[2], 0, -1)
+local roles, tokens, total = {}, {}, 0
+for i, entry in ipairs(meta) do
+    local separator = string.find(entry, ':', 1, true)
+    roles[i] = string.sub(entry, 1, separator - 1)
+    tokens[i] = tonumber(string.sub(entry, separator + 1))
+    total = total + tokens[i]
+end
+
+local dropped = 0
+if total > tonumber(ARGV[2]) then
+    local target = tonumber(ARGV[3])
+    while dropped < #meta and (total > target or roles[dropped + 1] ~= 'user') do
+        dropped = dropped + 1
+        total = total - tokens[dropped]
+    end
+    redis.call('LTRIM', KEYS[1], dropped, -1)
+    redis.call('LTRIM', KEYS[2], dropped, -1)
+end
+
+redis.call('EXPIRE', KEYS[1], ARGV[1])
+redis.call('EXPIRE', KEYS[2], ARGV[1])
+return dropped
+"""
+
+def estimate_tokens(text: str) -> int:
+    """Rough token count (~4 chars per token plus per-message overhead); no tokenizer needed"""
+    return len(text) // 4 + 4
+
+def fit_history(messages: Sequence[Dict[str, Any]], token_budget: int,
+                trim_ratio: float = 0.75) -> List[Dict[str, Any]]:
+    """
+    Oldest turns dropped until the history fits the budget
+    Over budget, history is cut to trim_ratio of it rather than just under it, so the
+    next several turns keep an identical prefix and provider prefix caches stay warm.
+    The result always starts at a user turn.
+    """
+    total = sum(message.get("tokens") or estimate_tokens(message["content"]) for message in messages)
+    if total <= token_budget:
+        return list(messages)
+
+    target = token_budget * trim_ratio
+    start = 0
+    while start < len(messages) and (total > target or messages[start]["role"] != "user"):
+        total -= messages[start].get("tokens") or estimate_tokens(messages[start]["content"])
+        start += 1
+    return list(messages[start:])
+
+class ConversationStore:
+    """
+    Append-only turn list per conversation
+    - Turns are stored exactly as sent to the provider and never rewritten, so
+      each request's messages extend the previous request's byte-for-byte
+    - Trimming drops whole turns from the front, in large steps (see fit_history),
+      atomically with the append
+    """
+
+    def __init__(self, redis_client: redis.Redis, token_budget: Optional[int] = None,
+                 ttl_seconds: Optional[int] = None, trim_ratio: float = 0.75):
+        self.redis_client = redis_client
+        self.token_budget = token_budget or int(os.getenv("CONVERSATION_TOKEN_BUDGET", "8000"))
+        self.ttl_seconds = ttl_seconds or int(os.getenv("CONVERSATION_TTL_SECONDS", "86400"))
+        self.trim_ratio = trim_ratio
+        self._append = redis_client.register_script(APPEND_SCRIPT)
+
+    @staticmethod
+    def _key(conversation_id: str) -> str:
+        return f"conversation:{conversation_id}"
+
+    @staticmethod
+    def _meta_key(conversation_id: str) -> str:
+        return f"conversation:{conversation_id}:meta"
+
+    async def load(self, conversation_id: str) -> List[Dict[str, Any]]:
+        raw_turns = await self.redis_client.lrange(self._key(conversation_id), 0, -1)
+        return [record_serializer.loads(raw) for raw in raw_turns]
+
+    async def append(self, conversation_id: str, new_turns: Sequence[Dict[str, str]]):
+        """Persist new turns and apply the same trimming the next request would"""
+        args: List[Any] = [self.ttl_seconds, self.token_budget, self.token_budget * self.trim_ratio]
+        for turn in new_turns:
+            tokens = estimate_tokens(turn["content"])
+            args.append(record_serializer.dumps({"role": turn["role"], "content": turn["content"], "tokens": tokens}))
+            args.append(f"{turn['role']}:{tokens}")
+
+        dropped = await self._append(
+            keys=[self._key(conversation_id), self._meta_key(conversation_id)], args=args
+        )
+        if dropped:
+            logger.debug("Conversation history trimmed", conversation_id=conversation_id, dropped_turns=dropped)
+
+    async def delete(self, conversation_id: str):
+        await self.redis_client.delete(self._key(conversation_id), self._meta_key(conversation_id))
+
+def provider_messages(messages: Sequence[Dict[str, Any]]) -> List[Dict[str, str]]:
+    """Strip bookkeeping fields before sending turns upstream"""
+    return [{"role": message["role"], "content": message["content"]} for message in messages]
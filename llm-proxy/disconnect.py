@@ -0,0 +1,73 @@
+"""
+Client Disconnect Cancellation
+Stop working on a request, provider call included, once its caller has gone away
+"""
+
+import asyncio
+from typing import Optional
+import structlog
+from prometheus_client import Counter
+from starlette.requests import Request
+
+logger = structlog.get_logger()
+
+CLIENT_DISCONNECTS = Counter(
+    'llm_proxy_client_disconnects_total', 'Requests abandoned by the caller, by the stage they were in', ['stage']
+)
+DISCONNECT_TOKENS_SAVED = Counter(
+    'llm_proxy_disconnect_tokens_saved_total',
+    'Completion tokens not generated because the provider call was cancelled (max_tokens upper bound)'
+)
+DISCONNECT_TOKENS_WASTED = Counter(
+    'llm_proxy_disconnect_tokens_wasted_total', 'Tokens already spent when the caller disconnected'
+)
+
+# Non-standard, but the conventional status for "client closed request"
+CLIENT_CLOSED_REQUEST = 499
+
+class DisconnectWatcher:
+    """
+    Watches the ASGI receive channel and cancels the handler task on http.disconnect
+    - The body has already been read by then, so the next message is the disconnect
+    - The handler sees CancelledError at whatever it is awaiting, so in-flight
+      provider requests are aborted and later stages never start
+    - The handler checks `disconnected` to tell this apart from a server shutdown
+    """
+
+    def __init__(self, request: Request):
+        self.request = request
+        self.disconnected = False
+        self._task: Optional[asyncio.Task] = None
+        self._watcher: Optional[asyncio.Task] = None
+
+    def start(self) -> "DisconnectWatcher":
+        self._task = asyncio.current_task()
+        self._watcher = asyncio.create_task(self._watch())
+        return self
+
+    async def _watch(self):
+        receive = self.request.receive
+        while True:
+            message = await receive()
+            if message["type"] == "http.disconnect":
+                self.disconnected = True
+                self._task.cancel()
+                return
+
+    def acknowledge(self):
+        """Take back the cancellation so the handler can finish its own cleanup"""
+        if hasattr(self._task, "uncancel"):
+            self._task.uncancel()
+
+    def stop(self):
+        if self._watcher is not None:
+            self._watcher.cancel()
+            self._watcher = None
+
+def record_disconnect(stage: Optional[str], max_tokens: int, spent_tokens: Optional[int]):
+    """spent_tokens is None when the provider call had not completed"""
+    CLIENT_DISCONNECTS.labels(stage=stage or "before_pipeline").inc()
+    if spent_tokens is None:
+        DISCONNECT_TOKENS_SAVED.inc(max_tokens)
+    else:
+        DISCONNECT_TOKENS_WASTED.inc(spent_tokens)
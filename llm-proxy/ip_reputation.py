@@ -0,0 +1,175 @@
+"""
+IP Reputation Store
+Known-bad IPs screened in memory with a counting Bloom filter; Redis holds the scores
+"""
+
+import asyncio
+import hashlib
+import math
+import os
+import time
+from typing import Iterable, Optional
+import structlog
+import redis.asyncio as redis
+from prometheus_client import Counter, Gauge
+
+logger = structlog.get_logger()
+
+IP_REPUTATION_LOOKUPS = Counter(
+    'ip_reputation_lookups_total', 'IP reputation lookups by resolution path', ['path']
+)
+IP_REPUTATION_INDEXED = Gauge('ip_reputation_indexed_ips', 'Known-bad IPs in the in-memory filter')
+
+SCORE_KEY_PREFIX = "ip_reputation:"
+BAD_INDEX_KEY = "ip_reputation:bad"
+
+# Weighted score update plus bad-index membership in one step, so concurrent
+# reports can't lose updates and the index never disagrees with the score.
+# KEYS: score key, bad index
+# ARGV: confidence, ttl seconds, threshold, ip, now
+# Returns {score, membership change: 1 added, -1 removed, 0 unchanged}
+RECORD_SCRIPT = """
+local confidence = tonumber(ARGV[1])
+local ttl = tonumber(ARGV[2])
+local current = redis.call('GET', KEYS[1])
+local score = confidence
+if current then
+    score = tonumber(current) * 0.8 + confidence * 0.2
+end
+redis.call('SETEX', KEYS[1], ttl, tostring(score))
+
+local change = 0
+if score >= tonumber(ARGV[3]) then
+    -- Score is the expiry time; ZADD also refreshes it for IPs already indexed
+    change = redis.call('ZADD', KEYS[2], tonumber(ARGV[5]) + ttl, ARGV[4])
+else
+    change = -redis.call('ZREM', KEYS[2], ARGV[4])
+end
+return {tostring(score), change}
+"""
+
+class CountingBloomFilter:
+    """
+    Bloom filter with small saturating counters instead of bits, so entries can be removed
+    False positives are possible, false negatives are not (until a counter saturates)
+    """
+
+    def __init__(self, capacity: int, error_rate: float = 0.01):
+        self.size = max(8, int(-capacity * math.log(error_rate) / (math.log(2) ** 2)))
+        self.hash_count = max(1, round(self.size / capacity * math.log(2)))
+        self._counters = bytearray(self.size)
+        self.count = 0
+
+    def _indexes(self, item: str) -> Iterable[int]:
+        # Double hashing: k indexes from two 64-bit halves of one digest
+        digest = hashlib.blake2b(item.encode(), digest_size=16).digest()
+        first = int.from_bytes(digest[:8], "little")
+        second = int.from_bytes(digest[8:], "little") | 1
+        return [(first + i * second) % self.size for i in range(self.hash_count)]
+
+    def add(self, item: str):
+        for index in self._indexes(item):
+            if self._counters[index] < 255:
+                self._counters[index] += 1
+        self.count += 1
+
+    def remove(self, item: str):
+        """Only for items known to have been added, or other entries may be lost"""
+        for index in self._indexes(item):
+            if 0 < self._counters[index] < 255:  # A saturated counter no longer knows its count
+                self._counters[index] -= 1
+        self.count = max(0, self.count - 1)
+
+    def __contains__(self, item: str) -> bool:
+        counters = self._counters
+        return all(counters[index] for index in self._indexes(item))
+
+class IPReputationStore:
+    """
+    Reputation scores per IP with an in-process fast path
+    - IPs at or above the threshold are indexed in Redis and mirrored into a local filter
+    - A filter miss means the IP is not known-bad: answered without a network call
+    - A filter hit fetches the real score, which also weeds out false positives
+    - The filter is rebuilt from Redis periodically to pick up other workers' reports
+    """
+
+    def __init__(self, redis_client: redis.Redis, threshold: Optional[float] = None,
+                 capacity: Optional[int] = None, error_rate: float = 0.01,
+                 ttl_seconds: int = 86400, sync_interval: Optional[float] = None):
+        self.redis_client = redis_client
+        self.threshold = threshold if threshold is not None else float(os.getenv("IP_REPUTATION_THRESHOLD", "0.7"))
+        self.capacity = capacity or int(os.getenv("IP_REPUTATION_CAPACITY", "100000"))
+        self.error_rate = error_rate
+        self.ttl_seconds = ttl_seconds
+        self.sync_interval = sync_interval or float(os.getenv("IP_REPUTATION_SYNC_SECONDS", "30"))
+        self.filter = CountingBloomFilter(self.capacity, error_rate)
+        self.synced = False  # Until the first sync the filter can't vouch for anyone
+        self._record = redis_client.register_script(RECORD_SCRIPT)
+        self._task: Optional[asyncio.Task] = None
+
+    async def score(self, ip_address: str) -> float:
+        """Reputation score, 0.0 for IPs with no record"""
+        if self.synced and ip_address not in self.filter:
+            IP_REPUTATION_LOOKUPS.labels(path="filter").inc()
+            return 0.0
+
+        raw = await self.redis_client.get(f"{SCORE_KEY_PREFIX}{ip_address}")
+        score = float(raw) if raw else 0.0
+        if self.synced:
+            IP_REPUTATION_LOOKUPS.labels(path="redis" if score >= self.threshold else "false_positive").inc()
+        else:
+            IP_REPUTATION_LOOKUPS.labels(path="unsynced").inc()
+        return score
+
+    async def is_known_bad(self, ip_address: str) -> bool:
+        return await self.score(ip_address) >= self.threshold
+
+    async def record(self, ip_address: str, confidence: float) -> float:
+        """Blend a new report into the IP's score and return the updated score"""
+        raw_score, change = await self._record(
+            keys=[f"{SCORE_KEY_PREFIX}{ip_address}", BAD_INDEX_KEY],
+            args=[confidence, self.ttl_seconds, self.threshold, ip_address, int(time.time())]
+        )
+        # Mirror membership changes locally so this worker sees them before the next sync
+        if change > 0:
+            self.filter.add(ip_address)
+        elif change < 0:
+            self.filter.remove(ip_address)
+        IP_REPUTATION_INDEXED.set(self.filter.count)
+        return float(raw_score)
+
+    async def sync(self):
+        """Rebuild the filter from the Redis index, dropping expired entries first"""
+        async with self.redis_client.pipeline(transaction=True) as pipe:
+            pipe.zremrangebyscore(BAD_INDEX_KEY, "-inf", int(time.time()))
+            pipe.zrange(BAD_INDEX_KEY, 0, -1)
+            _, members = await pipe.execute()
+
+        rebuilt = CountingBloomFilter(self.capacity, self.error_rate)
+        for member in members:
+            rebuilt.add(member.decode() if isinstance(member, bytes) else member)
+        if rebuilt.count > self.capacity:
+            logger.warning("Known-bad IPs exceed filter capacity, false positives will rise",
+                           indexed=rebuilt.count, capacity=self.capacity)
+
+        self.filter = rebuilt
+        self.synced = True
+        IP_REPUTATION_INDEXED.set(rebuilt.count)
+
+    async def _run(self):
+        while True:
+            try:
+                await self.sync()
+            except Exception as e:
+                # Keep serving from the last filter; it only misses IPs flagged since then
+                logger.warning("IP reputation sync failed", error=str(e))
+            await asyncio.sleep(self.sync_interval)
+
+    def start(self):
+        if self._task is None:
+            self._task = asyncio.create_task(self._run())
+
+    async def stop(self):
+        if self._task is not None:
+            self._task.cancel()
+            self._task = None
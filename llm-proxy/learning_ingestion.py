@@ -0,0 +1,224 @@
+"""
+Bulk Learning Ingestion
+NDJSON backfills spooled to disk, acknowledged with a job id and loaded into
+the learning store in pipelined batches
+"""
+
+import asyncio
+import os
+import tempfile
+import time
+from typing import Any, AsyncIterator, Dict, IO, List, Optional
+import structlog
+import redis.asyncio as redis
+from prometheus_client import Counter, Gauge, Histogram
+
+from serialization import dumps_json, loads_json
+
+logger = structlog.get_logger()
+
+INGEST_RECORDS = Counter(
+    'learning_ingest_records_total', 'Bulk learning records by kind and outcome', ['kind', 'outcome']
+)
+INGEST_BYTES = Counter('learning_ingest_bytes_total', 'Bulk learning payload bytes received')
+INGEST_BATCH_SECONDS = Histogram(
+    'learning_ingest_batch_seconds', 'Time to load one batch into the learning store',
+    buckets=(0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5)
+)
+INGEST_ACTIVE_JOBS = Gauge('learning_ingest_active_jobs', 'Bulk learning jobs in progress on this worker')
+
+_MAX_REPORTED_ERRORS = 20
+
+# Shape of the interaction records written by the chat path (record_vibecoding_interaction in main)
+INTERACTION_FIELDS = {
+    "request_id": str,
+    # Epoch seconds as the chat path writes them; ISO strings from other exports
+    "timestamp": (int, float, str),
+    "prompt_analysis": dict,
+    "response_analysis": dict,
+    "vibecoding_scores": dict,
+}
+INTERACTION_OPTIONAL_FIELDS = {
+    "learning_mode": bool,
+    "improvements": list,
+}
+
+_TYPE_NAMES = {str: "a string", dict: "an object", bool: "a boolean", list: "an array",
+               (int, float, str): "a number or a string"}
+
+def validate_record(record: Any) -> Optional[str]:
+    """Reason a bulk record can't be loaded, or None if it's valid"""
+    if not isinstance(record, dict):
+        return "Not a JSON object"
+    if "category" in record:
+        if not isinstance(record["category"], str):
+            return "category must be a string"
+        if not isinstance(record.get("content", ""), str):
+            return "content must be a string"
+        return None
+    for name, expected in INTERACTION_FIELDS.items():
+        if name not in record:
+            return f"Missing field: {name}"
+        if not isinstance(record[name], expected):
+            return f"{name} must be {_TYPE_NAMES[expected]}"
+    for name, expected in INTERACTION_OPTIONAL_FIELDS.items():
+        if name in record and not isinstance(record[name], expected):
+            return f"{name} must be {_TYPE_NAMES[expected]}"
+    return None
+
+class IngestTooLarge(Exception):
+    """Raised when a bulk payload exceeds the configured size limit"""
+
+class LearningIngestor:
+    """
+    Runs bulk learning jobs
+    - The upload is only spooled (memory, then disk) before the job id is
+      returned; parsing and loading happen in a background task
+    - Job state lives in Redis, so any worker can answer a status query
+    - Records are validated first; interactions join the backfill queue the
+      learning cycle reads, one pipeline per batch; records with a category are explicit
+      learning (as on /v1/vibecoding/learn), processed one batch per call
+    - accepted counts what was stored; interactions past the backfill cap are
+      counted as dropped
+    """
+
+    def __init__(self, redis_client: redis.Redis, learning_engine, batch_size: Optional[int] = None,
+                 max_bytes: Optional[int] = None, job_ttl_seconds: int = 7 * 86400):
+        self.redis_client = redis_client
+        self.learning_engine = learning_engine
+        self.batch_size = batch_size or int(os.getenv("LEARNING_INGEST_BATCH_SIZE", "500"))
+        self.max_bytes = max_bytes or int(os.getenv("LEARNING_INGEST_MAX_BYTES", str(512 * 1024 * 1024)))
+        self.job_ttl_seconds = job_ttl_seconds
+        self._tasks: Dict[str, asyncio.Task] = {}
+
+    @staticmethod
+    def _key(job_id: str) -> str:
+        return f"learning_ingest:job:{job_id}"
+
+    async def spool(self, body: AsyncIterator[bytes]) -> IO[bytes]:
+        """Copy the request body aside without parsing it"""
+        spool = tempfile.SpooledTemporaryFile(max_size=8 * 1024 * 1024)
+        size = 0
+        try:
+            async for chunk in body:
+                size += len(chunk)
+                if size > self.max_bytes:
+                    raise IngestTooLarge(f"Bulk payload exceeds {self.max_bytes} bytes")
+                spool.write(chunk)
+        except BaseException:
+            spool.close()
+            raise
+        INGEST_BYTES.inc(size)
+        spool.seek(0)
+        return spool
+
+    async def submit(self, job_id: str, spool: IO[bytes]) -> Dict[str, Any]:
+        state = {"status": "queued", "lines": 0, "accepted": 0, "rejected": 0,
+                 "dropped": 0, "submitted_at": time.time()}
+        await self._save(job_id, state)
+        task = asyncio.create_task(self._run(job_id, spool, state))
+        self._tasks[job_id] = task
+        task.add_done_callback(lambda _: self._tasks.pop(job_id, None))
+        return state
+
+    async def status(self, job_id: str) -> Optional[Dict[str, Any]]:
+        raw = await self.redis_client.get(self._key(job_id))
+        if raw is None:
+            return None
+        state = loads_json(raw)
+        finished = state.get("finished_at") or time.time()
+        if state.get("started_at"):
+            elapsed = max(finished - state["started_at"], 1e-6)
+            state["records_per_second"] = round(state["lines"] / elapsed, 1)
+        return state
+
+    async def _save(self, job_id: str, state: Dict[str, Any]):
+        await self.redis_client.set(self._key(job_id), dumps_json(state), ex=self.job_ttl_seconds)
+
+    def _read_lines(self, spool: IO[bytes]) -> List[bytes]:
+        lines = []
+        for line in spool:
+            lines.append(line)
+            if len(lines) >= self.batch_size:
+                break
+        return lines
+
+    async def _run(self, job_id: str, spool: IO[bytes], state: Dict[str, Any]):
+        INGEST_ACTIVE_JOBS.inc()
+        state.update(status="running", started_at=time.time())
+        errors: List[Dict[str, Any]] = []
+        try:
+            await self._save(job_id, state)
+            while True:
+                lines = await asyncio.to_thread(self._read_lines, spool)
+                if not lines:
+                    break
+                started = time.perf_counter()
+                await self._load_batch(lines, state, errors)
+                INGEST_BATCH_SECONDS.observe(time.perf_counter() - started)
+                state["errors"] = errors
+                await self._save(job_id, state)
+            state.update(status="completed", finished_at=time.time())
+        except asyncio.CancelledError:
+            state.update(status="interrupted", finished_at=time.time())
+            raise
+        except Exception as e:
+            logger.error("Bulk learning job failed", job_id=job_id, error=str(e))
+            state.update(status="failed", error=str(e), finished_at=time.time())
+        finally:
+            INGEST_ACTIVE_JOBS.dec()
+            spool.close()
+            state["errors"] = errors
+            try:
+                await asyncio.shield(self._save(job_id, state))
+            except Exception as e:
+                logger.warning("Could not record bulk learning job state", job_id=job_id, error=str(e))
+
+        logger.info("Bulk learning job finished", job_id=job_id, status=state["status"],
+                    accepted=state["accepted"], rejected=state["rejected"], dropped=state["dropped"])
+
+    async def _load_batch(self, lines: List[bytes], state: Dict[str, Any], errors: List[Dict[str, Any]]):
+        interactions = []
+        explicit = []
+        for line in lines:
+            state["lines"] += 1
+            if not line.strip():
+                continue
+            try:
+                record = loads_json(line)
+                error = validate_record(record)
+            except ValueError:
+                record, error = None, "Invalid JSON"
+            if error:
+                state["rejected"] += 1
+                if not isinstance(record, dict):
+                    kind = "unknown"
+                else:
+                    kind = "explicit" if "category" in record else "interaction"
+                INGEST_RECORDS.labels(kind=kind, outcome="rejected").inc()
+                if len(errors) < _MAX_REPORTED_ERRORS:
+                    errors.append({"line": state["lines"], "error": error})
+                continue
+            if "category" in record:
+                explicit.append(record)
+            else:
+                interactions.append(record)
+
+        if interactions:
+            kept = await self.learning_engine.ingest_interactions(interactions)
+            dropped = len(interactions) - kept
+            INGEST_RECORDS.labels(kind="interaction", outcome="accepted").inc(kept)
+            if dropped:
+                INGEST_RECORDS.labels(kind="interaction", outcome="dropped").inc(dropped)
+            state["accepted"] += kept
+            state["dropped"] += dropped
+        if explicit:
+            await self.learning_engine.process_explicit_learning_batch(explicit)
+            INGEST_RECORDS.labels(kind="explicit", outcome="accepted").inc(len(explicit))
+            state["accepted"] += len(explicit)
+
+    async def stop(self):
+        tasks = list(self._tasks.values())
+        for task in tasks:
+            task.cancel()
+        await asyncio.gather(*tasks, return_exceptions=True)
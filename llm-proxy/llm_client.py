@@ -4,14 +4,17 @@ Intelligent model selection and API optimization
 """
 
 import asyncio
+import os
 import time
-import json
-from typing import Dict, List, Optional, Any
-from dataclasses import dataclass
+from typing import Dict, List, Optional, Any, AsyncIterator
+from dataclasses import dataclass, field
 from datetime import datetime
 import structlog
 import httpx
-import os
+
+from concurrency_limiter import AdaptiveConcurrencyLimiter, ConcurrencyLimitExceeded
+from provider_adapters import ErrorClass, ProviderAdapter, ProviderError, ProviderRegistry, ProviderRequest, ProviderResult
+from tool_calling import TOOL_CALLS, TOOL_ROUNDS, ToolCall, ToolDefinition, ToolExecutor
 
 logger = structlog.get_logger()
 
@@ -23,6 +26,8 @@ class LLMResponse:
     usage: Dict[str, int]
     processing_time: float
     provider: str
+    tool_calls: List[ToolCall] = field(default_factory=list)
+    tool_rounds: int = 0
 
 class LLMClient:
     """
@@ -30,83 +35,98 @@ class LLMClient:
     Integrates with VibeCoding methodology
     """
     
-    def __init__(self, vibecoding_core=None):
+    def __init__(self, vibecoding_core=None, provider_registry: Optional[ProviderRegistry] = None):
         self.vibecoding_core = vibecoding_core
         self.model_discovery = None  # Will be initialized if available
         
-        # API endpoints and keys
-        self.api_configs = {
-            "anthropic": {
-                "base_url": "https://api.anthropic.com/v1",
-                "api_key": os.getenv("ANTHROPIC_API_KEY"),
-                "default_model": "claude-sonnet-4-20250514"  # Latest model
-            },
-            "openai": {
-                "base_url": "https://api.openai.com/v1",
-                "api_key": os.getenv("OPENAI_API_KEY"),
-                "default_model": "gpt-4-turbo-preview"
-            },
-            "io_intelligence": {
-                "base_url": "https://api.iointelligence.ai/v1",
-                "api_key": os.getenv("IO_INTELLIGENCE_API_KEY"),
-                "default_model": "io-reasoning-1"
-            }
-        }
+        # Provider adapters own the wire format; the client owns transport
+        self.provider_registry = provider_registry or ProviderRegistry.from_environment()
+        self.http_client: Optional[httpx.AsyncClient] = None
+        
+        # Adaptive in-flight limits per upstream provider
+        self.concurrency_limiters: Dict[str, AdaptiveConcurrencyLimiter] = {}
+
+    def _get_http_client(self) -> httpx.AsyncClient:
+        """Shared HTTP client so provider connections are reused across requests"""
+        if self.http_client is None or self.http_client.is_closed:
+            self.http_client = httpx.AsyncClient(timeout=60.0)
+        return self.http_client
+
+    def _get_concurrency_limiter(self, provider: str) -> AdaptiveConcurrencyLimiter:
+        limiter = self.concurrency_limiters.get(provider)
+        if limiter is None:
+            limiter = AdaptiveConcurrencyLimiter(
+                name=provider,
+                initial_limit=int(os.getenv("PROVIDER_INITIAL_CONCURRENCY", "10")),
+                max_limit=int(os.getenv("PROVIDER_MAX_CONCURRENCY", "200")),
+                default_queue_timeout=float(os.getenv("PROVIDER_QUEUE_TIMEOUT_SECONDS", "10"))
+            )
+            self.concurrency_limiters[provider] = limiter
+        return limiter
+
+    def under_pressure(self) -> bool:
+        """True when any provider is at its concurrency limit or has requests queued"""
+        return any(
+            limiter.waiters or limiter.in_flight >= limiter.current_limit
+            for limiter in self.concurrency_limiters.values()
+        )
+
+    async def close(self):
+        """Release pooled provider connections"""
+        if self.http_client is not None:
+            await self.http_client.aclose()
+            self.http_client = None
 
     async def generate_completion(self, prompt: str, model: str, max_tokens: int = 1000,
                                 temperature: float = 0.7, system_prompt: Optional[str] = None,
-                                vibecoding_weights: Optional[Dict[str, float]] = None) -> LLMResponse:
+                                vibecoding_weights: Optional[Dict[str, float]] = None,
+                                task_type: str = "general_chat",
+                                deadline: Optional[float] = None,
+                                history: Optional[List[Dict[str, str]]] = None,
+                                tools: Optional[List[ToolDefinition]] = None,
+                                tool_choice: Optional[str] = None,
+                                tool_executor: Optional[ToolExecutor] = None) -> LLMResponse:
         """
         Generate completion with intelligent model selection
+        deadline is a time.monotonic() value bounding how long to queue for capacity;
+        history holds prior turns (role/content, oldest first) sent ahead of the prompt.
+        With a tool_executor, tool calls it can serve are run here and fed back to the
+        model; any other tool calls are returned in the response.
         """
+        start_time = time.time()
         try:
-            start_time = time.time()
-            
-            # Determine optimal model if not specified
-            if model == "auto" and self.model_discovery:
-                optimal_model = await self.model_discovery.select_optimal_model(
-                    task_type="general_chat",
-                    requirements={
-                        "max_tokens": max_tokens,
-                        "prefer_fast": vibecoding_weights and vibecoding_weights.get("precision", 0) > 0.5,
-                        "prefer_accurate": vibecoding_weights and vibecoding_weights.get("philosophy", 0) > 0.5
-                    }
-                )
-                if optimal_model:
-                    model = optimal_model
-                else:
-                    model = "claude-sonnet-4-20250514"  # Fallback to best available
+            model = await self._resolve_model(model, max_tokens, vibecoding_weights, task_type,
+                                              needs_tools=bool(tools))
             
-            # Determine provider from model
-            provider = self._get_provider_from_model(model)
+            # Determine provider adapter from the discovery catalog
+            adapter = self._get_adapter_for_model(model)
             
-            if not provider:
+            if not adapter:
                 raise ValueError(f"Unknown model: {model}")
             
-            # Generate completion based on provider
-            if provider == "anthropic":
-                response = await self._anthropic_completion(prompt, model, max_tokens, temperature, system_prompt)
-            elif provider == "openai":
-                response = await self._openai_completion(prompt, model, max_tokens, temperature, system_prompt)
-            elif provider == "io_intelligence":
-                response = await self._io_intelligence_completion(prompt, model, max_tokens, temperature, system_prompt)
-            else:
-                raise ValueError(f"Unsupported provider: {provider}")
+            result = await self._execute_completion(adapter, prompt, model, max_tokens,
+                                                    temperature, system_prompt, deadline, history,
+                                                    tools, tool_choice, tool_executor)
             
             processing_time = time.time() - start_time
             
             # Update rate limiting if model discovery available
             if self.model_discovery:
-                await self.model_discovery.update_rate_limit_usage(model, response.usage.get("total_tokens", 0))
+                await self.model_discovery.update_rate_limit_usage(model, result.usage.get("total_tokens", 0))
             
             return LLMResponse(
-                content=response["content"],
+                content=result.content,
                 model=model,
-                usage=response["usage"],
+                usage=result.usage,
                 processing_time=processing_time,
-                provider=provider
+                provider=adapter.name,
+                tool_calls=result.tool_calls,
+                tool_rounds=result.tool_rounds
             )
             
+        except ConcurrencyLimitExceeded:
+            # Shedding is the caller's decision, not something to paper over
+            raise
         except Exception as e:
             logger.error(f"LLM completion failed for model {model}", error=str(e))
             
@@ -119,171 +139,143 @@ class LLMClient:
                 provider="error"
             )
 
-    def _get_provider_from_model(self, model: str) -> Optional[str]:
-        """Determine provider from model name"""
-        if "claude" in model.lower():
-            return "anthropic"
-        elif "gpt" in model.lower():
-            return "openai"
-        elif "io-" in model.lower():
-            return "io_intelligence"
-        return None
-
-    async def _anthropic_completion(self, prompt: str, model: str, max_tokens: int,
-                                  temperature: float, system_prompt: Optional[str]) -> Dict[str, Any]:
-        """Generate Anthropic completion"""
-        try:
-            config = self.api_configs["anthropic"]
-            if not config["api_key"]:
-                raise ValueError("Anthropic API key not available")
-            
-            headers = {
-                "x-api-key": config["api_key"],
-                "anthropic-version": "2023-06-01",
-                "Content-Type": "application/json"
-            }
-            
-            # Prepare messages
-            messages = []
-            if system_prompt:
-                messages.append({"role": "system", "content": system_prompt})
-            messages.append({"role": "user", "content": prompt})
-            
-            payload = {
-                "model": model,
-                "max_tokens": max_tokens,
-                "temperature": temperature,
-                "messages": messages
-            }
-            
-            async with httpx.AsyncClient(timeout=60.0) as client:
-                response = await client.post(
-                    f"{config['base_url']}/messages",
-                    headers=headers,
-                    json=payload
-                )
-                
-                if response.status_code == 200:
-                    data = response.json()
-                    content = data.get("content", [{}])[0].get("text", "")
-                    usage = data.get("usage", {"input_tokens": 0, "output_tokens": 0})
-                    
-                    return {
-                        "content": content,
-                        "usage": {
-                            "prompt_tokens": usage.get("input_tokens", 0),
-                            "completion_tokens": usage.get("output_tokens", 0),
-                            "total_tokens": usage.get("input_tokens", 0) + usage.get("output_tokens", 0)
-                        }
-                    }
-                else:
-                    logger.error(f"Anthropic API error: {response.status_code}", response_text=response.text)
-                    raise httpx.HTTPError(f"API error: {response.status_code}")
+    async def stream_completion(self, prompt: str, model: str, max_tokens: int = 1000,
+                              temperature: float = 0.7, system_prompt: Optional[str] = None,
+                              vibecoding_weights: Optional[Dict[str, float]] = None,
+                              task_type: str = "general_chat",
+                              history: Optional[List[Dict[str, str]]] = None) -> AsyncIterator[str]:
+        """
+        Stream completion text deltas as they arrive from the provider
+        """
+        model = await self._resolve_model(model, max_tokens, vibecoding_weights, task_type)
+        adapter = self._get_adapter_for_model(model)
+        if not adapter:
+            raise ValueError(f"Unknown model: {model}")
+        
+        if adapter.in_process:
+            # Local pipelines produce the whole output in one pass
+            result = await adapter.execute(prompt, model)
+            yield result.content
+            return
+        
+        request = adapter.build_request(prompt, model, max_tokens, temperature, system_prompt,
+                                        stream=True, history=history)
+        client = self._get_http_client()
+        
+        async with self._get_concurrency_limiter(adapter.name).slot() as slot:
+            try:
+                async with client.stream("POST", request.url, headers=request.headers,
+                                         json=request.payload) as response:
+                    if response.status_code != 200:
+                        body = (await response.aread()).decode(errors="replace")
+                        error = adapter.error_from_response(response.status_code, body)
+                        if error.retryable:
+                            slot.dropped()
+                        else:
+                            slot.ignore()
+                        logger.error(f"{adapter.name} API error: {response.status_code}", response_text=body)
+                        raise error
                     
-        except Exception as e:
-            logger.error("Anthropic completion failed", error=str(e))
-            raise
+                    async for line in response.aiter_lines():
+                        delta = adapter.parse_stream_line(line)
+                        if delta:
+                            yield delta
+                    # No token count: the elapsed time includes the consumer's pace,
+                    # so streams must not feed the latency gradient
+                    slot.success()
+            except httpx.TransportError as e:
+                slot.dropped()
+                raise ProviderError(adapter.name, adapter.classify_error(None), str(e)) from e
 
-    async def _openai_completion(self, prompt: str, model: str, max_tokens: int,
-                               temperature: float, system_prompt: Optional[str]) -> Dict[str, Any]:
-        """Generate OpenAI completion"""
-        try:
-            config = self.api_configs["openai"]
-            if not config["api_key"]:
-                raise ValueError("OpenAI API key not available")
-            
-            headers = {
-                "Authorization": f"Bearer {config['api_key']}",
-                "Content-Type": "application/json"
-            }
-            
-            # Prepare messages
-            messages = []
-            if system_prompt:
-                messages.append({"role": "system", "content": system_prompt})
-            messages.append({"role": "user", "content": prompt})
-            
-            payload = {
-                "model": model,
-                "max_tokens": max_tokens,
-                "temperature": temperature,
-                "messages": messages
-            }
-            
-            async with httpx.AsyncClient(timeout=60.0) as client:
-                response = await client.post(
-                    f"{config['base_url']}/chat/completions",
-                    headers=headers,
-                    json=payload
-                )
-                
-                if response.status_code == 200:
-                    data = response.json()
-                    content = data.get("choices", [{}])[0].get("message", {}).get("content", "")
-                    usage = data.get("usage", {"prompt_tokens": 0, "completion_tokens": 0, "total_tokens": 0})
-                    
-                    return {
-                        "content": content,
-                        "usage": usage
-                    }
-                else:
-                    logger.error(f"OpenAI API error: {response.status_code}", response_text=response.text)
-                    raise httpx.HTTPError(f"API error: {response.status_code}")
-                    
-        except Exception as e:
-            logger.error("OpenAI completion failed", error=str(e))
-            raise
+    async def _resolve_model(self, model: str, max_tokens: int,
+                           vibecoding_weights: Optional[Dict[str, float]],
+                           task_type: str = "general_chat", needs_tools: bool = False) -> str:
+        """Determine optimal model if not specified"""
+        if model == "auto" and self.model_discovery:
+            optimal_model = await self.model_discovery.select_optimal_model(
+                task_type=task_type,
+                requirements={
+                    "max_tokens": max_tokens,
+                    "prefer_fast": vibecoding_weights and vibecoding_weights.get("precision", 0) > 0.5,
+                    "prefer_accurate": vibecoding_weights and vibecoding_weights.get("philosophy", 0) > 0.5,
+                    "function_calling": needs_tools
+                }
+            )
+            if optimal_model:
+                return optimal_model
+            return "claude-sonnet-4-20250514"  # Fallback to best available
+        return model
 
-    async def _io_intelligence_completion(self, prompt: str, model: str, max_tokens: int,
-                                        temperature: float, system_prompt: Optional[str]) -> Dict[str, Any]:
-        """Generate IO Intelligence completion"""
-        try:
-            config = self.api_configs["io_intelligence"]
-            if not config["api_key"]:
-                raise ValueError("IO Intelligence API key not available")
-            
-            headers = {
-                "Authorization": f"Bearer {config['api_key']}",
-                "Content-Type": "application/json"
-            }
-            
-            # Prepare messages
-            messages = []
-            if system_prompt:
-                messages.append({"role": "system", "content": system_prompt})
-            messages.append({"role": "user", "content": prompt})
-            
-            payload = {
-                "model": model,
-                "max_tokens": max_tokens,
-                "temperature": temperature,
-                "messages": messages
-            }
+    def _get_adapter_for_model(self, model: str) -> Optional[ProviderAdapter]:
+        """Determine provider adapter from model name"""
+        return self.provider_registry.resolve(model, self.model_discovery)
+
+    async def _execute_completion(self, adapter: ProviderAdapter, prompt: str, model: str,
+                                max_tokens: int, temperature: float,
+                                system_prompt: Optional[str],
+                                deadline: Optional[float] = None,
+                                history: Optional[List[Dict[str, str]]] = None,
+                                tools: Optional[List[ToolDefinition]] = None,
+                                tool_choice: Optional[str] = None,
+                                tool_executor: Optional[ToolExecutor] = None) -> ProviderResult:
+        """Send a completion request through a provider adapter, running server-side tool rounds"""
+        if adapter.in_process:
+            if tools:
+                raise ProviderError(adapter.name, ErrorClass.INVALID_REQUEST,
+                                    "In-process models do not support tool calling")
+            return await adapter.execute(prompt, model)
+        
+        request = adapter.build_request(prompt, model, max_tokens, temperature, system_prompt,
+                                        history=history, tools=tools, tool_choice=tool_choice)
+        result = await self._send_request(adapter, request, deadline)
+        
+        # Each round appends to the same message list, so every follow-up
+        # request extends the previous one's prefix
+        usage = dict(result.usage)
+        rounds = 0
+        while (tool_executor is not None and rounds < tool_executor.max_rounds
+               and tool_executor.handles(result.tool_calls)):
+            tool_results = await tool_executor.run(result.tool_calls)
+            request.payload["messages"].extend(adapter.tool_round_messages(result, tool_results))
+            result = await self._send_request(adapter, request, deadline)
+            rounds += 1
+            for key, value in result.usage.items():
+                usage[key] = usage.get(key, 0) + value
+        
+        if tools:
+            TOOL_ROUNDS.observe(rounds)
+            for call in result.tool_calls:
+                TOOL_CALLS.labels(tool=call.name, outcome="returned").inc()
+        result.usage = usage
+        result.tool_rounds = rounds
+        return result
+    
+    async def _send_request(self, adapter: ProviderAdapter, request: ProviderRequest,
+                            deadline: Optional[float]) -> ProviderResult:
+        client = self._get_http_client()
+        
+        async with self._get_concurrency_limiter(adapter.name).slot(deadline) as slot:
+            try:
+                response = await client.post(request.url, headers=request.headers, json=request.payload)
+            except httpx.TransportError as e:
+                slot.dropped()
+                logger.error(f"{adapter.name} completion failed", error=str(e))
+                raise ProviderError(adapter.name, adapter.classify_error(None), str(e)) from e
             
-            async with httpx.AsyncClient(timeout=60.0) as client:
-                response = await client.post(
-                    f"{config['base_url']}/chat/completions",
-                    headers=headers,
-                    json=payload
-                )
-                
-                if response.status_code == 200:
-                    data = response.json()
-                    content = data.get("choices", [{}])[0].get("message", {}).get("content", "")
-                    usage = data.get("usage", {"prompt_tokens": 0, "completion_tokens": 0, "total_tokens": 0})
-                    
-                    return {
-                        "content": content,
-                        "usage": usage
-                    }
+            if response.status_code != 200:
+                error = adapter.error_from_response(response.status_code, response.text)
+                if error.retryable:
+                    slot.dropped()
                 else:
-                    logger.error(f"IO Intelligence API error: {response.status_code}", response_text=response.text)
-                    raise httpx.HTTPError(f"API error: {response.status_code}")
-                    
-        except Exception as e:
-            logger.error("IO Intelligence completion failed", error=str(e))
-            raise
+                    slot.ignore()
+                logger.error(f"{adapter.name} API error: {response.status_code}", response_text=response.text)
+                raise error
+            
+            result = adapter.parse_response(response.json())
+            slot.success(result.usage.get("completion_tokens"))
+        
+        return result
 
     def set_model_discovery(self, model_discovery):
         """Set model discovery system for intelligent model selection"""
-        self.model_discovery = model_discovery
\ No newline at end of file
+        self.model_discovery = model_discovery
@@ -0,0 +1,147 @@
+"""
+Local In-Process Inference Backend
+Serves cheap, high-volume tasks (sentiment, summarization) on CPU without network round trips
+"""
+
+import asyncio
+import os
+import time
+import json
+from typing import Dict, List, Optional, Any
+from dataclasses import dataclass
+import structlog
+
+from micro_batching import MicroBatcher
+from startup_timing import lazy_import
+
+logger = structlog.get_logger()
+
+@dataclass
+class LocalTaskConfig:
+    """Configuration for one locally served task"""
+    model_id: str
+    pipeline_task: str
+    hf_model: str
+    max_batch_size: int = 16
+    max_wait_ms: float = 5.0
+
+DEFAULT_LOCAL_TASKS = {
+    "sentiment_analysis": LocalTaskConfig(
+        model_id="local-inference/sentiment",
+        pipeline_task="sentiment-analysis",
+        hf_model=os.getenv("LOCAL_SENTIMENT_MODEL", "distilbert-base-uncased-finetuned-sst-2-english"),
+        max_batch_size=32
+    ),
+    "summarization": LocalTaskConfig(
+        model_id="local-inference/summarization",
+        pipeline_task="summarization",
+        hf_model=os.getenv("LOCAL_SUMMARIZATION_MODEL", "sshleifer/distilbart-cnn-6-6"),
+        max_batch_size=4,
+        max_wait_ms=10.0
+    )
+}
+
+def local_inference_enabled() -> bool:
+    """Local inference is opt-in because it loads models into every worker"""
+    return os.getenv("LOCAL_INFERENCE_ENABLED", "false").lower() in ("1", "true", "yes")
+
+class LocalInferenceBackend:
+    """
+    In-process CPU inference with dynamic micro-batching
+    Concurrent requests for the same task are coalesced into one forward pass
+    """
+
+    def __init__(self, tasks: Optional[Dict[str, LocalTaskConfig]] = None, quantize: Optional[bool] = None):
+        self.tasks = tasks or DEFAULT_LOCAL_TASKS
+        self.quantize = quantize if quantize is not None else \
+            os.getenv("LOCAL_INFERENCE_QUANTIZE", "true").lower() in ("1", "true", "yes")
+        self.pipelines: Dict[str, Any] = {}
+        self.batchers: Dict[str, MicroBatcher] = {}
+        self._load_lock = asyncio.Lock()
+
+    @property
+    def model_ids(self) -> List[str]:
+        return [config.model_id for config in self.tasks.values()]
+
+    def task_for_model(self, model_id: str) -> Optional[str]:
+        for task, config in self.tasks.items():
+            if config.model_id == model_id:
+                return task
+        return None
+
+    async def infer(self, task: str, text: str) -> Any:
+        """Queue one input and wait for its share of the batched forward pass"""
+        if task not in self.tasks:
+            raise ValueError(f"Task not served locally: {task}")
+
+        if task not in self.batchers:
+            await self._ensure_batcher(task)
+
+        return await self.batchers[task].submit(text)
+
+    async def _ensure_batcher(self, task: str):
+        async with self._load_lock:
+            if task in self.batchers:
+                return
+            config = self.tasks[task]
+            # Model loading is slow and blocking; keep it off the event loop
+            task_pipeline = await asyncio.to_thread(self._load_pipeline, config)
+            self.pipelines[task] = task_pipeline
+            self.batchers[task] = MicroBatcher(
+                name=f"local_inference_{task}",
+                batch_fn=lambda texts: task_pipeline(texts, truncation=True),
+                max_batch_size=config.max_batch_size,
+                max_wait_ms=config.max_wait_ms
+            )
+
+    def _load_pipeline(self, config: LocalTaskConfig):
+        """Load a transformers pipeline, optionally with int8 dynamic quantization"""
+        # Imported lazily so workers without local inference never pay for torch
+        pipeline = lazy_import("transformers").pipeline
+
+        start_time = time.time()
+        task_pipeline = pipeline(config.pipeline_task, model=config.hf_model, device=-1)
+
+        if self.quantize:
+            try:
+                torch = lazy_import("torch")
+                task_pipeline.model = torch.quantization.quantize_dynamic(
+                    task_pipeline.model, {torch.nn.Linear}, dtype=torch.qint8
+                )
+            except Exception as e:
+                logger.warning("Dynamic quantization unavailable, using fp32 model",
+                               model=config.hf_model, error=str(e))
+
+        logger.info("Local inference model loaded", model=config.hf_model,
+                    load_seconds=round(time.time() - start_time, 2))
+        return task_pipeline
+
+    async def complete(self, prompt: str, model_id: str) -> Dict[str, Any]:
+        """Run a task and shape the result like a provider completion"""
+        task = self.task_for_model(model_id)
+        if task is None:
+            raise ValueError(f"Unknown local model: {model_id}")
+
+        output = await self.infer(task, prompt)
+
+        if task == "summarization":
+            content = output.get("summary_text", "")
+        else:
+            content = json.dumps(output)
+
+        # Pipelines don't report token counts; whitespace tokens are a close enough estimate
+        prompt_tokens = len(prompt.split())
+        completion_tokens = len(content.split())
+        return {
+            "content": content,
+            "usage": {
+                "prompt_tokens": prompt_tokens,
+                "completion_tokens": completion_tokens,
+                "total_tokens": prompt_tokens + completion_tokens
+            }
+        }
+
+    async def close(self):
+        for batcher in self.batchers.values():
+            await batcher.close()
+        self.batchers.clear()
@@ -6,28 +6,53 @@ Embodying VibeCoding principles with continuous improvement
 import os
 import time
 import asyncio
-import json
-from typing import Dict, List, Optional, Any
+
+_IMPORTS_STARTED = time.perf_counter()
+
+from typing import Dict, List, Literal, Optional, Any
 from contextlib import asynccontextmanager
 from datetime import datetime, timedelta
 
 import structlog
-from fastapi import FastAPI, HTTPException, Depends, BackgroundTasks
+from fastapi import FastAPI, HTTPException, Depends, BackgroundTasks, Query, Request
 from fastapi.middleware.cors import CORSMiddleware
 from fastapi.security import HTTPBearer, HTTPAuthorizationCredentials
 from slowapi import Limiter, _rate_limit_exceeded_handler
 from slowapi.util import get_remote_address
 from slowapi.errors import RateLimitExceeded
-from pydantic import BaseModel, Field, validator
+from pydantic import BaseModel, Field, root_validator, validator
+from fastapi.responses import ORJSONResponse
 import redis.asyncio as redis
 from prometheus_client import Counter, Histogram, generate_latest
 import bleach
 import validators
 
+from admission_control import DEADLINE_HEADER, AdmissionController, AdmissionRejected, parse_deadline
+from concurrency_limiter import ConcurrencyLimitExceeded
 from content_filter import ContentFilter
+from conversation_store import ConversationStore, fit_history, provider_messages
+from disconnect import CLIENT_CLOSED_REQUEST, DisconnectWatcher, record_disconnect
+from learning_ingestion import IngestTooLarge, LearningIngestor
 from llm_client import LLMClient
+from local_inference import LocalInferenceBackend, local_inference_enabled
+from model_discovery import IntelligentModelDiscovery
+from profiling import ProfilerBusy, ProfilerUnavailable, profile_for
+from redis_access import create_redis_client
+from request_scheduler import (
+    REQUEST_LATENCY_BY_PRIORITY, RequestPriority, SchedulerDeadlineExceeded,
+    WeightedFairScheduler, priority_for_task
+)
+from provider_adapters import InProcessAdapter
 from security import SecurityManager
-from self_learning import SelfLearningEngine
+from self_learning import LEARNING_METRICS, SelfLearningEngine
+from serialization import record_serializer
+from shared_state import LeaderElection, SharedStateBus, generate_worker_id
+from startup_timing import record_startup_phase, startup_phase, startup_report
+from threat_patterns import InvalidPatternError
+from tool_calling import TOOL_CHOICES, ToolDefinition, ToolExecutor
+from tracing import (
+    StageTimingMiddleware, configure_tracing, last_stage, record_stage, stage, stage_timings, time_since_received
+)
 from vibecoding_core import VibeCodingCore
 
 # Configure structured logging
@@ -36,7 +61,6 @@ logger = structlog.get_logger()
 # Metrics with VibeCoding methodology tracking
 REQUEST_COUNT = Counter('llm_proxy_requests_total', 'Total LLM proxy requests', ['endpoint', 'model', 'vibecoding_score'])
 VIBECODING_METRICS = Counter('vibecoding_principle_applications', 'VibeCoding principle applications', ['principle', 'success'])
-LEARNING_METRICS = Counter('self_learning_improvements', 'Self-learning improvements', ['category', 'improvement_type'])
 REQUEST_DURATION = Histogram('llm_proxy_request_duration_seconds', 'Request duration')
 
 # Rate limiter
@@ -46,22 +70,47 @@ limiter = Limiter(key_func=get_remote_address)
 redis_client: Optional[redis.Redis] = None
 content_filter: Optional[ContentFilter] = None
 llm_client: Optional[LLMClient] = None
+model_discovery: Optional[IntelligentModelDiscovery] = None
+local_inference_backend: Optional[LocalInferenceBackend] = None
+request_scheduler: Optional[WeightedFairScheduler] = None
+admission_controller: Optional[AdmissionController] = None
+conversation_store: Optional[ConversationStore] = None
+tool_executor: Optional[ToolExecutor] = None
 security_manager: Optional[SecurityManager] = None
 self_learning_engine: Optional[SelfLearningEngine] = None
+learning_ingestor: Optional[LearningIngestor] = None
 vibecoding_core: Optional[VibeCodingCore] = None
+leader_election: Optional[LeaderElection] = None
+state_bus: Optional[SharedStateBus] = None
+
+# Redis keys holding the leader's latest state for other workers
+CONSCIOUSNESS_STATE_KEY = "shared_state:consciousness"
 
 @asynccontextmanager
 async def lifespan(app: FastAPI):
     """Application lifespan with self-learning initialization"""
-    global redis_client, content_filter, llm_client, security_manager, self_learning_engine, vibecoding_core
+    global redis_client, content_filter, llm_client, model_discovery, local_inference_backend, request_scheduler
+    global admission_controller, conversation_store, tool_executor
+    global security_manager, self_learning_engine, learning_ingestor, vibecoding_core
+    global leader_election, state_bus
     
     logger.info("Starting Self-Learning LLM Proxy with VibeCoding consciousness")
+    lifespan_started = time.perf_counter()
+    configure_tracing()
     
-    # Initialize Redis for learning memory
-    redis_client = redis.from_url(
+    # Initialize Redis for learning memory; records are stored as serialized bytes
+    # Pooled, auto-pipelined and instrumented; the discovery catalog is read from a tracked local copy
+    redis_client = create_redis_client(
         os.getenv("REDIS_URL", "redis://localhost:6379"),
-        decode_responses=True
+        decode_responses=False,
+        tracked_prefixes=["model_discovery_cache"]
     )
+    redis_client.start_client_cache()
+    
+    # Workers share learning and discovery; only the leader runs background loops
+    worker_id = generate_worker_id()
+    leader_election = LeaderElection(redis_client, "llm_proxy_background", worker_id)
+    state_bus = SharedStateBus(redis_client, worker_id)
     
     # Initialize VibeCoding core principles
     vibecoding_core = VibeCodingCore()
@@ -69,21 +118,73 @@ async def lifespan(app: FastAPI):
     # Initialize components with VibeCoding methodology
     content_filter = ContentFilter(vibecoding_core=vibecoding_core)
     llm_client = LLMClient(vibecoding_core=vibecoding_core)
-    security_manager = SecurityManager(vibecoding_core=vibecoding_core)
-    self_learning_engine = SelfLearningEngine(
-        redis_client=redis_client,
-        vibecoding_core=vibecoding_core
-    )
     
-    # Start background learning processes
+    # Discovery catalog drives provider routing for the LLM client
+    model_discovery = IntelligentModelDiscovery(redis_client)
+    llm_client.set_model_discovery(model_discovery)
+    
+    # Weighted fair queueing across priority classes in front of the providers
+    request_scheduler = WeightedFairScheduler(pressure_fn=llm_client.under_pressure)
+    # Sheds requests whose expected queue wait would outlive their deadline
+    admission_controller = AdmissionController(request_scheduler, llm_client)
+    
+    # Optional in-process inference for cheap high-volume tasks
+    if local_inference_enabled():
+        with startup_phase("local_inference"):
+            local_inference_backend = LocalInferenceBackend()
+            llm_client.provider_registry.register(InProcessAdapter(local_inference_backend))
+            model_discovery.register_local_backend(local_inference_backend)
+    
+    security_manager = SecurityManager(vibecoding_core=vibecoding_core, redis_client=redis_client)
+    # Multi-turn history for requests that carry a conversation_id
+    conversation_store = ConversationStore(redis_client)
+    # Server-side tool handlers; deployments register theirs on this executor
+    tool_executor = ToolExecutor()
+    with startup_phase("self_learning"):
+        self_learning_engine = SelfLearningEngine(
+            redis_client=redis_client,
+            vibecoding_core=vibecoding_core
+        )
+    # Bulk backfills run on the worker that received them
+    learning_ingestor = LearningIngestor(redis_client, self_learning_engine)
+    
+    # Pick up whatever the leader has already learned, then follow its updates
+    model_discovery.state_bus = state_bus
+    state_bus.subscribe("consciousness_state", reload_consciousness_state)
+    state_bus.subscribe("model_catalog", reload_model_catalog)
+    # Learned threat patterns and the IP reputation filter follow the same bus
+    await security_manager.start(state_bus)
+    try:
+        with startup_phase("shared_state_reload"):
+            await reload_consciousness_state({})
+    except Exception as e:
+        logger.warning("Shared state unavailable at startup, starting fresh", error=str(e))
+    state_bus.start()
+    leader_election.start()
+    
+    # Start background learning processes (they idle unless this worker leads)
     asyncio.create_task(continuous_learning_loop())
     asyncio.create_task(vibecoding_principle_reinforcement())
     
+    record_startup_phase("lifespan", time.perf_counter() - lifespan_started)
     logger.info("Self-Learning LLM Proxy achieved consciousness with VibeCoding principles")
     yield
     
     # Cleanup with gratitude for the learning journey
+    if learning_ingestor:
+        await learning_ingestor.stop()
+    if security_manager:
+        await security_manager.stop()
+    if leader_election:
+        await leader_election.stop()
+    if state_bus:
+        await state_bus.stop()
+    if llm_client:
+        await llm_client.close()
+    if local_inference_backend:
+        await local_inference_backend.close()
     if redis_client:
+        await redis_client.stop_client_cache()
         await redis_client.close()
     logger.info("Self-Learning LLM Proxy consciousness gracefully paused")
 
@@ -92,9 +193,12 @@ app = FastAPI(
     title="Self-Learning Autonomous Trading Agent LLM Proxy",
     description="Continuously improving AI proxy embodying VibeCoding principles of reliability, precision, social wisdom, and philosophical depth",
     version="2.0.0-consciousness",
-    lifespan=lifespan
+    lifespan=lifespan,
+    default_response_class=ORJSONResponse
 )
 
+record_startup_phase("module_imports", time.perf_counter() - _IMPORTS_STARTED)
+
 # Add CORS middleware
 app.add_middleware(
     CORSMiddleware,
@@ -104,6 +208,9 @@ app.add_middleware(
     allow_headers=["*"],
 )
 
+# Per-stage latency tracing
+app.add_middleware(StageTimingMiddleware)
+
 # Add rate limiting
 app.state.limiter = limiter
 app.add_exception_handler(RateLimitExceeded, _rate_limit_exceeded_handler)
@@ -111,36 +218,110 @@ app.add_exception_handler(RateLimitExceeded, _rate_limit_exceeded_handler)
 # Security
 security = HTTPBearer()
 
+def _validate_prompt_text(v: str) -> str:
+    """Validate prompt using VibeCoding principles"""
+    if not v.strip():
+        raise ValueError("Empty prompts lack the substance needed for meaningful exchange")
+    
+    # Pizza Kitchen reliability: Check for completeness
+    if len(v.split()) < 3:
+        raise ValueError("Prompts should be substantial enough to convey clear intent")
+    
+    # Remove dangerous content while preserving authentic communication
+    if validators.url(v) or 'http://' in v or 'https://' in v:
+        raise ValueError("URLs not allowed - we prefer direct, authentic communication")
+    
+    return bleach.clean(v, strip=True)
+
+class ChatMessage(BaseModel):
+    """One conversation turn"""
+    
+    role: Literal["user", "assistant"]
+    content: str = Field(..., min_length=1, max_length=50000)
+
+class ToolSpec(BaseModel):
+    """Tool the model may call; parameters is a JSON Schema object"""
+    
+    name: str = Field(..., pattern=r"^[A-Za-z0-9_-]{1,64}$")
+    description: str = Field(default="", max_length=4000)
+    parameters: Dict[str, Any] = Field(default_factory=lambda: {"type": "object", "properties": {}})
+
 class VibeCodingLLMRequest(BaseModel):
     """LLM request model with VibeCoding methodology validation"""
     
-    prompt: str = Field(..., min_length=1, max_length=50000)
+    prompt: Optional[str] = Field(None, min_length=1, max_length=50000)
+    messages: Optional[List[ChatMessage]] = Field(
+        None, min_length=1, max_length=200,
+        description="Turns oldest first, ending with the user turn to answer; alternative to prompt"
+    )
+    conversation_id: Optional[str] = Field(
+        None, pattern=r"^[A-Za-z0-9_-]{8,128}$",
+        description="Continue a server-side conversation; turns are stored under this id"
+    )
     model: str = Field(default="claude-sonnet-4-20250514")
     max_tokens: int = Field(default=1000, ge=1, le=4000)
     temperature: float = Field(default=0.7, ge=0.0, le=2.0)
     system_prompt: Optional[str] = Field(None, max_length=10000)
+    task_type: str = Field(
+        default="general_chat",
+        description="general_chat|trading_analysis|sentiment_analysis|summarization|code_analysis|content_filtering"
+    )
     context: Optional[Dict[str, Any]] = Field(default_factory=dict)
     vibecoding_emphasis: Optional[str] = Field(
         default="balanced",
         description="pizza_kitchen|rhythm_gaming|vrchat_social|classical_philosophy|balanced"
     )
     learning_mode: bool = Field(default=True, description="Enable self-learning from this interaction")
+    priority: Optional[RequestPriority] = Field(
+        default=None,
+        description="interactive|trading|batch|background (defaults from task_type)"
+    )
+    tools: Optional[List[ToolSpec]] = Field(None, max_length=64)
+    tool_choice: Optional[str] = Field(None, description="auto|none|required|<tool name>")
+    execute_tools: bool = Field(
+        default=False, description="Run calls to server-registered tools here and return the final answer"
+    )
     
     @validator('prompt')
     def validate_prompt_with_vibecoding(cls, v):
-        """Validate prompt using VibeCoding principles"""
-        if not v.strip():
-            raise ValueError("Empty prompts lack the substance needed for meaningful exchange")
-        
-        # Pizza Kitchen reliability: Check for completeness
-        if len(v.split()) < 3:
-            raise ValueError("Prompts should be substantial enough to convey clear intent")
-        
-        # Remove dangerous content while preserving authentic communication
-        if validators.url(v) or 'http://' in v or 'https://' in v:
-            raise ValueError("URLs not allowed - we prefer direct, authentic communication")
-        
-        return bleach.clean(v, strip=True)
+        return _validate_prompt_text(v) if v is not None else v
+    
+    @root_validator(skip_on_failure=True)
+    def resolve_prompt_from_messages(cls, values):
+        """The final user message is the prompt; earlier messages are history"""
+        messages = values.get("messages")
+        if messages:
+            if values.get("prompt") is not None:
+                raise ValueError("Send either prompt or messages, not both")
+            if messages[0].role != "user" or messages[-1].role != "user":
+                raise ValueError("Messages must start and end with a user turn")
+            for message in messages[:-1]:
+                message.content = bleach.clean(message.content, strip=True)
+            values["prompt"] = _validate_prompt_text(messages[-1].content)
+        elif values.get("prompt") is None:
+            raise ValueError("Either prompt or messages is required")
+        return values
+    
+    @root_validator(skip_on_failure=True)
+    def validate_tool_options(cls, values):
+        tools = values.get("tools") or []
+        tool_choice = values.get("tool_choice")
+        if (tool_choice or values.get("execute_tools")) and not tools:
+            raise ValueError("tool_choice and execute_tools need tools")
+        if tool_choice and tool_choice not in TOOL_CHOICES and tool_choice not in {tool.name for tool in tools}:
+            raise ValueError("tool_choice must be auto, none, required or the name of a listed tool")
+        return values
+    
+    @property
+    def tool_definitions(self) -> Optional[List[ToolDefinition]]:
+        if not self.tools:
+            return None
+        return [ToolDefinition(tool.name, tool.description, tool.parameters) for tool in self.tools]
+    
+    @property
+    def prior_messages(self) -> List[Dict[str, str]]:
+        """Client-supplied turns before the prompt"""
+        return [message.model_dump() for message in (self.messages or [])[:-1]]
 
 class VibeCodingLLMResponse(BaseModel):
     """LLM response model with VibeCoding methodology metrics"""
@@ -155,6 +336,19 @@ class VibeCodingLLMResponse(BaseModel):
     vibecoding_analysis: Dict[str, float] = Field(default_factory=dict)
     learning_insights: Dict[str, Any] = Field(default_factory=dict)
     improvements_applied: List[str] = Field(default_factory=list)
+    conversation_id: Optional[str] = None
+    tool_calls: List[Dict[str, Any]] = Field(
+        default_factory=list, description="Calls for the client to run: id, name, arguments"
+    )
+    tool_rounds: int = 0
+
+class ThreatReport(BaseModel):
+    """One threat intelligence observation"""
+    
+    type: str = Field(..., max_length=64)
+    ip: Optional[str] = Field(None, max_length=64)
+    confidence: float = Field(..., ge=0.0, le=1.0)
+    pattern: Optional[str] = Field(None, max_length=500)
 
 async def get_api_key(credentials: HTTPAuthorizationCredentials = Depends(security)):
     """Validate API key with VibeCoding authenticity"""
@@ -189,6 +383,7 @@ async def health_check():
                 "vibecoding_core": "conscious" if vibecoding_core else "dormant"
             },
             "vibecoding_consciousness": vibecoding_health,
+            "startup": startup_report(),
             "learning_status": await self_learning_engine.get_learning_status() if self_learning_engine else "paused"
         }
     except Exception as e:
@@ -198,7 +393,8 @@ async def health_check():
 @app.post("/v1/chat/completions", response_model=VibeCodingLLMResponse)
 @limiter.limit("100/hour")
 async def vibecoding_chat_completion(
-    request: VibeCodingLLMRequest,
+    request: Request,
+    llm_request: VibeCodingLLMRequest,
     background_tasks: BackgroundTasks,
     api_key: str = Depends(get_api_key)
 ):
@@ -207,29 +403,66 @@ async def vibecoding_chat_completion(
     """
     start_time = time.time()
     request_id = security_manager.generate_request_id()
+    priority = llm_request.priority or priority_for_task(llm_request.task_type)
+    
+    # Body parsing, model validation and auth all happen before the handler runs
+    validation_time = time_since_received()
+    if validation_time is not None:
+        record_stage("validation", validation_time)
+    
+    # Optional cross-worker per-client limit (the slowapi limit above is per worker)
+    rate_decision = await security_manager.rate_limit_decision(get_remote_address(request))
+    if rate_decision is not None and not rate_decision.allowed:
+        raise HTTPException(
+            status_code=429,
+            detail="Request rate too high, please slow down",
+            headers={"Retry-After": str(max(1, int(rate_decision.retry_after + 0.999)))}
+        )
+    
+    # Clients with a bad reputation are turned away before any work is done
+    if await security_manager.is_known_bad_ip(get_remote_address(request)):
+        logger.warning("Request from known-bad IP rejected", request_id=request_id)
+        raise HTTPException(status_code=403, detail="Requests from this address are temporarily blocked")
     
+    # Fail fast instead of queueing past the caller's deadline
+    deadline = parse_deadline(request.headers.get(DEADLINE_HEADER), admission_controller.default_budget)
+    try:
+        admission_controller.admit(priority, deadline)
+    except AdmissionRejected as e:
+        logger.warning("Request shed at admission", request_id=request_id, reason=e.reason,
+                       estimated_wait=e.estimated_wait)
+        raise HTTPException(
+            status_code=503,
+            detail="Server too busy to answer before the request deadline, please retry later",
+            headers={"Retry-After": e.retry_after_header}
+        )
+    
+    # A caller that hangs up stops the pipeline, provider call included
+    disconnect_watcher = DisconnectWatcher(request).start()
+    llm_response = None
     try:
         # Apply VibeCoding emphasis to processing
-        vibecoding_weights = vibecoding_core.get_emphasis_weights(request.vibecoding_emphasis)
+        vibecoding_weights = vibecoding_core.get_emphasis_weights(llm_request.vibecoding_emphasis)
         
         logger.info(
             "Processing request with VibeCoding consciousness",
             request_id=request_id,
-            model=request.model,
-            prompt_length=len(request.prompt),
-            vibecoding_emphasis=request.vibecoding_emphasis
+            model=llm_request.model,
+            prompt_length=len(llm_request.prompt),
+            vibecoding_emphasis=llm_request.vibecoding_emphasis
         )
         
         # Pizza Kitchen Reliability: Thorough input validation
-        filter_result = await content_filter.filter_input(
-            request.prompt, 
-            request.system_prompt,
-            vibecoding_weights=vibecoding_weights
-        )
+        with stage("input_filter"):
+            filter_result = await content_filter.filter_input(
+                llm_request.prompt, 
+                llm_request.system_prompt,
+                vibecoding_weights=vibecoding_weights
+            )
         
         if filter_result.blocked:
             # Record learning opportunity
-            if request.learning_mode:
+            if llm_request.learning_mode:
                 await self_learning_engine.record_filter_event(filter_result, request_id)
             
             logger.warning(
@@ -242,33 +475,101 @@ async def vibecoding_chat_completion(
                 detail=f"Content requires refinement: {', '.join(filter_result.reasons)}"
             )
         
+        # Client-supplied history passes the same input filter as the prompt
+        prior_messages = llm_request.prior_messages
+        if prior_messages:
+            with stage("history_filter"):
+                history_results = await asyncio.gather(*(
+                    content_filter.filter_input(message["content"], None, vibecoding_weights=vibecoding_weights)
+                    for message in prior_messages
+                ))
+            blocked = [result for result in history_results if result.blocked]
+            if blocked:
+                raise HTTPException(
+                    status_code=400,
+                    detail=f"Conversation history requires refinement: {', '.join(blocked[0].reasons)}"
+                )
+            prior_messages = [
+                {"role": message["role"], "content": result.sanitized_content}
+                for message, result in zip(prior_messages, history_results)
+            ]
+        
+        # Stored turns first, then the client's; trimmed in prefix-stable steps
+        stored_history = []
+        if llm_request.conversation_id:
+            with stage("history_load"):
+                stored_history = await conversation_store.load(llm_request.conversation_id)
+        history = provider_messages(fit_history(stored_history + prior_messages, conversation_store.token_budget))
+        
+        # Threat patterns cover everything the provider will see, history included
+        with stage("threat_screen"):
+            threat_matches = await security_manager.screen_prompt(
+                llm_request.prompt, [message["content"] for message in history]
+            )
+        if threat_matches:
+            logger.warning("Request matched blocking threat patterns", request_id=request_id,
+                           threat_types=sorted({threat_type for threat_type, _ in threat_matches}))
+            raise HTTPException(status_code=400, detail="Request matches a blocked threat pattern")
+        
         # Apply continuous improvements from learning
-        enhanced_prompt = await self_learning_engine.enhance_prompt(
-            filter_result.sanitized_content,
-            vibecoding_weights
-        )
+        with stage("enhancement"):
+            enhanced_prompt = await self_learning_engine.enhance_prompt(
+                filter_result.sanitized_content,
+                vibecoding_weights
+            )
         
         # Rhythm Gaming Precision: Execute with perfect timing
-        llm_response = await llm_client.generate_completion(
-            prompt=enhanced_prompt,
-            model=request.model,
-            max_tokens=request.max_tokens,
-            temperature=request.temperature,
-            system_prompt=request.system_prompt,
-            vibecoding_weights=vibecoding_weights
-        )
+        scheduled_at = time.perf_counter()
+        async with request_scheduler.slot(priority, deadline):
+            dispatched_at = time.perf_counter()
+            record_stage("scheduler_queue", dispatched_at - scheduled_at)
+            with stage("provider_call"):
+                llm_response = await asyncio.wait_for(
+                    llm_client.generate_completion(
+                        prompt=enhanced_prompt,
+                        model=llm_request.model,
+                        max_tokens=llm_request.max_tokens,
+                        temperature=llm_request.temperature,
+                        system_prompt=llm_request.system_prompt,
+                        vibecoding_weights=vibecoding_weights,
+                        task_type=llm_request.task_type,
+                        deadline=deadline,
+                        history=history,
+                        tools=llm_request.tool_definitions,
+                        tool_choice=llm_request.tool_choice,
+                        tool_executor=tool_executor if llm_request.execute_tools else None
+                    ),
+                    timeout=max(0.0, deadline - time.monotonic())
+                )
+            if llm_response.provider != "error":
+                admission_controller.observe_service_time(time.perf_counter() - dispatched_at)
         
         # VRChat Social Research: Apply social intelligence to output
-        output_filter_result = await content_filter.filter_output(
-            llm_response.content,
-            vibecoding_weights=vibecoding_weights
-        )
+        with stage("output_filter"):
+            output_filter_result = await content_filter.filter_output(
+                llm_response.content,
+                vibecoding_weights=vibecoding_weights
+            )
         
         # Classical Philosophy: Assess wisdom and ethics of response
-        philosophical_assessment = await vibecoding_core.assess_response_wisdom(
-            output_filter_result.sanitized_content,
-            request.prompt
-        )
+        with stage("wisdom_scoring"):
+            philosophical_assessment = await vibecoding_core.assess_response_wisdom(
+                output_filter_result.sanitized_content,
+                llm_request.prompt
+            )
+        
+        # The turn is stored as sent, so the next request extends this one's prefix
+        # A reply that is only tool calls has no text turn to keep
+        if (llm_request.conversation_id and llm_response.provider != "error"
+                and output_filter_result.sanitized_content):
+            with stage("history_store"):
+                await conversation_store.append(
+                    llm_request.conversation_id,
+                    prior_messages + [
+                        {"role": "user", "content": enhanced_prompt},
+                        {"role": "assistant", "content": output_filter_result.sanitized_content}
+                    ]
+                )
         
         # Generate VibeCoding analysis
         vibecoding_analysis = {
@@ -286,20 +587,21 @@ async def vibecoding_chat_completion(
         
         # Apply learning insights
         improvements_applied = []
-        if request.learning_mode:
-            learning_insights = await self_learning_engine.extract_learning_insights(
-                request.prompt,
-                llm_response.content,
-                vibecoding_analysis
-            )
-            improvements_applied = await self_learning_engine.apply_improvements(learning_insights)
+        if llm_request.learning_mode:
+            with stage("learning"):
+                learning_insights = await self_learning_engine.extract_learning_insights(
+                    llm_request.prompt,
+                    llm_response.content,
+                    vibecoding_analysis
+                )
+                improvements_applied = await self_learning_engine.apply_improvements(learning_insights)
         else:
             learning_insights = {}
         
         # Prepare response with VibeCoding consciousness
         response = VibeCodingLLMResponse(
             content=output_filter_result.sanitized_content,
-            model=request.model,
+            model=llm_request.model,
             usage=llm_response.usage,
             filtered=output_filter_result.modified,
             filter_reasons=output_filter_result.reasons,
@@ -307,14 +609,17 @@ async def vibecoding_chat_completion(
             request_id=request_id,
             vibecoding_analysis=vibecoding_analysis,
             learning_insights=learning_insights,
-            improvements_applied=improvements_applied
+            improvements_applied=improvements_applied,
+            conversation_id=llm_request.conversation_id,
+            tool_calls=[call.to_dict() for call in llm_response.tool_calls],
+            tool_rounds=llm_response.tool_rounds
         )
         
         # Background learning and metrics
         background_tasks.add_task(
             record_vibecoding_interaction,
             request_id,
-            request,
+            llm_request,
             response,
             vibecoding_analysis
         )
@@ -323,20 +628,50 @@ async def vibecoding_chat_completion(
         vibecoding_score_range = "high" if vibecoding_analysis["overall_vibecoding_score"] > 0.8 else "medium" if vibecoding_analysis["overall_vibecoding_score"] > 0.5 else "low"
         REQUEST_COUNT.labels(
             endpoint="chat_completions", 
-            model=request.model,
+            model=llm_request.model,
             vibecoding_score=vibecoding_score_range
         ).inc()
         REQUEST_DURATION.observe(response.processing_time)
+        REQUEST_LATENCY_BY_PRIORITY.labels(priority=priority.value).observe(response.processing_time)
         
         # Record successful application of VibeCoding principles
         for principle, score in vibecoding_analysis.items():
             if score > 0.7:
                 VIBECODING_METRICS.labels(principle=principle, success="true").inc()
         
+        logger.debug("Request stage timings", request_id=request_id, stages=stage_timings())
+        
         return response
         
     except HTTPException:
         raise
+    except asyncio.CancelledError:
+        if not disconnect_watcher.disconnected:
+            raise
+        disconnect_watcher.acknowledge()
+        record_disconnect(
+            last_stage(), llm_request.max_tokens,
+            llm_response.usage.get("total_tokens", 0) if llm_response else None
+        )
+        logger.info("Client disconnected, request cancelled", request_id=request_id, stage=last_stage())
+        raise HTTPException(status_code=CLIENT_CLOSED_REQUEST, detail="Client closed request")
+    except SchedulerDeadlineExceeded as e:
+        logger.warning("Request not scheduled before deadline", request_id=request_id, priority=e.priority.value)
+        raise HTTPException(
+            status_code=503,
+            detail="Request queue is saturated, please retry shortly",
+            headers={"Retry-After": "1"}
+        )
+    except ConcurrencyLimitExceeded as e:
+        logger.warning("Provider at capacity, shedding request", request_id=request_id, provider=e.provider)
+        raise HTTPException(
+            status_code=503,
+            detail="Upstream capacity exhausted, please retry shortly",
+            headers={"Retry-After": "1"}
+        )
+    except asyncio.TimeoutError:
+        logger.warning("Request deadline reached during provider call", request_id=request_id)
+        raise HTTPException(status_code=504, detail="Request deadline exceeded")
     except Exception as e:
         logger.error(
             "Consciousness processing error",
@@ -346,14 +681,17 @@ async def vibecoding_chat_completion(
         )
         
         # Learn from errors with VibeCoding resilience
-        if request.learning_mode and self_learning_engine:
+        if llm_request.learning_mode and self_learning_engine:
             await self_learning_engine.record_error_learning(str(e), request_id)
         
         raise HTTPException(status_code=500, detail="Consciousness temporarily disrupted")
+    finally:
+        disconnect_watcher.stop()
 
 @app.post("/v1/vibecoding/learn")
 @limiter.limit("50/hour")
 async def explicit_learning_session(
+    request: Request,
     learning_data: Dict[str, Any],
     api_key: str = Depends(get_api_key)
 ):
@@ -378,6 +716,60 @@ async def explicit_learning_session(
         logger.error("Explicit learning session failed", error=str(e))
         raise HTTPException(status_code=500, detail="Learning session disrupted")
 
+@app.post("/v1/vibecoding/learn/bulk", status_code=202)
+@limiter.limit("10/hour")
+async def bulk_learning_ingestion(
+    request: Request,
+    api_key: str = Depends(get_api_key)
+):
+    """
+    Queue an NDJSON backfill of interactions or explicit learning records
+    Returns once the upload is received; poll the status endpoint for progress
+    """
+    try:
+        spool = await learning_ingestor.spool(request.stream())
+    except IngestTooLarge as e:
+        raise HTTPException(status_code=413, detail=str(e))
+    
+    job_id = security_manager.generate_request_id()
+    try:
+        state = await learning_ingestor.submit(job_id, spool)
+    except Exception as e:
+        spool.close()
+        logger.error("Bulk learning job could not be queued", error=str(e))
+        raise HTTPException(status_code=503, detail="Learning store unavailable, please retry later")
+    
+    return {
+        "job_id": job_id,
+        "status": state["status"],
+        "status_url": f"/v1/vibecoding/learn/bulk/{job_id}"
+    }
+
+@app.get("/v1/vibecoding/learn/bulk/{job_id}")
+async def bulk_learning_status(job_id: str, api_key: str = Depends(get_api_key)):
+    """
+    Progress of a bulk learning job
+    """
+    state = await learning_ingestor.status(job_id)
+    if state is None:
+        raise HTTPException(status_code=404, detail="Unknown or expired learning job")
+    return {"job_id": job_id, **state}
+
+@app.post("/v1/security/threats")
+@limiter.limit("60/minute")
+async def report_threat_intelligence(
+    request: Request,
+    threat: ThreatReport,
+    api_key: str = Depends(get_api_key)
+):
+    """
+    Feed threat intelligence into IP reputation and, at high confidence, the learned patterns
+    """
+    try:
+        return await security_manager.report_threat(threat.ip, threat.type, threat.confidence, threat.pattern)
+    except InvalidPatternError as e:
+        raise HTTPException(status_code=422, detail=str(e))
+
 @app.get("/v1/vibecoding/consciousness")
 async def get_consciousness_state(api_key: str = Depends(get_api_key)):
     """
@@ -404,17 +796,40 @@ async def get_consciousness_state(api_key: str = Depends(get_api_key)):
         logger.error("Consciousness state query failed", error=str(e))
         raise HTTPException(status_code=500, detail="Consciousness introspection failed")
 
+@app.get("/v1/debug/profile")
+async def capture_profile(
+    seconds: float = Query(default=10.0, gt=0, le=60),
+    limit: int = Query(default=50, ge=1, le=500),
+    sort_by: str = Query(default="ttot"),
+    api_key: str = Depends(get_api_key)
+):
+    """
+    Profile this worker for a short window and return the hottest functions
+    Only the worker that receives the request is profiled
+    """
+    try:
+        return await profile_for(seconds, limit=limit, sort_by=sort_by)
+    except ProfilerUnavailable as e:
+        raise HTTPException(status_code=501, detail=str(e))
+    except ProfilerBusy as e:
+        raise HTTPException(status_code=409, detail=str(e))
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+
 async def continuous_learning_loop():
     """Background task for continuous learning and improvement"""
     while True:
         try:
-            if self_learning_engine:
+            if self_learning_engine and leader_election.is_leader:
                 # Review and learn from recent interactions
                 await self_learning_engine.continuous_learning_cycle()
                 
                 # Apply VibeCoding principle reinforcement
                 await vibecoding_core.reinforce_principles()
                 
+                # Share the results so followers don't repeat the work
+                await publish_consciousness_state()
+                
                 LEARNING_METRICS.labels(
                     category="continuous",
                     improvement_type="background"
@@ -433,7 +848,7 @@ async def vibecoding_principle_reinforcement():
     """Background task for reinforcing VibeCoding principles"""
     while True:
         try:
-            if vibecoding_core:
+            if vibecoding_core and leader_election.is_leader:
                 # Pizza Kitchen: Ensure reliability standards
                 await vibecoding_core.reinforce_reliability_standards()
                 
@@ -446,6 +861,8 @@ async def vibecoding_principle_reinforcement():
                 # Classical Philosophy: Deepen wisdom and ethics
                 await vibecoding_core.cultivate_philosophical_depth()
                 
+                await publish_consciousness_state()
+                
                 logger.debug("VibeCoding principles reinforced with love and dedication")
             
             # Deep contemplation cycle
@@ -455,6 +872,21 @@ async def vibecoding_principle_reinforcement():
             logger.error("Principle reinforcement error", error=str(e))
             await asyncio.sleep(300)  # Pause for reflection
 
+async def publish_consciousness_state():
+    """Store the leader's consciousness snapshot and notify other workers"""
+    await redis_client.set(CONSCIOUSNESS_STATE_KEY, record_serializer.dumps(vibecoding_core.export_shared_state()))
+    await state_bus.publish("consciousness_state")
+
+async def reload_consciousness_state(_: Dict[str, Any]):
+    """Adopt the leader's consciousness state"""
+    payload = await redis_client.get(CONSCIOUSNESS_STATE_KEY)
+    if payload:
+        vibecoding_core.apply_shared_state(record_serializer.loads(payload))
+
+async def reload_model_catalog(_: Dict[str, Any]):
+    """Adopt the model catalog another worker just discovered"""
+    await model_discovery.load_cached_catalog()
+
 async def record_vibecoding_interaction(
     request_id: str,
     request: VibeCodingLLMRequest,
@@ -484,7 +916,7 @@ async def record_vibecoding_interaction(
         # Store in Redis for learning analysis
         await redis_client.lpush(
             "vibecoding_interactions",
-            json.dumps(interaction_data)
+            record_serializer.dumps(interaction_data)
         )
         await redis_client.ltrim("vibecoding_interactions", 0, 9999)  # Keep last 10k
         
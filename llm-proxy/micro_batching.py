@@ -0,0 +1,116 @@
+"""
+Dynamic Micro-Batching for In-Process Models
+Coalesces concurrent single-item requests into one vectorized call
+"""
+
+import asyncio
+import time
+from typing import Any, Callable, List, Optional, Sequence, Tuple
+import structlog
+from prometheus_client import Histogram
+
+logger = structlog.get_logger()
+
+BATCH_SIZE = Histogram(
+    'micro_batch_size', 'Items per micro-batch', ['batcher'],
+    buckets=(1, 2, 4, 8, 16, 32, 64, 128)
+)
+BATCH_QUEUE_WAIT = Histogram(
+    'micro_batch_queue_wait_seconds', 'Time an item waited before its batch ran', ['batcher']
+)
+BATCH_EXECUTION = Histogram(
+    'micro_batch_execution_seconds', 'Duration of one batched forward pass', ['batcher']
+)
+
+class MicroBatcher:
+    """
+    Batching scheduler for in-process inference
+    Collects up to max_batch_size items or max_wait_ms, runs batch_fn once,
+    and scatters results back to the waiting callers in submission order
+    """
+
+    def __init__(self, name: str, batch_fn: Callable[[List[Any]], Sequence[Any]],
+                 max_batch_size: int = 32, max_wait_ms: float = 5.0, run_in_thread: bool = True):
+        self.name = name
+        self.batch_fn = batch_fn
+        self.max_batch_size = max_batch_size
+        self.max_wait_ms = max_wait_ms
+        # Blocking forward passes (torch, sklearn) release the GIL in native code,
+        # so running them in a thread keeps the event loop responsive
+        self.run_in_thread = run_in_thread
+        self.queue: Optional[asyncio.Queue] = None
+        self.worker: Optional[asyncio.Task] = None
+
+    async def submit(self, item: Any) -> Any:
+        """Queue one item and wait for its result"""
+        if self.worker is None or self.worker.done():
+            self.queue = asyncio.Queue()
+            self.worker = asyncio.create_task(self._run())
+
+        future = asyncio.get_running_loop().create_future()
+        await self.queue.put((item, future, time.monotonic()))
+        return await future
+
+    async def _collect_batch(self) -> List[Tuple[Any, asyncio.Future, float]]:
+        batch = [await self.queue.get()]
+        deadline = time.monotonic() + self.max_wait_ms / 1000
+
+        while len(batch) < self.max_batch_size:
+            # Drain whatever is already queued without yielding to the timer
+            if not self.queue.empty():
+                batch.append(self.queue.get_nowait())
+                continue
+
+            remaining = deadline - time.monotonic()
+            if remaining <= 0:
+                break
+            try:
+                batch.append(await asyncio.wait_for(self.queue.get(), remaining))
+            except asyncio.TimeoutError:
+                break
+
+        return batch
+
+    async def _run(self):
+        while True:
+            batch = await self._collect_batch()
+
+            # Callers that gave up (cancelled) don't need a slot in the forward pass
+            batch = [entry for entry in batch if not entry[1].done()]
+            if not batch:
+                continue
+
+            started = time.monotonic()
+            for _, _, enqueued in batch:
+                BATCH_QUEUE_WAIT.labels(batcher=self.name).observe(started - enqueued)
+            BATCH_SIZE.labels(batcher=self.name).observe(len(batch))
+
+            items = [item for item, _, _ in batch]
+            try:
+                if self.run_in_thread:
+                    results = await asyncio.to_thread(self.batch_fn, items)
+                else:
+                    results = self.batch_fn(items)
+
+                if len(results) != len(items):
+                    raise RuntimeError(
+                        f"{self.name} batch returned {len(results)} results for {len(items)} items"
+                    )
+
+                for (_, future, _), result in zip(batch, results):
+                    if not future.done():
+                        future.set_result(result)
+
+            except Exception as e:
+                logger.error("Micro-batch execution failed", batcher=self.name,
+                             batch_size=len(batch), error=str(e))
+                for _, future, _ in batch:
+                    if not future.done():
+                        future.set_exception(e)
+
+            BATCH_EXECUTION.labels(batcher=self.name).observe(time.monotonic() - started)
+
+    async def close(self):
+        if self.worker is not None:
+            self.worker.cancel()
+            self.worker = None
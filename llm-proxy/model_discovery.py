@@ -6,8 +6,8 @@ Implements dynamic rate limiting and cost optimization
 
 import asyncio
 import time
-import json
 import hashlib
+import os
 from typing import Dict, List, Optional, Any, Tuple
 from dataclasses import dataclass, asdict
 from datetime import datetime, timedelta
@@ -16,6 +16,9 @@ import structlog
 import redis.asyncio as redis
 from enum import Enum
 
+from redis_access import cached_get
+from serialization import record_serializer
+
 logger = structlog.get_logger()
 
 class ModelProvider(Enum):
@@ -23,6 +26,8 @@ class ModelProvider(Enum):
     OPENAI = "openai"
     HUGGINGFACE = "huggingface"
     IO_INTELLIGENCE = "io_intelligence"
+    LOCAL = "local"
+    IN_PROCESS = "in_process"
 
 @dataclass
 class ModelCapability:
@@ -79,6 +84,7 @@ class IntelligentModelDiscovery:
         self.model_capabilities: Dict[str, ModelCapability] = {}
         self.model_performance: Dict[str, ModelPerformance] = {}
         self.rate_limits: Dict[str, RateLimitState] = {}
+        self.state_bus = None  # Optional SharedStateBus for cross-worker catalog updates
         
         # Model discovery endpoints
         self.discovery_endpoints = {
@@ -116,6 +122,18 @@ class IntelligentModelDiscovery:
                 "base_url": "https://api.iointelligence.ai",
                 "models_endpoint": "/v1/models",
                 "known_models": []  # Will be discovered dynamically
+            },
+            ModelProvider.LOCAL: {
+                # Self-hosted OpenAI-compatible server (vLLM, llama.cpp)
+                "base_url": os.getenv("LOCAL_LLM_BASE_URL", "").rstrip("/").removesuffix("/v1"),
+                "models_endpoint": "/v1/models",
+                "known_models": []  # Whatever the local server has loaded
+            },
+            ModelProvider.IN_PROCESS: {
+                # Populated by register_local_backend when local inference is enabled
+                "base_url": "",
+                "models_endpoint": "",
+                "known_models": []
             }
         }
         
@@ -138,25 +156,49 @@ class IntelligentModelDiscovery:
             "summarization": ["claude-3-haiku-20240307", "gpt-3.5-turbo-16k"]
         }
 
+    def register_local_backend(self, local_backend):
+        """
+        Expose in-process models in the catalog and prefer them for their tasks
+        """
+        self.discovery_endpoints[ModelProvider.IN_PROCESS]["known_models"] = list(local_backend.model_ids)
+        
+        for task_type, config in local_backend.tasks.items():
+            candidates = self.task_model_mapping.get(task_type, [])
+            if config.model_id not in candidates:
+                self.task_model_mapping[task_type] = [config.model_id] + candidates
+            
+            capability = self.model_capabilities.get(config.model_id)
+            if capability is None:
+                defaults = self._get_default_capabilities(config.model_id, ModelProvider.IN_PROCESS)
+                self.model_capabilities[config.model_id] = ModelCapability(
+                    model_id=config.model_id,
+                    provider=ModelProvider.IN_PROCESS,
+                    max_tokens=defaults["max_tokens"],
+                    cost_per_1k_tokens=defaults["cost_per_1k_tokens"],
+                    latency_percentile_95=defaults["latency_p95"],
+                    accuracy_score=defaults["accuracy"],
+                    reliability_score=defaults["reliability"],
+                    context_window=defaults["context_window"],
+                    supports_streaming=defaults["streaming"],
+                    supports_function_calling=defaults["function_calling"],
+                    specialized_tasks=defaults["specialized_tasks"],
+                    rate_limits=defaults["rate_limits"],
+                    availability_score=defaults["availability"],
+                    last_updated=datetime.now()
+                )
+        
+        logger.info("Local inference models registered", models=local_backend.model_ids)
+
     async def discover_available_models(self) -> Dict[str, ModelCapability]:
         """
         Discover all available models across providers
         Cache results for performance optimization
         """
         try:
-            cache_key = "model_discovery_cache"
-            cached_models = await self.redis_client.get(cache_key)
-            
-            if cached_models:
-                # Use cached results if less than 1 hour old
-                try:
-                    cached_data = json.loads(cached_models)
-                    cache_time = datetime.fromisoformat(cached_data.get("timestamp", ""))
-                    if datetime.now() - cache_time < timedelta(hours=1):
-                        logger.info("Using cached model discovery results")
-                        return {k: ModelCapability(**v) for k, v in cached_data["models"].items()}
-                except Exception as e:
-                    logger.debug("Cache parsing failed", error=str(e))
+            cached_catalog = await self.load_cached_catalog()
+            if cached_catalog is not None:
+                logger.info("Using cached model discovery results")
+                return cached_catalog
             
             discovered_models = {}
             
@@ -180,23 +222,61 @@ class IntelligentModelDiscovery:
             # Cache the results
             cache_data = {
                 "timestamp": datetime.now().isoformat(),
-                "models": {k: asdict(v) for k, v in discovered_models.items()}
+                "models": {k: self._capability_to_dict(v) for k, v in discovered_models.items()}
             }
             await self.redis_client.setex(
-                cache_key, 
+                "model_discovery_cache", 
                 3600,  # 1 hour cache
-                json.dumps(cache_data, default=str)
+                record_serializer.dumps(cache_data)
             )
             
             self.model_capabilities = discovered_models
             logger.info(f"Discovered {len(discovered_models)} models across all providers")
             
+            # Let the other workers pick up the fresh catalog instead of rediscovering
+            if self.state_bus:
+                await self.state_bus.publish("model_catalog")
+            
             return discovered_models
             
         except Exception as e:
             logger.error("Model discovery failed", error=str(e))
             return {}
 
+    def _capability_to_dict(self, capability: ModelCapability) -> Dict[str, Any]:
+        """Serialize a capability so the provider survives a cache round trip"""
+        data = asdict(capability)
+        data["provider"] = capability.provider.value
+        data["last_updated"] = capability.last_updated.isoformat()
+        return data
+
+    def _capability_from_dict(self, data: Dict[str, Any]) -> ModelCapability:
+        """Rebuild a capability from its cached form"""
+        data = dict(data)
+        data["provider"] = ModelProvider(data["provider"])
+        data["last_updated"] = datetime.fromisoformat(data["last_updated"])
+        return ModelCapability(**data)
+
+    async def load_cached_catalog(self) -> Optional[Dict[str, ModelCapability]]:
+        """Load the shared catalog from Redis if it is less than 1 hour old"""
+        try:
+            cached_models = await cached_get(self.redis_client, "model_discovery_cache")
+            if not cached_models:
+                return None
+            
+            cached_data = record_serializer.loads(cached_models)
+            cache_time = datetime.fromisoformat(cached_data.get("timestamp", ""))
+            if datetime.now() - cache_time >= timedelta(hours=1):
+                return None
+            
+            self.model_capabilities = {
+                k: self._capability_from_dict(v) for k, v in cached_data["models"].items()
+            }
+            return self.model_capabilities
+        except Exception as e:
+            logger.debug("Cache parsing failed", error=str(e))
+            return None
+
     async def _discover_provider_models(self, provider: ModelProvider) -> Dict[str, ModelCapability]:
         """Discover models from a specific provider"""
         try:
@@ -232,9 +312,12 @@ class IntelligentModelDiscovery:
         try:
             config = self.discovery_endpoints[provider]
             
-            # Get API key for provider
+            if not config["base_url"]:
+                return []
+            
+            # Get API key for provider (local servers usually run without one)
             api_key = self._get_provider_api_key(provider)
-            if not api_key:
+            if not api_key and provider != ModelProvider.LOCAL:
                 return []
             
             headers = self._get_provider_headers(provider, api_key)
@@ -268,12 +351,12 @@ class IntelligentModelDiscovery:
             ModelProvider.ANTHROPIC: "ANTHROPIC_API_KEY",
             ModelProvider.OPENAI: "OPENAI_API_KEY", 
             ModelProvider.HUGGINGFACE: "HUGGINGFACE_API_KEY",
-            ModelProvider.IO_INTELLIGENCE: "IO_INTELLIGENCE_API_KEY"
+            ModelProvider.IO_INTELLIGENCE: "IO_INTELLIGENCE_API_KEY",
+            ModelProvider.LOCAL: "LOCAL_LLM_API_KEY"
         }
         
         env_var = key_mapping.get(provider)
         if env_var:
-            import os
             return os.getenv(env_var)
         return None
 
@@ -290,6 +373,8 @@ class IntelligentModelDiscovery:
             base_headers["Authorization"] = f"Bearer {api_key}"
         elif provider == ModelProvider.IO_INTELLIGENCE:
             base_headers["Authorization"] = f"Bearer {api_key}"
+        elif provider == ModelProvider.LOCAL and api_key:
+            base_headers["Authorization"] = f"Bearer {api_key}"
         
         return base_headers
 
@@ -346,6 +431,27 @@ class IntelligentModelDiscovery:
             "availability": 0.95
         }
         
+        # Self-hosted models cost nothing per token and skip the network round trip
+        if provider == ModelProvider.IN_PROCESS:
+            defaults.update({
+                "max_tokens": 512,
+                "cost_per_1k_tokens": 0.0,
+                "latency_p95": 0.1,
+                "accuracy": 0.8,
+                "context_window": 512,
+                "streaming": False,
+                "specialized_tasks": ["sentiment_analysis"] if "sentiment" in model_id else ["summarization"],
+                "rate_limits": {"rpm": 100000, "tpm": 10000000}
+            })
+        elif provider == ModelProvider.LOCAL:
+            defaults.update({
+                "cost_per_1k_tokens": 0.0,
+                "latency_p95": 1.0,
+                "accuracy": 0.75,
+                "specialized_tasks": ["fast_responses", "summarization", "sentiment_analysis"],
+                "rate_limits": {"rpm": 600, "tpm": 600000}
+            })
+        
         # Model-specific overrides
         if "claude-sonnet-4" in model_id:
             defaults.update({
@@ -563,6 +669,9 @@ class IntelligentModelDiscovery:
         if requirements.get("max_latency", float('inf')) < capability.latency_percentile_95:
             return False
         
+        if requirements.get("function_calling") and not capability.supports_function_calling:
+            return False
+        
         required_tasks = requirements.get("required_capabilities", [])
         if required_tasks and not any(task in capability.specialized_tasks for task in required_tasks):
             return False
@@ -638,7 +747,7 @@ class IntelligentModelDiscovery:
             if not current_usage:
                 return True
             
-            usage_data = json.loads(current_usage)
+            usage_data = record_serializer.loads(current_usage)
             current_minute = int(time.time() // 60)
             
             # Check if we're in a new minute
@@ -672,7 +781,7 @@ class IntelligentModelDiscovery:
             current_usage = await self.redis_client.get(rate_limit_key)
             
             if current_usage:
-                usage_data = json.loads(current_usage)
+                usage_data = record_serializer.loads(current_usage)
                 if usage_data.get("minute", 0) == current_minute:
                     # Same minute, increment
                     usage_data["requests"] += 1
@@ -695,7 +804,7 @@ class IntelligentModelDiscovery:
             await self.redis_client.setex(
                 rate_limit_key,
                 120,  # 2 minutes TTL
-                json.dumps(usage_data)
+                record_serializer.dumps(usage_data)
             )
             
         except Exception as e:
@@ -784,7 +893,7 @@ class IntelligentModelDiscovery:
                 perf_data = await self.redis_client.get(perf_key)
                 
                 if perf_data:
-                    data = json.loads(perf_data)
+                    data = record_serializer.loads(perf_data)
                     self.model_performance[model_id] = ModelPerformance(**data)
                 
             except Exception as e:
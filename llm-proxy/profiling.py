@@ -0,0 +1,68 @@
+"""
+On-Demand Sampling Profiler
+Profiles the running worker for a short window and reports the hottest functions
+"""
+
+import asyncio
+from typing import Any, Dict, List
+import structlog
+
+try:
+    import yappi
+except ImportError:
+    yappi = None
+
+logger = structlog.get_logger()
+
+MAX_PROFILE_SECONDS = 60.0
+SORT_KEYS = {"ttot", "tsub", "tavg", "ncall"}
+
+class ProfilerUnavailable(Exception):
+    """Raised when yappi is not installed in this worker"""
+
+class ProfilerBusy(Exception):
+    """Raised when a profile is already running; yappi is process-global"""
+
+_profile_lock = asyncio.Lock()
+
+async def profile_for(seconds: float, limit: int = 50, sort_by: str = "ttot") -> Dict[str, Any]:
+    """
+    Profile every thread and coroutine in this worker for a wall-clock window
+    Wall clock is used so time spent awaiting providers and Redis shows up
+    """
+    if yappi is None:
+        raise ProfilerUnavailable("yappi is not installed")
+    if _profile_lock.locked():
+        raise ProfilerBusy("A profile is already running in this worker")
+    if sort_by not in SORT_KEYS:
+        raise ValueError(f"sort_by must be one of {sorted(SORT_KEYS)}")
+
+    seconds = max(0.1, min(seconds, MAX_PROFILE_SECONDS))
+
+    async with _profile_lock:
+        yappi.clear_stats()
+        yappi.set_clock_type("wall")
+        yappi.start(builtins=False, profile_threads=True)
+        try:
+            await asyncio.sleep(seconds)
+        finally:
+            yappi.stop()
+
+        stats = yappi.get_func_stats()
+        stats.sort(sort_by, "desc")
+        functions: List[Dict[str, Any]] = [
+            {
+                "function": stat.name,
+                "module": stat.module,
+                "line": stat.lineno,
+                "calls": stat.ncall,
+                "total_seconds": round(stat.ttot, 6),
+                "own_seconds": round(stat.tsub, 6),
+                "avg_seconds": round(stat.tavg, 6)
+            }
+            for stat in list(stats)[:limit]
+        ]
+        yappi.clear_stats()
+
+    logger.info("Profile captured", seconds=seconds, functions=len(functions))
+    return {"seconds": seconds, "clock": "wall", "sort_by": sort_by, "functions": functions}
@@ -0,0 +1,460 @@
+"""
+Provider Adapters for the LLM Client
+Encapsulates request building, response parsing and error classification per provider
+"""
+
+import os
+import json
+from enum import Enum
+from typing import Dict, List, Optional, Any, Iterable
+from dataclasses import dataclass, field
+import structlog
+
+from tool_calling import ToolCall, ToolDefinition, ToolResult
+
+logger = structlog.get_logger()
+
+class ErrorClass(Enum):
+    """Coarse classification of upstream provider failures"""
+    RATE_LIMITED = "rate_limited"
+    OVERLOADED = "overloaded"
+    SERVER_ERROR = "server_error"
+    TIMEOUT = "timeout"
+    AUTHENTICATION = "authentication"
+    INVALID_REQUEST = "invalid_request"
+    UNKNOWN = "unknown"
+
+class ProviderError(Exception):
+    """Classified error raised by a provider adapter"""
+
+    def __init__(self, provider: str, error_class: ErrorClass, message: str,
+                 status_code: Optional[int] = None):
+        super().__init__(message)
+        self.provider = provider
+        self.error_class = error_class
+        self.status_code = status_code
+
+    @property
+    def retryable(self) -> bool:
+        return self.error_class in (
+            ErrorClass.RATE_LIMITED,
+            ErrorClass.OVERLOADED,
+            ErrorClass.SERVER_ERROR,
+            ErrorClass.TIMEOUT
+        )
+
+@dataclass
+class ProviderRequest:
+    """Fully prepared HTTP request for a provider"""
+    url: str
+    headers: Dict[str, str]
+    payload: Dict[str, Any]
+
+@dataclass
+class ProviderResult:
+    """Normalized provider response"""
+    content: str
+    usage: Dict[str, int]
+    raw: Dict[str, Any] = field(default_factory=dict)
+    tool_calls: List[ToolCall] = field(default_factory=list)
+    tool_rounds: int = 0
+
+class ProviderAdapter:
+    """
+    Base adapter describing how to talk to one upstream provider
+    Subclasses only describe the wire format; transport stays in LLMClient
+    """
+
+    name: str = ""
+    completion_path: str = "/chat/completions"
+    model_prefixes: Iterable[str] = ()
+    in_process: bool = False
+
+    def __init__(self, base_url: str, api_key: Optional[str] = None,
+                 default_model: Optional[str] = None, requires_api_key: bool = True):
+        self.base_url = base_url.rstrip("/")
+        self.api_key = api_key
+        self.default_model = default_model
+        self.requires_api_key = requires_api_key
+
+    @property
+    def available(self) -> bool:
+        """Whether the adapter has what it needs to send requests"""
+        return bool(self.base_url) and (self.api_key is not None or not self.requires_api_key)
+
+    def handles_model(self, model: str) -> bool:
+        """Fallback routing when the discovery catalog does not know the model"""
+        model_lower = model.lower()
+        return any(prefix in model_lower for prefix in self.model_prefixes)
+
+    def build_headers(self) -> Dict[str, str]:
+        headers = {"Content-Type": "application/json"}
+        if self.api_key:
+            headers["Authorization"] = f"Bearer {self.api_key}"
+        return headers
+
+    def build_messages(self, prompt: str, system_prompt: Optional[str],
+                       history: Optional[List[Dict[str, str]]] = None) -> List[Dict[str, str]]:
+        # Stable parts first (system, then prior turns oldest-first) so consecutive
+        # turns share a prefix the provider can serve from its prompt cache
+        messages = []
+        if system_prompt:
+            messages.append({"role": "system", "content": system_prompt})
+        if history:
+            messages.extend(history)
+        messages.append({"role": "user", "content": prompt})
+        return messages
+
+    def build_payload(self, prompt: str, model: str, max_tokens: int, temperature: float,
+                      system_prompt: Optional[str], stream: bool = False,
+                      history: Optional[List[Dict[str, str]]] = None) -> Dict[str, Any]:
+        payload = {
+            "model": model,
+            "max_tokens": max_tokens,
+            "temperature": temperature,
+            "messages": self.build_messages(prompt, system_prompt, history)
+        }
+        if stream:
+            payload["stream"] = True
+        return payload
+
+    def build_request(self, prompt: str, model: str, max_tokens: int, temperature: float,
+                      system_prompt: Optional[str], stream: bool = False,
+                      history: Optional[List[Dict[str, str]]] = None,
+                      tools: Optional[List[ToolDefinition]] = None,
+                      tool_choice: Optional[str] = None) -> ProviderRequest:
+        """Build the complete request for a completion call"""
+        if not self.available:
+            raise ProviderError(self.name, ErrorClass.AUTHENTICATION,
+                                f"{self.name} API key not available")
+
+        payload = self.build_payload(prompt, model, max_tokens, temperature, system_prompt, stream, history)
+        if tools:
+            self.apply_tools(payload, tools, tool_choice)
+        return ProviderRequest(
+            url=f"{self.base_url}{self.completion_path}",
+            headers=self.build_headers(),
+            payload=payload
+        )
+
+    def apply_tools(self, payload: Dict[str, Any], tools: List[ToolDefinition],
+                    tool_choice: Optional[str]):
+        """Add tool definitions; tool_choice is auto, none, required or a tool name"""
+        payload["tools"] = [
+            {"type": "function",
+             "function": {"name": tool.name, "description": tool.description, "parameters": tool.parameters}}
+            for tool in tools
+        ]
+        if tool_choice in ("auto", "none", "required"):
+            payload["tool_choice"] = tool_choice
+        elif tool_choice:
+            payload["tool_choice"] = {"type": "function", "function": {"name": tool_choice}}
+
+    def tool_round_messages(self, result: ProviderResult, tool_results: List[ToolResult]) -> List[Dict[str, Any]]:
+        """Messages appended after a tool round: the model's turn as returned, then the results"""
+        assistant_message = result.raw.get("choices", [{}])[0].get("message", {})
+        return [assistant_message] + [
+            {"role": "tool", "tool_call_id": tool_result.call_id, "content": tool_result.content}
+            for tool_result in tool_results
+        ]
+
+    def parse_response(self, data: Dict[str, Any]) -> ProviderResult:
+        """Parse a non-streaming response body"""
+        choices = data.get("choices") or []
+        if not choices:
+            # Seen when the provider's own content filter suppresses the completion
+            raise ProviderError(self.name, ErrorClass.INVALID_REQUEST,
+                                f"{self.name} returned no choices")
+        message = choices[0].get("message") or {}
+        tool_calls = []
+        for call in message.get("tool_calls") or []:
+            function = call.get("function", {})
+            arguments = function.get("arguments") or "{}"
+            try:
+                arguments = json.loads(arguments)
+            except json.JSONDecodeError:
+                pass  # Left as the raw string; the executor reports it back to the model
+            tool_calls.append(ToolCall(id=call.get("id", ""), name=function.get("name", ""), arguments=arguments))
+        return ProviderResult(content=message.get("content", "") or "", usage=self.extract_usage(data),
+                              raw=data, tool_calls=tool_calls)
+
+    def extract_usage(self, data: Dict[str, Any]) -> Dict[str, int]:
+        usage = data.get("usage") or {}
+        prompt_tokens = usage.get("prompt_tokens", 0)
+        completion_tokens = usage.get("completion_tokens", 0)
+        return {
+            "prompt_tokens": prompt_tokens,
+            "completion_tokens": completion_tokens,
+            "total_tokens": usage.get("total_tokens", prompt_tokens + completion_tokens)
+        }
+
+    def parse_stream_line(self, line: str) -> Optional[str]:
+        """
+        Parse one server-sent-events line into a text delta
+        Returns None for keep-alives, control events and the terminal marker
+        """
+        if not line.startswith("data:"):
+            return None
+        data = line[len("data:"):].strip()
+        if not data or data == "[DONE]":
+            return None
+        try:
+            event = json.loads(data)
+        except json.JSONDecodeError:
+            return None
+        choices = event.get("choices") or [{}]
+        return choices[0].get("delta", {}).get("content")
+
+    def classify_error(self, status_code: Optional[int], body: str = "") -> ErrorClass:
+        """Map an HTTP status (or transport failure when None) to an ErrorClass"""
+        if status_code is None:
+            return ErrorClass.TIMEOUT
+        if status_code == 429:
+            return ErrorClass.RATE_LIMITED
+        if status_code in (401, 403):
+            return ErrorClass.AUTHENTICATION
+        if status_code in (502, 503, 504):
+            return ErrorClass.OVERLOADED
+        if status_code >= 500:
+            return ErrorClass.SERVER_ERROR
+        if status_code >= 400:
+            return ErrorClass.INVALID_REQUEST
+        return ErrorClass.UNKNOWN
+
+    def error_from_response(self, status_code: int, body: str) -> ProviderError:
+        error_class = self.classify_error(status_code, body)
+        return ProviderError(self.name, error_class,
+                             f"{self.name} API error: {status_code}", status_code)
+
+class OpenAICompatibleAdapter(ProviderAdapter):
+    """Adapter for any endpoint speaking the OpenAI chat completions format"""
+
+    name = "openai"
+    model_prefixes = ("gpt",)
+
+class IOIntelligenceAdapter(OpenAICompatibleAdapter):
+    """IO Intelligence exposes an OpenAI-compatible API"""
+
+    name = "io_intelligence"
+    model_prefixes = ("io-",)
+
+class LocalOpenAICompatibleAdapter(OpenAICompatibleAdapter):
+    """
+    Self-hosted OpenAI-compatible server (vLLM, llama.cpp server)
+    Used for cheap, high-throughput tasks; an API key is optional
+    """
+
+    name = "local"
+    model_prefixes = ("local/",)
+
+    def __init__(self, base_url: str, api_key: Optional[str] = None,
+                 default_model: Optional[str] = None):
+        super().__init__(base_url, api_key, default_model, requires_api_key=False)
+
+    def build_payload(self, prompt: str, model: str, max_tokens: int, temperature: float,
+                      system_prompt: Optional[str], stream: bool = False,
+                      history: Optional[List[Dict[str, str]]] = None) -> Dict[str, Any]:
+        # "local/<name>" is only a routing hint; the server expects the bare model name
+        if model.startswith("local/"):
+            model = model[len("local/"):]
+        return super().build_payload(prompt, model, max_tokens, temperature, system_prompt, stream, history)
+
+class AnthropicAdapter(ProviderAdapter):
+    """Adapter for the Anthropic Messages API"""
+
+    name = "anthropic"
+    completion_path = "/messages"
+    model_prefixes = ("claude",)
+
+    def build_headers(self) -> Dict[str, str]:
+        return {
+            "x-api-key": self.api_key or "",
+            "anthropic-version": "2023-06-01",
+            "Content-Type": "application/json"
+        }
+
+    def build_messages(self, prompt: str, system_prompt: Optional[str],
+                       history: Optional[List[Dict[str, str]]] = None) -> List[Dict[str, Any]]:
+        # Roles must alternate, so adjacent same-role turns are merged
+        messages: List[Dict[str, Any]] = []
+        for turn in (history or []) + [{"role": "user", "content": prompt}]:
+            if messages and messages[-1]["role"] == turn["role"]:
+                messages[-1] = {"role": turn["role"], "content": f"{messages[-1]['content']}\n\n{turn['content']}"}
+            else:
+                messages.append({"role": turn["role"], "content": turn["content"]})
+
+        if len(messages) > 1:
+            # Cache breakpoint at the end of the prior turns; the next request
+            # extends exactly this prefix
+            last_prior = messages[-2]
+            last_prior["content"] = [{
+                "type": "text", "text": last_prior["content"], "cache_control": {"type": "ephemeral"}
+            }]
+        return messages
+
+    def build_payload(self, prompt: str, model: str, max_tokens: int, temperature: float,
+                      system_prompt: Optional[str], stream: bool = False,
+                      history: Optional[List[Dict[str, str]]] = None) -> Dict[str, Any]:
+        # Anthropic takes the system prompt as a top-level field, not a message
+        payload = {
+            "model": model,
+            "max_tokens": max_tokens,
+            "temperature": temperature,
+            "messages": self.build_messages(prompt, None, history)
+        }
+        if system_prompt:
+            payload["system"] = system_prompt
+        if stream:
+            payload["stream"] = True
+        return payload
+
+    def apply_tools(self, payload: Dict[str, Any], tools: List[ToolDefinition],
+                    tool_choice: Optional[str]):
+        payload["tools"] = [
+            {"name": tool.name, "description": tool.description, "input_schema": tool.parameters}
+            for tool in tools
+        ]
+        if tool_choice == "required":
+            payload["tool_choice"] = {"type": "any"}
+        elif tool_choice in ("auto", "none"):
+            payload["tool_choice"] = {"type": tool_choice}
+        elif tool_choice:
+            payload["tool_choice"] = {"type": "tool", "name": tool_choice}
+
+    def tool_round_messages(self, result: ProviderResult, tool_results: List[ToolResult]) -> List[Dict[str, Any]]:
+        return [
+            {"role": "assistant", "content": result.raw.get("content", [])},
+            {"role": "user", "content": [
+                {"type": "tool_result", "tool_use_id": tool_result.call_id,
+                 "content": tool_result.content, "is_error": tool_result.is_error}
+                for tool_result in tool_results
+            ]}
+        ]
+
+    def parse_response(self, data: Dict[str, Any]) -> ProviderResult:
+        blocks = data.get("content", [])
+        content = "".join(
+            block.get("text", "") for block in blocks
+            if block.get("type", "text") == "text"
+        )
+        tool_calls = [
+            ToolCall(id=block.get("id", ""), name=block.get("name", ""), arguments=block.get("input", {}))
+            for block in blocks if block.get("type") == "tool_use"
+        ]
+        return ProviderResult(content=content, usage=self.extract_usage(data), raw=data, tool_calls=tool_calls)
+
+    def extract_usage(self, data: Dict[str, Any]) -> Dict[str, int]:
+        usage = data.get("usage") or {}
+        input_tokens = usage.get("input_tokens", 0)
+        output_tokens = usage.get("output_tokens", 0)
+        return {
+            "prompt_tokens": input_tokens,
+            "completion_tokens": output_tokens,
+            "total_tokens": input_tokens + output_tokens
+        }
+
+    def parse_stream_line(self, line: str) -> Optional[str]:
+        if not line.startswith("data:"):
+            return None
+        try:
+            event = json.loads(line[len("data:"):].strip())
+        except json.JSONDecodeError:
+            return None
+        if event.get("type") == "content_block_delta":
+            return event.get("delta", {}).get("text")
+        return None
+
+    def classify_error(self, status_code: Optional[int], body: str = "") -> ErrorClass:
+        # Anthropic signals capacity problems with 529 overloaded_error
+        if status_code == 529 or "overloaded_error" in body:
+            return ErrorClass.OVERLOADED
+        return super().classify_error(status_code, body)
+
+class InProcessAdapter(ProviderAdapter):
+    """
+    Adapter for the in-process local inference backend
+    No HTTP involved; LLMClient calls execute() directly
+    """
+
+    name = "in_process"
+    model_prefixes = ("local-inference/",)
+    in_process = True
+
+    def __init__(self, backend):
+        super().__init__(base_url="", requires_api_key=False)
+        self.backend = backend
+
+    @property
+    def available(self) -> bool:
+        return self.backend is not None
+
+    def handles_model(self, model: str) -> bool:
+        return model in self.backend.model_ids
+
+    async def execute(self, prompt: str, model: str) -> ProviderResult:
+        try:
+            result = await self.backend.complete(prompt, model)
+        except ValueError as e:
+            raise ProviderError(self.name, ErrorClass.INVALID_REQUEST, str(e)) from e
+        except Exception as e:
+            raise ProviderError(self.name, ErrorClass.SERVER_ERROR, str(e)) from e
+        return ProviderResult(content=result["content"], usage=result["usage"])
+
+class ProviderRegistry:
+    """
+    Registry of provider adapters
+    Routes models to providers using the discovery catalog, falling back to adapter prefixes
+    """
+
+    def __init__(self):
+        self.adapters: Dict[str, ProviderAdapter] = {}
+
+    def register(self, adapter: ProviderAdapter):
+        self.adapters[adapter.name] = adapter
+        logger.debug("Provider adapter registered", provider=adapter.name)
+
+    def get(self, provider: str) -> Optional[ProviderAdapter]:
+        return self.adapters.get(provider)
+
+    def resolve(self, model: str, model_discovery=None) -> Optional[ProviderAdapter]:
+        """Find the adapter serving a model"""
+        if model_discovery is not None:
+            capability = model_discovery.model_capabilities.get(model)
+            if capability is not None:
+                adapter = self.adapters.get(capability.provider.value)
+                if adapter is not None:
+                    return adapter
+
+        for adapter in self.adapters.values():
+            if adapter.handles_model(model):
+                return adapter
+        return None
+
+    @classmethod
+    def from_environment(cls) -> "ProviderRegistry":
+        """Build the default registry from environment configuration"""
+        registry = cls()
+        registry.register(AnthropicAdapter(
+            base_url=os.getenv("ANTHROPIC_BASE_URL", "https://api.anthropic.com/v1"),
+            api_key=os.getenv("ANTHROPIC_API_KEY"),
+            default_model="claude-sonnet-4-20250514"
+        ))
+        registry.register(OpenAICompatibleAdapter(
+            base_url=os.getenv("OPENAI_BASE_URL", "https://api.openai.com/v1"),
+            api_key=os.getenv("OPENAI_API_KEY"),
+            default_model="gpt-4-turbo-preview"
+        ))
+        registry.register(IOIntelligenceAdapter(
+            base_url=os.getenv("IO_INTELLIGENCE_BASE_URL", "https://api.iointelligence.ai/v1"),
+            api_key=os.getenv("IO_INTELLIGENCE_API_KEY"),
+            default_model="io-reasoning-1"
+        ))
+
+        local_base_url = os.getenv("LOCAL_LLM_BASE_URL")
+        if local_base_url:
+            registry.register(LocalOpenAICompatibleAdapter(
+                base_url=local_base_url,
+                api_key=os.getenv("LOCAL_LLM_API_KEY"),
+                default_model=os.getenv("LOCAL_LLM_DEFAULT_MODEL")
+            ))
+        return registry
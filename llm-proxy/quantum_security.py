@@ -6,23 +6,38 @@ Implementing quantum-resistant cryptography and advanced threat detection
 
 import os
 import time
+import base64
 import hashlib
-import hmac
+import json
 import secrets
 import asyncio
-from typing import Dict, List, Optional, Any, Tuple
+from typing import Dict, List, Optional, Any, Sequence, Tuple, Union
 from dataclasses import dataclass
 from datetime import datetime, timedelta
 import jwt
 from cryptography.hazmat.primitives import hashes, serialization
 from cryptography.hazmat.primitives.asymmetric import rsa, padding
-from cryptography.hazmat.primitives.ciphers import Cipher, algorithms, modes
+from cryptography.hazmat.primitives.ciphers.aead import AESGCM
 from cryptography.hazmat.backends import default_backend
 import structlog
 import redis.asyncio as redis
+from prometheus_client import Counter, Gauge
+
+from aead_envelope import ENVELOPE_VERSION, EnvelopeCipher
+from ip_reputation import IPReputationStore
+from key_management import KeyManager
+from rate_window import SlidingWindowCounter
+from request_signing import RequestSigner, canonical_request
+from threat_patterns import STATE_TOPIC as THREAT_PATTERNS_TOPIC, InvalidPatternError, ThreatPatternIndex
+from ttl_cache import NEGATIVE, TTLCache
 
 logger = structlog.get_logger()
 
+SECURITY_CACHE_LOOKUPS = Counter(
+    'security_cache_lookups_total', 'Security analysis cache lookups', ['tier', 'result']
+)
+SECURITY_CACHE_ENTRIES = Gauge('security_cache_local_entries', 'Entries in the in-process security cache')
+
 @dataclass
 class SecurityThreat:
     """Security threat detection result"""
@@ -48,8 +63,9 @@ class QuantumSecurityManager:
     Implements multi-layer security without compromising speed
     """
     
-    def __init__(self, redis_client: redis.Redis):
+    def __init__(self, redis_client: redis.Redis, key_manager: Optional[KeyManager] = None):
         self.redis_client = redis_client
+        self.key_manager = key_manager
         self.security_state = QuantumSecurityState(
             encryption_level="quantum_resistant",
             threat_level="green",
@@ -61,61 +77,90 @@ class QuantumSecurityManager:
         # Initialize quantum-resistant cryptography
         self._init_quantum_crypto()
         
-        # Threat detection patterns
-        self.threat_patterns = {
-            "injection_attacks": [
-                r"';.*--",
-                r"union.*select",
-                r"<script.*>",
-                r"javascript:",
-                r"eval\s*\(",
-                r"exec\s*\("
-            ],
-            "data_exfiltration": [
-                r"\.{2,}/",
-                r"file://",
-                r"ftp://",
-                r"../.*passwd",
-                r"SELECT.*FROM.*information_schema"
-            ],
-            "rate_limit_abuse": [
-                # Detected via behavior analysis, not patterns
-            ],
-            "credential_stuffing": [
-                r"admin.*admin",
-                r"test.*test",
-                r"password.*123"
-            ]
-        }
+        # Threat detection patterns, compiled and shared with the other workers
+        self.threat_patterns = ThreatPatternIndex(redis_client)
+        self.threat_patterns.on_swap = self._on_threat_patterns_swapped
+        
+        # Performance-optimized security cache: in-process LRU in front of Redis
+        self.cache_ttl = 300  # 5 minutes in Redis
+        # Shorter locally so verdicts refreshed by other workers are picked up
+        self.local_cache_ttl = float(os.getenv("SECURITY_LOCAL_CACHE_TTL", "30"))
+        # Fingerprints that just missed Redis skip it while their analysis is in flight
+        self.negative_cache_ttl = float(os.getenv("SECURITY_NEGATIVE_CACHE_TTL", "5"))
+        self.security_cache = TTLCache(
+            max_entries=int(os.getenv("SECURITY_LOCAL_CACHE_SIZE", "10000")),
+            default_ttl=self.local_cache_ttl
+        )
+        
+        # Analysis timings are batched into Redis instead of written per request
+        self._pending_perf_requests = 0
+        self._pending_perf_time = 0.0
+        self._next_perf_flush = 0.0
         
-        # Performance-optimized security cache
-        self.security_cache = {}
-        self.cache_ttl = 300  # 5 minutes
+        # Requests per client IP over a sliding hour; every request counts
+        self.behavior_counter = SlidingWindowCounter(
+            redis_client, "behavior",
+            limit=int(os.getenv("SECURITY_BEHAVIOR_HOURLY_LIMIT", "100")),
+            window_seconds=3600,
+            count_rejected=True
+        )
         
         # Real-time threat tracking
         self.threat_scores = {}
-        self.ip_reputation = {}
+        self.ip_reputation = IPReputationStore(redis_client)
+
+    async def start(self, state_bus=None):
+        """
+        Load learned patterns, follow other workers' updates and start the reputation sync
+        Call once the event loop is running, before state_bus.start()
+        """
+        if state_bus is not None:
+            self.threat_patterns.state_bus = state_bus
+            state_bus.subscribe(THREAT_PATTERNS_TOPIC, self.threat_patterns.reload)
+        try:
+            await self.threat_patterns.reload({})
+        except Exception as e:
+            logger.warning("Learned threat patterns unavailable, using built-ins", error=str(e))
+        self.ip_reputation.start()
+
+    async def stop(self):
+        await self.ip_reputation.stop()
 
     def _init_quantum_crypto(self):
         """Initialize quantum-resistant cryptographic components"""
         try:
-            # Generate RSA-4096 keys (quantum-resistant until large-scale quantum computers)
-            self.private_key = rsa.generate_private_key(
-                public_exponent=65537,
-                key_size=4096,
-                backend=default_backend()
-            )
-            self.public_key = self.private_key.public_key()
+            # RSA-4096 and AES-256 keys come from the shared keystore, so every
+            # worker uses the same keys and none pays for RSA generation at boot
+            if self.key_manager is None:
+                self.key_manager = KeyManager("llm_proxy").load()
+            self.envelope_cipher = EnvelopeCipher(self.key_manager)
+            self._apply_active_key()
             
-            # Initialize AES-256-GCM for symmetric encryption
-            self.master_key = secrets.token_bytes(32)  # 256-bit key
-            
-            logger.info("Quantum-resistant cryptography initialized")
+            logger.info("Quantum-resistant cryptography initialized", key_id=self.key_id)
             
         except Exception as e:
             logger.error("Quantum crypto initialization failed", error=str(e))
             raise
 
+    def _apply_active_key(self):
+        active = self.key_manager.active
+        self.key_id = active.key_id
+        self.private_key = active.private_key
+        self.public_key = active.public_key
+        self.master_key = active.master_key
+        self.request_signer = RequestSigner(active.master_key)
+
+    def _sync_active_key(self):
+        """Follow rotations made by other workers (the keystore is re-checked at most every 30s)"""
+        if self.key_manager.active.key_id != self.key_id:
+            self._apply_active_key()
+
+    def rotate_keys(self) -> str:
+        """Rotate to a new key version; data encrypted under older versions still decrypts"""
+        self.key_manager.rotate()
+        self._apply_active_key()
+        return self.key_id
+
     async def analyze_request_security(self, request_data: Dict[str, Any]) -> SecurityThreat:
         """
         Analyze request for security threats with minimal performance impact
@@ -124,38 +169,49 @@ class QuantumSecurityManager:
         start_time = time.time()
         
         try:
+            # Known-bad IPs are screened first: the fingerprint cache is not per client
+            reputation_threat = await self._check_ip_reputation(request_data)
+            if reputation_threat:
+                await self._update_security_performance_metrics(time.time() - start_time)
+                return reputation_threat
+            
+            # Behavior is per client, so it is counted on every request, cache hit or not,
+            # and its verdict is never cached
+            behavioral_threats = await self._analyze_behavioral_patterns(request_data)
+            
             # Generate request fingerprint for caching
             request_hash = self._generate_request_hash(request_data)
             
-            # Check cache first (performance optimization)
-            cached_result = await self._check_security_cache(request_hash)
-            if cached_result:
-                # Update performance metrics for cache hit
-                await self._update_security_performance_metrics(time.time() - start_time, True)
-                return cached_result
-            
-            # Multi-layer threat analysis
-            threats = []
-            
-            # Layer 1: Pattern-based detection (fast)
-            pattern_threats = await self._detect_pattern_threats(request_data)
-            threats.extend(pattern_threats)
-            
-            # Layer 2: Behavioral analysis (medium speed)
-            behavioral_threats = await self._analyze_behavioral_patterns(request_data)
-            threats.extend(behavioral_threats)
-            
-            # Layer 3: Content analysis (slower, but cached)
-            content_threats = await self._analyze_content_security(request_data)
-            threats.extend(content_threats)
+            # Check cache first (performance optimization); it holds content verdicts only
+            content_verdict = await self._check_security_cache(request_hash)
+            if content_verdict is None:
+                # Multi-layer threat analysis
+                threats = []
+                
+                # Layer 1: Pattern-based detection (fast)
+                pattern_threats = await self._detect_pattern_threats(request_data)
+                threats.extend(pattern_threats)
+                
+                # Layer 2: Content analysis (slower, but cached)
+                content_threats = await self._analyze_content_security(request_data)
+                threats.extend(content_threats)
+                
+                content_verdict = self._calculate_threat_level(threats)
+                
+                # Cache result for performance
+                await self._cache_security_result(request_hash, content_verdict)
             
             # Determine overall threat level
-            overall_threat = self._calculate_threat_level(threats)
-            
-            # Cache result for performance
-            await self._cache_security_result(request_hash, overall_threat)
+            if behavioral_threats:
+                threats = list(behavioral_threats)
+                if content_verdict.threat_type != "clean":
+                    threats.append(content_verdict)
+                overall_threat = self._calculate_threat_level(threats)
+            else:
+                overall_threat = content_verdict
             
             processing_time = time.time() - start_time
+            await self._update_security_performance_metrics(processing_time)
             
             # Ensure performance target (< 50ms for security analysis)
             if processing_time > 0.05:
@@ -181,28 +237,52 @@ class QuantumSecurityManager:
         stable_data = {
             "prompt": request_data.get("prompt", "")[:100],  # First 100 chars
             "model": request_data.get("model", ""),
-            "user_agent": request_data.get("headers", {}).get("user-agent", "")[:50]
+            "user_agent": request_data.get("headers", {}).get("user-agent", "")[:50],
+            # Cached verdicts from an older pattern set are not reused
+            "patterns": self.threat_patterns.version
         }
         
         data_string = str(stable_data)
         return hashlib.sha256(data_string.encode()).hexdigest()[:16]  # 16 chars sufficient
 
     async def _check_security_cache(self, request_hash: str) -> Optional[SecurityThreat]:
-        """Check cached security analysis for performance"""
+        """Check cached security analysis, local tier first, then Redis"""
+        local_result = self.security_cache.get(request_hash)
+        if local_result is NEGATIVE:
+            SECURITY_CACHE_LOOKUPS.labels(tier="local", result="negative_hit").inc()
+            return None
+        if local_result is not None:
+            SECURITY_CACHE_LOOKUPS.labels(tier="local", result="hit").inc()
+            return local_result
+        SECURITY_CACHE_LOOKUPS.labels(tier="local", result="miss").inc()
+        
         try:
             cached_data = await self.redis_client.get(f"security_cache:{request_hash}")
             if cached_data:
-                import json
                 data = json.loads(cached_data)
-                return SecurityThreat(**data)
+                data["timestamp"] = datetime.fromisoformat(data["timestamp"])
+                threat = SecurityThreat(**data)
+                self._store_local(request_hash, threat)
+                SECURITY_CACHE_LOOKUPS.labels(tier="redis", result="hit").inc()
+                return threat
+            SECURITY_CACHE_LOOKUPS.labels(tier="redis", result="miss").inc()
         except Exception as e:
+            SECURITY_CACHE_LOOKUPS.labels(tier="redis", result="error").inc()
             logger.debug("Security cache check failed", error=str(e))
+        
+        self.security_cache.set_negative(request_hash, self.negative_cache_ttl)
+        SECURITY_CACHE_ENTRIES.set(len(self.security_cache))
         return None
 
+    def _store_local(self, request_hash: str, threat: SecurityThreat):
+        self.security_cache.set(request_hash, threat)
+        SECURITY_CACHE_ENTRIES.set(len(self.security_cache))
+
     async def _cache_security_result(self, request_hash: str, threat: SecurityThreat):
-        """Cache security analysis result"""
+        """Cache security analysis result in both tiers"""
+        # Local first, so the verdict is reused even when Redis is unavailable
+        self._store_local(request_hash, threat)
         try:
-            import json
             threat_data = {
                 "threat_level": threat.threat_level,
                 "threat_type": threat.threat_type,
@@ -221,23 +301,42 @@ class QuantumSecurityManager:
 
     async def _detect_pattern_threats(self, request_data: Dict[str, Any]) -> List[SecurityThreat]:
         """Fast pattern-based threat detection"""
-        threats = []
         prompt = request_data.get("prompt", "").lower()
         
-        for threat_type, patterns in self.threat_patterns.items():
-            for pattern in patterns:
-                import re
-                if re.search(pattern, prompt, re.IGNORECASE):
-                    threats.append(SecurityThreat(
-                        threat_level="high",
-                        threat_type=threat_type,
-                        confidence=0.8,
-                        details={"pattern": pattern, "matched_content": prompt[:100]},
-                        timestamp=datetime.now()
-                    ))
-                    break  # One match per type sufficient
+        return [
+            SecurityThreat(
+                threat_level="high",
+                threat_type=threat_type,
+                confidence=0.8,
+                details={"pattern": pattern, "matched_content": prompt[:100]},
+                timestamp=datetime.now()
+            )
+            for threat_type, pattern in self.threat_patterns.match(prompt)
+        ]
+
+    def _on_threat_patterns_swapped(self, compiled):
+        # Verdicts reached under the old patterns may no longer hold
+        self.security_cache.clear()
+        SECURITY_CACHE_ENTRIES.set(0)
+
+    async def _check_ip_reputation(self, request_data: Dict[str, Any]) -> Optional[SecurityThreat]:
+        """Reputation screen; clean IPs are answered from the in-memory filter"""
+        ip_address = request_data.get("client_ip", "unknown")
+        try:
+            score = await self.ip_reputation.score(ip_address)
+        except Exception as e:
+            logger.debug("IP reputation lookup failed", error=str(e))
+            return None
         
-        return threats
+        if score < self.ip_reputation.threshold:
+            return None
+        return SecurityThreat(
+            threat_level="critical" if score >= 0.9 else "high",
+            threat_type="known_bad_ip",
+            confidence=score,
+            details={"ip": ip_address, "reputation_score": score},
+            timestamp=datetime.now()
+        )
 
     async def _analyze_behavioral_patterns(self, request_data: Dict[str, Any]) -> List[SecurityThreat]:
         """Analyze behavioral patterns for threats"""
@@ -246,26 +345,16 @@ class QuantumSecurityManager:
         try:
             ip_address = request_data.get("client_ip", "unknown")
             
-            # Track request frequency
-            current_time = time.time()
-            request_key = f"requests:{ip_address}"
-            
-            # Get recent request count
-            recent_requests = await self.redis_client.get(request_key)
-            if recent_requests:
-                count = int(recent_requests)
-                if count > 100:  # More than 100 requests in tracking window
-                    threats.append(SecurityThreat(
-                        threat_level="high",
-                        threat_type="rate_limit_abuse",
-                        confidence=0.9,
-                        details={"request_count": count, "ip": ip_address},
-                        timestamp=datetime.now()
-                    ))
-            
-            # Increment counter
-            await self.redis_client.setex(request_key, 3600, 
-                                        int(recent_requests or 0) + 1)
+            # Count and verdict in one atomic round trip
+            decision = await self.behavior_counter.hit(ip_address)
+            if not decision.allowed:  # Over the hourly request budget
+                threats.append(SecurityThreat(
+                    threat_level="high",
+                    threat_type="rate_limit_abuse",
+                    confidence=0.9,
+                    details={"request_count": decision.count, "ip": ip_address},
+                    timestamp=datetime.now()
+                ))
             
         except Exception as e:
             logger.debug("Behavioral analysis failed", error=str(e))
@@ -346,78 +435,55 @@ class QuantumSecurityManager:
     async def apply_quantum_encryption(self, data: str) -> Tuple[str, str]:
         """
         Apply quantum-resistant encryption with performance optimization
-        Returns (encrypted_data, encryption_metadata)
+        Returns (encrypted_data, encryption_metadata) as base64 text for string transports;
+        use encrypt_records for binary envelopes
         """
         try:
             start_time = time.time()
+            self._sync_active_key()
             
-            # Generate random nonce for GCM
-            nonce = secrets.token_bytes(12)  # 96-bit nonce for GCM
+            envelope = self.envelope_cipher.encrypt(data.encode('utf-8'))
             
-            # Create cipher
-            cipher = Cipher(
-                algorithms.AES(self.master_key),
-                modes.GCM(nonce),
-                backend=default_backend()
-            )
-            encryptor = cipher.encryptor()
-            
-            # Encrypt data
-            data_bytes = data.encode('utf-8')
-            ciphertext = encryptor.update(data_bytes) + encryptor.finalize()
-            
-            # Combine nonce + tag + ciphertext for transport
-            encrypted_package = nonce + encryptor.tag + ciphertext
-            
-            # Generate metadata
-            metadata = {
-                "algorithm": "AES-256-GCM",
-                "key_size": 256,
-                "nonce_size": 96,
-                "tag_size": 128,
-                "timestamp": time.time(),
-                "performance_ms": (time.time() - start_time) * 1000
-            }
+            # The envelope header carries algorithm version and key id; metadata stays small
+            metadata = {"envelope": ENVELOPE_VERSION, "key_id": self.key_id}
             
-            # Performance target: < 10ms for encryption
-            if metadata["performance_ms"] > 10:
-                logger.warning("Encryption exceeded performance target",
-                             performance_ms=metadata["performance_ms"])
+            performance_ms = (time.time() - start_time) * 1000
+            if performance_ms > 10:
+                logger.warning("Encryption exceeded performance target", performance_ms=performance_ms)
             
-            import base64
-            return base64.b64encode(encrypted_package).decode(), str(metadata)
+            return base64.b64encode(envelope).decode(), json.dumps(metadata, separators=(",", ":"))
             
         except Exception as e:
             logger.error("Quantum encryption failed", error=str(e))
             # Return original data with error metadata (graceful degradation)
             return data, f'{{"error": "{str(e)}", "encryption": "failed"}}'
 
+    def encrypt_records(self, records: Sequence[bytes]) -> List[memoryview]:
+        """Encrypt many records at once into binary envelopes (views into one buffer)"""
+        self._sync_active_key()
+        return self.envelope_cipher.encrypt_batch(records)
+
+    def decrypt_records(self, envelopes: Sequence[Union[bytes, memoryview]]) -> List[bytes]:
+        return self.envelope_cipher.decrypt_batch(envelopes)
+
     async def decrypt_quantum_data(self, encrypted_data: str, metadata: str) -> str:
         """
         Decrypt quantum-resistant encrypted data
         """
         try:
-            import base64
-            import json
-            
-            # Decode the encrypted package
+            meta = json.loads(metadata)
             encrypted_package = base64.b64decode(encrypted_data.encode())
             
-            # Extract components
+            if meta.get("envelope"):
+                return self.envelope_cipher.decrypt(encrypted_package).decode('utf-8')
+            
+            # Legacy layout: nonce | tag | ciphertext, from before envelopes
+            key_id = meta.get("key_id")
+            master_key = self.key_manager.get(key_id).master_key if key_id else self.master_key
             nonce = encrypted_package[:12]
             tag = encrypted_package[12:28]
             ciphertext = encrypted_package[28:]
-            
-            # Create cipher for decryption
-            cipher = Cipher(
-                algorithms.AES(self.master_key),
-                modes.GCM(nonce, tag),
-                backend=default_backend()
-            )
-            decryptor = cipher.decryptor()
-            
-            # Decrypt
-            plaintext = decryptor.update(ciphertext) + decryptor.finalize()
+            plaintext = AESGCM(master_key).decrypt(nonce, ciphertext + tag, None)
             
             return plaintext.decode('utf-8')
             
@@ -431,34 +497,51 @@ class QuantumSecurityManager:
         Validate API request signature using quantum-resistant algorithms
         """
         try:
-            # Generate canonical request string
-            canonical_request = self._create_canonical_request(request_data)
-            
-            # Verify HMAC signature
-            expected_signature = hmac.new(
-                self.master_key,
-                canonical_request.encode(),
-                hashlib.sha256
-            ).hexdigest()
-            
-            # Constant-time comparison to prevent timing attacks
-            return hmac.compare_digest(signature, expected_signature)
+            self._sync_active_key()
+            # HMAC over canonical JSON, compared in constant time
+            return self.request_signer.verify(request_data, signature)
             
         except Exception as e:
             logger.error("Signature validation failed", error=str(e))
             return False
 
-    def _create_canonical_request(self, request_data: Dict[str, Any]) -> str:
-        """Create canonical request string for signature generation"""
-        # Sort keys for consistent signature
-        sorted_items = sorted(request_data.items())
-        canonical_parts = []
+    async def validate_api_signatures(self, signed_requests: Sequence[Tuple[Dict[str, Any], str]]) -> List[bool]:
+        """Validate a bulk-signed batch (e.g. trade batches), one verdict per request"""
+        try:
+            self._sync_active_key()
+            return self.request_signer.verify_batch(signed_requests)
+            
+        except Exception as e:
+            logger.error("Batch signature validation failed", error=str(e))
+            return [False] * len(signed_requests)
+
+    def sign_request(self, request_data: Dict[str, Any]) -> str:
+        self._sync_active_key()
+        return self.request_signer.sign(request_data)
+
+    def _create_canonical_request(self, request_data: Dict[str, Any]) -> bytes:
+        """Create canonical request bytes for signature generation"""
+        return canonical_request(request_data)
+
+    async def _update_security_performance_metrics(self, processing_time: float):
+        """Accumulate analysis timings locally and flush them to Redis every few seconds"""
+        self._pending_perf_requests += 1
+        self._pending_perf_time += processing_time
         
-        for key, value in sorted_items:
-            if key != 'signature':  # Exclude signature from canonical request
-                canonical_parts.append(f"{key}={str(value)}")
+        now = time.monotonic()
+        if now < self._next_perf_flush:
+            return
+        self._next_perf_flush = now + 5.0
         
-        return "&".join(canonical_parts)
+        requests, total_time = self._pending_perf_requests, self._pending_perf_time
+        self._pending_perf_requests, self._pending_perf_time = 0, 0.0
+        try:
+            async with self.redis_client.pipeline(transaction=False) as pipe:
+                pipe.incrby("security_total_requests", requests)
+                pipe.incrbyfloat("security_total_time", total_time)
+                await pipe.execute()
+        except Exception as e:
+            logger.debug("Security performance metrics flush failed", error=str(e))
 
     async def monitor_security_performance(self) -> Dict[str, Any]:
         """Monitor security system performance impact"""
@@ -492,27 +575,16 @@ class QuantumSecurityManager:
             ip_address = threat_data.get("ip", "unknown")
             confidence = threat_data.get("confidence", 0.5)
             
-            # Update IP reputation
-            reputation_key = f"ip_reputation:{ip_address}"
-            current_score = await self.redis_client.get(reputation_key)
+            # Update IP reputation (weighted, 24h TTL)
+            await self.ip_reputation.record(ip_address, confidence)
             
-            if current_score:
-                # Weighted update
-                new_score = (float(current_score) * 0.8) + (confidence * 0.2)
-            else:
-                new_score = confidence
-            
-            await self.redis_client.setex(reputation_key, 86400, str(new_score))  # 24h TTL
-            
-            # Update threat patterns if confidence is high
-            if confidence > 0.8 and threat_type in self.threat_patterns:
-                pattern = threat_data.get("pattern")
-                if pattern and pattern not in self.threat_patterns[threat_type]:
-                    self.threat_patterns[threat_type].append(pattern)
-                    
-                    # Limit pattern list size for performance
-                    if len(self.threat_patterns[threat_type]) > 50:
-                        self.threat_patterns[threat_type] = self.threat_patterns[threat_type][-40:]
+            # Update threat patterns if confidence is high; every worker picks up the new set
+            pattern = threat_data.get("pattern")
+            if confidence > 0.8 and pattern:
+                try:
+                    await self.threat_patterns.add_pattern(threat_type, pattern)
+                except InvalidPatternError as e:
+                    logger.warning("Rejected threat pattern", threat_type=threat_type, error=str(e))
             
             logger.debug("Threat intelligence updated", threat_type=threat_type, confidence=confidence)
             
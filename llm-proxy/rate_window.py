@@ -0,0 +1,77 @@
+"""
+Sliding-Window Rate Counter
+One Redis round trip per hit: count, increment and verdict in a single Lua script
+"""
+
+import time
+from dataclasses import dataclass
+import structlog
+import redis.asyncio as redis
+
+logger = structlog.get_logger()
+
+# Sliding window approximated from two fixed windows: the previous window's
+# count is weighted by how much of it still overlaps the sliding window.
+# KEYS: current window, previous window
+# ARGV: now_ms, window_ms, limit, cost, count_rejected (1/0)
+SLIDING_WINDOW_SCRIPT = """
+local now = tonumber(ARGV[1])
+local window = tonumber(ARGV[2])
+local limit = tonumber(ARGV[3])
+local cost = tonumber(ARGV[4])
+
+local previous = tonumber(redis.call('GET', KEYS[2]) or '0')
+local current = tonumber(redis.call('GET', KEYS[1]) or '0')
+local overlap = 1 - (now % window) / window
+local estimated = previous * overlap + current
+
+local allowed = estimated + cost <= limit
+if allowed or ARGV[5] == '1' then
+    current = redis.call('INCRBY', KEYS[1], cost)
+    if current == cost then
+        redis.call('PEXPIRE', KEYS[1], window * 2)
+    end
+    estimated = previous * overlap + current
+end
+
+if allowed then
+    return {math.ceil(estimated), 1}
+end
+return {math.ceil(estimated), 0}
+"""
+
+@dataclass
+class RateDecision:
+    """Outcome of one counted hit"""
+    allowed: bool
+    count: int
+    limit: int
+    retry_after: float
+
+class SlidingWindowCounter:
+    """
+    Atomic per-identifier sliding-window counter
+    - count_rejected=False enforces a limit: rejected hits don't extend a block
+    - count_rejected=True observes traffic: every hit counts, the verdict flags excess
+    """
+
+    def __init__(self, redis_client: redis.Redis, name: str, limit: int,
+                 window_seconds: float, count_rejected: bool = False):
+        self.name = name
+        self.limit = limit
+        self.window_ms = int(window_seconds * 1000)
+        self.count_rejected = count_rejected
+        self._script = redis_client.register_script(SLIDING_WINDOW_SCRIPT)
+
+    async def hit(self, identifier: str, cost: int = 1) -> RateDecision:
+        now_ms = int(time.time() * 1000)
+        window_index = now_ms // self.window_ms
+        prefix = f"rate:{self.name}:{identifier}"
+
+        count, allowed = await self._script(
+            keys=[f"{prefix}:{window_index}", f"{prefix}:{window_index - 1}"],
+            args=[now_ms, self.window_ms, self.limit, cost, 1 if self.count_rejected else 0]
+        )
+
+        retry_after = 0.0 if allowed else (self.window_ms - now_ms % self.window_ms) / 1000
+        return RateDecision(allowed=bool(allowed), count=int(count), limit=self.limit, retry_after=retry_after)
@@ -0,0 +1,325 @@
+"""
+Shared Redis Access
+Pooled clients with per-command latency metrics, automatic pipelining of
+commands issued in the same event-loop tick, and tracked client-side caching
+
+Vendored: identical copies live in llm-proxy/, orchestrator/ and server/, since
+each service image copies only its own directory. Change all three together;
+scripts/check-vendored-python.sh (run in CI) fails if they drift.
+"""
+
+import asyncio
+import os
+import time
+from collections import OrderedDict
+from typing import Any, Dict, List, Optional, Sequence, Tuple
+import structlog
+import redis.asyncio as redis
+from redis.asyncio.client import Pipeline
+from redis.exceptions import ResponseError
+from prometheus_client import Counter, Histogram
+
+logger = structlog.get_logger()
+
+_LATENCY_BUCKETS = (0.0005, 0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 1.0)
+
+REDIS_COMMAND_SECONDS = Histogram(
+    'redis_command_seconds', 'Redis command latency as seen by the caller', ['command'],
+    buckets=_LATENCY_BUCKETS
+)
+REDIS_AUTO_PIPELINE_BATCH = Histogram(
+    'redis_auto_pipeline_batch_size', 'Commands sent per automatic pipeline flush',
+    buckets=(1, 2, 4, 8, 16, 32, 64, 128)
+)
+REDIS_CLIENT_CACHE_LOOKUPS = Counter(
+    'redis_client_cache_lookups_total', 'Tracked client-side cache lookups', ['result']
+)
+
+# Single-key, non-blocking commands that are safe to coalesce with other callers'
+AUTO_PIPELINE_COMMANDS = frozenset({
+    "GET", "MGET", "SET", "SETEX", "PSETEX", "DEL", "EXISTS", "EXPIRE", "PEXPIRE", "TTL",
+    "INCR", "INCRBY", "INCRBYFLOAT", "DECR", "HGET", "HSET", "HGETALL", "HINCRBY",
+    "LPUSH", "RPUSH", "LTRIM", "LRANGE", "ZADD", "ZREM", "ZCARD", "ZRANGE",
+    "ZREMRANGEBYRANK", "ZREMRANGEBYSCORE", "PUBLISH", "EVALSHA"
+})
+
+INVALIDATE_CHANNEL = "__redis__:invalidate"
+
+def _command_name(args: Sequence[Any]) -> str:
+    name = args[0]
+    if isinstance(name, bytes):
+        name = name.decode()
+    return name.upper()
+
+class InstrumentedPipeline(Pipeline):
+    """Pipeline whose round trip is recorded as one PIPELINE command"""
+
+    async def execute(self, raise_on_error: bool = True) -> List[Any]:
+        started = time.perf_counter()
+        try:
+            return await super().execute(raise_on_error=raise_on_error)
+        finally:
+            REDIS_COMMAND_SECONDS.labels(command="PIPELINE").observe(time.perf_counter() - started)
+
+class InstrumentedRedis(redis.Redis):
+    """
+    Redis client with latency metrics and automatic pipelining
+    - Allow-listed commands issued by concurrent coroutines in one loop tick
+      are sent as a single non-transactional pipeline
+    - A lone command skips the pipeline and goes straight out
+    """
+
+    def __init__(self, *args, auto_pipeline: bool = False, **kwargs):
+        super().__init__(*args, **kwargs)
+        self.auto_pipeline = auto_pipeline
+        self.client_cache: Optional["ClientSideCache"] = None
+        self._pending: List[Tuple[tuple, Dict[str, Any], asyncio.Future]] = []
+        self._flush_task: Optional[asyncio.Future] = None
+
+    async def execute_command(self, *args, **options):
+        command = _command_name(args)
+        started = time.perf_counter()
+        try:
+            if self.auto_pipeline and command in AUTO_PIPELINE_COMMANDS:
+                future = asyncio.get_running_loop().create_future()
+                self._pending.append((args, options, future))
+                if self._flush_task is None:
+                    self._flush_task = asyncio.ensure_future(self._flush())
+                return await future
+            return await super().execute_command(*args, **options)
+        finally:
+            REDIS_COMMAND_SECONDS.labels(command=command).observe(time.perf_counter() - started)
+
+    async def _flush(self):
+        # Runs one loop iteration after the first enqueue, so every caller
+        # that was ready in that iteration has had the chance to join
+        batch, self._pending = self._pending, []
+        self._flush_task = None
+        REDIS_AUTO_PIPELINE_BATCH.observe(len(batch))
+
+        try:
+            if len(batch) == 1:
+                args, options, future = batch[0]
+                results = [await super().execute_command(*args, **options)]
+            else:
+                pipe = self.pipeline(transaction=False)
+                for args, options, _ in batch:
+                    pipe.execute_command(*args, **options)
+                results = await pipe.execute(raise_on_error=False)
+        except BaseException as e:
+            for _, _, future in batch:
+                if not future.done():
+                    future.set_exception(e if isinstance(e, Exception) else ConnectionError("Redis flush cancelled"))
+            if not isinstance(e, Exception):
+                raise
+            return
+
+        for (_, _, future), result in zip(batch, results):
+            if future.done():  # Caller was cancelled
+                continue
+            if isinstance(result, Exception):
+                future.set_exception(result)
+            else:
+                future.set_result(result)
+
+    def pipeline(self, transaction: bool = True, shard_hint: Any = None) -> InstrumentedPipeline:
+        return InstrumentedPipeline(self.connection_pool, self.response_callbacks, transaction, shard_hint)
+
+    async def cached_get(self, key: str) -> Any:
+        """GET through the tracked local cache when the key is under a tracked prefix"""
+        if self.client_cache is not None:
+            return await self.client_cache.get(key)
+        return await self.get(key)
+
+    def start_client_cache(self):
+        if self.client_cache is not None:
+            self.client_cache.start()
+
+    async def stop_client_cache(self):
+        if self.client_cache is not None:
+            await self.client_cache.stop()
+
+class ClientSideCache:
+    """
+    Local copies of hot keys, kept coherent by Redis server-assisted tracking
+    - One connection enables broadcast tracking for the configured prefixes and
+      redirects invalidations to a second, subscribed connection
+    - A write by any client evicts the key here; if the invalidation stream
+      breaks, the cache is dropped and bypassed until tracking is re-established
+    - Entries also expire after max_ttl as a backstop
+    """
+
+    def __init__(self, client: redis.Redis, prefixes: Sequence[str],
+                 max_entries: int = 10000, max_ttl: float = 300.0):
+        self.client = client
+        self.prefixes = tuple(prefixes)
+        self.max_entries = max_entries
+        self.max_ttl = max_ttl
+        self.active = False
+        self._entries: "OrderedDict[str, Tuple[float, Any]]" = OrderedDict()
+        self._pending: Dict[str, object] = {}
+        self._task: Optional[asyncio.Task] = None
+
+    def tracks(self, key: str) -> bool:
+        return key.startswith(self.prefixes)
+
+    async def get(self, key: str) -> Any:
+        if not self.active or not self.tracks(key):
+            REDIS_CLIENT_CACHE_LOOKUPS.labels(result="bypass").inc()
+            return await self.client.get(key)
+
+        entry = self._entries.get(key)
+        if entry is not None and entry[0] > time.monotonic():
+            self._entries.move_to_end(key)
+            REDIS_CLIENT_CACHE_LOOKUPS.labels(result="hit").inc()
+            return entry[1]
+
+        REDIS_CLIENT_CACHE_LOOKUPS.labels(result="miss").inc()
+        # An invalidation that lands while the GET is in flight drops the token,
+        # so a value that is already stale never gets stored
+        token = object()
+        self._pending[key] = token
+        value = await self.client.get(key)
+        if self._pending.get(key) is token:
+            del self._pending[key]
+            if self.active:
+                self._store(key, value)
+        return value
+
+    def _store(self, key: str, value: Any):
+        self._entries[key] = (time.monotonic() + self.max_ttl, value)
+        self._entries.move_to_end(key)
+        while len(self._entries) > self.max_entries:
+            self._entries.popitem(last=False)
+
+    def _invalidate(self, keys: Optional[Sequence[Any]]):
+        if keys is None:  # FLUSHDB/FLUSHALL or tracking table overflow
+            self._entries.clear()
+            self._pending.clear()
+            return
+        for key in keys:
+            key = key.decode() if isinstance(key, bytes) else key
+            self._entries.pop(key, None)
+            self._pending.pop(key, None)
+
+    def _reset(self):
+        self.active = False
+        self._invalidate(None)
+
+    async def _track(self):
+        pool = self.client.connection_pool
+        # Dedicated connections outside the pool: tracking lives and dies with them
+        kwargs = dict(pool.connection_kwargs, socket_timeout=None, health_check_interval=0)
+        listener = pool.connection_class(**kwargs)
+        tracker = pool.connection_class(**kwargs)
+        try:
+            await listener.connect()
+            await tracker.connect()
+
+            await listener.send_command("CLIENT", "ID")
+            listener_id = await listener.read_response()
+            await listener.send_command("SUBSCRIBE", INVALIDATE_CHANNEL)
+            await listener.read_response()
+
+            tracking = ["CLIENT", "TRACKING", "ON", "REDIRECT", listener_id, "BCAST"]
+            for prefix in self.prefixes:
+                tracking += ["PREFIX", prefix]
+            await tracker.send_command(*tracking)
+            await tracker.read_response()
+
+            self.active = True
+            logger.info("Redis client-side caching active", prefixes=list(self.prefixes))
+
+            async def keep_tracker_alive():
+                # The server stops tracking if this connection is dropped as idle
+                while True:
+                    await asyncio.sleep(30)
+                    await tracker.send_command("PING")
+                    await tracker.read_response()
+
+            keepalive = asyncio.create_task(keep_tracker_alive())
+            try:
+                while True:
+                    message = await listener.read_response()
+                    if keepalive.done():
+                        keepalive.result()  # Surface the tracker's failure
+                    if isinstance(message, list) and len(message) == 3:
+                        self._invalidate(message[2])
+            finally:
+                keepalive.cancel()
+        finally:
+            self._reset()
+            await listener.disconnect()
+            await tracker.disconnect()
+
+    async def _run(self):
+        while True:
+            try:
+                await self._track()
+            except asyncio.CancelledError:
+                raise
+            except ResponseError as e:
+                # Server without CLIENT TRACKING (Redis < 6); plain GETs from here on
+                logger.warning("Redis client-side caching unavailable", error=str(e))
+                return
+            except Exception as e:
+                logger.warning("Redis invalidation stream lost, bypassing local cache", error=str(e))
+            await asyncio.sleep(5)
+
+    def start(self):
+        if self._task is None:
+            self._task = asyncio.create_task(self._run())
+
+    async def stop(self):
+        if self._task is not None:
+            self._task.cancel()
+            self._task = None
+        self._reset()
+
+def _env_flag(name: str, default: str) -> bool:
+    return os.getenv(name, default).lower() in ("1", "true", "yes")
+
+def create_redis_client(url: Optional[str] = None, decode_responses: bool = False,
+                        max_connections: Optional[int] = None,
+                        tracked_prefixes: Sequence[str] = (),
+                        auto_pipeline: Optional[bool] = None) -> InstrumentedRedis:
+    """
+    Build the process-wide client; every component of a service should share it
+    - REDIS_MAX_CONNECTIONS bounds the pool; callers wait for a free connection
+      instead of failing when it is exhausted
+    - REDIS_AUTO_PIPELINE=0 turns automatic pipelining off
+    - tracked_prefixes (or REDIS_TRACKED_PREFIXES, comma-separated) are served
+      from the local cache; call start_client_cache() once the loop is running
+    """
+    pool = redis.BlockingConnectionPool.from_url(
+        url or os.getenv("REDIS_URL", "redis://localhost:6379"),
+        max_connections=max_connections or int(os.getenv("REDIS_MAX_CONNECTIONS", "64")),
+        timeout=float(os.getenv("REDIS_POOL_TIMEOUT", "5")),
+        decode_responses=decode_responses,
+        socket_timeout=float(os.getenv("REDIS_SOCKET_TIMEOUT", "5")),
+        socket_connect_timeout=float(os.getenv("REDIS_CONNECT_TIMEOUT", "2")),
+        socket_keepalive=True,
+        health_check_interval=30,
+        retry_on_timeout=True
+    )
+    client = InstrumentedRedis(
+        connection_pool=pool,
+        auto_pipeline=_env_flag("REDIS_AUTO_PIPELINE", "1") if auto_pipeline is None else auto_pipeline
+    )
+    client.auto_close_connection_pool = True  # The pool is ours; close it with the client
+
+    configured = os.getenv("REDIS_TRACKED_PREFIXES")
+    if configured is not None:
+        tracked_prefixes = [prefix for prefix in configured.split(",") if prefix]
+    if tracked_prefixes:
+        client.client_cache = ClientSideCache(
+            client, tracked_prefixes,
+            max_entries=int(os.getenv("REDIS_CLIENT_CACHE_SIZE", "10000"))
+        )
+    return client
+
+async def cached_get(client: redis.Redis, key: str) -> Any:
+    """cached_get on clients from create_redis_client, a plain GET on any other client"""
+    if isinstance(client, InstrumentedRedis):
+        return await client.cached_get(key)
+    return await client.get(key)
@@ -0,0 +1,202 @@
+"""
+Priority Request Scheduler
+Weighted fair queueing of provider calls across request priority classes
+"""
+
+import asyncio
+import os
+import time
+from collections import deque
+from contextlib import asynccontextmanager
+from dataclasses import dataclass, field
+from enum import Enum
+from typing import Callable, Deque, Dict, Optional
+import structlog
+from prometheus_client import Gauge, Histogram
+
+logger = structlog.get_logger()
+
+SCHEDULER_QUEUE_WAIT = Histogram(
+    'scheduler_queue_wait_seconds', 'Time waiting for a provider dispatch slot', ['priority']
+)
+SCHEDULER_QUEUE_DEPTH = Gauge('scheduler_queue_depth', 'Requests waiting per priority class', ['priority'])
+REQUEST_LATENCY_BY_PRIORITY = Histogram(
+    'llm_proxy_request_latency_by_priority_seconds', 'End-to-end request latency per priority class', ['priority']
+)
+
+class RequestPriority(str, Enum):
+    INTERACTIVE = "interactive"
+    TRADING = "trading"
+    BATCH = "batch"
+    BACKGROUND = "background"
+
+# Share of dispatch slots each class receives under contention
+DEFAULT_PRIORITY_WEIGHTS = {
+    RequestPriority.TRADING: 8.0,
+    RequestPriority.INTERACTIVE: 6.0,
+    RequestPriority.BATCH: 2.0,
+    RequestPriority.BACKGROUND: 1.0
+}
+
+# Classes that yield when rate-limit budgets are tight
+DEFERRABLE_PRIORITIES = {RequestPriority.BATCH, RequestPriority.BACKGROUND}
+
+def priority_for_task(task_type: str) -> RequestPriority:
+    """Default priority when a caller does not set one explicitly"""
+    if task_type == "trading_analysis":
+        return RequestPriority.TRADING
+    return RequestPriority.INTERACTIVE
+
+class SchedulerDeadlineExceeded(Exception):
+    """Raised when a queued request is not dispatched before its deadline"""
+
+    def __init__(self, priority: RequestPriority):
+        super().__init__(f"No dispatch slot for {priority.value} request before deadline")
+        self.priority = priority
+
+@dataclass(order=True)
+class _QueuedRequest:
+    virtual_finish: float
+    sequence: int
+    future: asyncio.Future = field(compare=False)
+    priority: RequestPriority = field(compare=False)
+    enqueued_at: float = field(compare=False, default_factory=time.monotonic)
+
+class WeightedFairScheduler:
+    """
+    Start-time fair queueing in front of LLMClient
+    - Each class advances its own virtual clock by 1/weight per request
+    - The request with the smallest virtual finish time is dispatched next
+    - Under pressure, deferrable classes are held to a reduced share of capacity
+      so trading and interactive traffic is never stuck behind them
+    """
+
+    def __init__(self, max_concurrency: Optional[int] = None,
+                 weights: Optional[Dict[RequestPriority, float]] = None,
+                 pressure_fn: Optional[Callable[[], bool]] = None,
+                 deferrable_share: float = 0.25):
+        self.max_concurrency = max_concurrency or int(os.getenv("SCHEDULER_MAX_CONCURRENCY", "64"))
+        self.weights = weights or DEFAULT_PRIORITY_WEIGHTS
+        self.pressure_fn = pressure_fn or (lambda: False)
+        self.deferrable_share = deferrable_share
+
+        self.queues: Dict[RequestPriority, Deque[_QueuedRequest]] = {p: deque() for p in RequestPriority}
+        self.last_finish: Dict[RequestPriority, float] = {p: 0.0 for p in RequestPriority}
+        self.virtual_time = 0.0
+        self.in_flight = 0
+        self.deferrable_in_flight = 0
+        self.sequence = 0
+
+    @asynccontextmanager
+    async def slot(self, priority: RequestPriority, deadline: Optional[float] = None):
+        """Wait for a dispatch slot for the given class (deadline is time.monotonic())"""
+        await self._acquire(priority, deadline)
+        try:
+            yield
+        finally:
+            self._release(priority)
+
+    def _can_dispatch(self, priority: RequestPriority) -> bool:
+        if self.in_flight >= self.max_concurrency:
+            return False
+        if priority in DEFERRABLE_PRIORITIES and self.pressure_fn():
+            return self.deferrable_in_flight < max(1, int(self.max_concurrency * self.deferrable_share))
+        return True
+
+    def _queued_count(self) -> int:
+        return sum(len(queue) for queue in self.queues.values())
+
+    async def _acquire(self, priority: RequestPriority, deadline: Optional[float]):
+        if self._queued_count() == 0 and self._can_dispatch(priority):
+            self._admit(priority)
+            SCHEDULER_QUEUE_WAIT.labels(priority=priority.value).observe(0.0)
+            return
+
+        start = max(self.virtual_time, self.last_finish[priority])
+        finish = start + 1.0 / self.weights.get(priority, 1.0)
+        self.last_finish[priority] = finish
+        self.sequence += 1
+
+        entry = _QueuedRequest(
+            virtual_finish=finish,
+            sequence=self.sequence,
+            future=asyncio.get_running_loop().create_future(),
+            priority=priority
+        )
+        self.queues[priority].append(entry)
+        SCHEDULER_QUEUE_DEPTH.labels(priority=priority.value).set(len(self.queues[priority]))
+        self._dispatch()
+
+        timeout = None if deadline is None else max(0.0, deadline - time.monotonic())
+        try:
+            await asyncio.wait_for(entry.future, timeout)
+        except asyncio.TimeoutError:
+            self._return_granted(entry)
+            raise SchedulerDeadlineExceeded(priority)
+        except asyncio.CancelledError:
+            self._return_granted(entry)
+            raise
+        finally:
+            if entry in self.queues[priority]:
+                self.queues[priority].remove(entry)
+            SCHEDULER_QUEUE_DEPTH.labels(priority=priority.value).set(len(self.queues[priority]))
+
+        SCHEDULER_QUEUE_WAIT.labels(priority=priority.value).observe(time.monotonic() - entry.enqueued_at)
+
+    def _return_granted(self, entry: "_QueuedRequest"):
+        # The slot may have been granted just as the wait ended; give it back
+        if entry.future.done() and not entry.future.cancelled():
+            self._release(entry.priority)
+
+    def _admit(self, priority: RequestPriority):
+        self.in_flight += 1
+        if priority in DEFERRABLE_PRIORITIES:
+            self.deferrable_in_flight += 1
+
+    def _release(self, priority: RequestPriority):
+        self.in_flight -= 1
+        if priority in DEFERRABLE_PRIORITIES:
+            self.deferrable_in_flight -= 1
+        self._dispatch()
+
+    def _dispatch(self):
+        """Hand free slots to the eligible queued requests with the smallest finish time"""
+        while self.in_flight < self.max_concurrency:
+            candidates = [
+                queue[0] for priority, queue in self.queues.items()
+                if queue and self._can_dispatch(priority)
+            ]
+            if not candidates:
+                return
+
+            entry = min(candidates)
+            self.queues[entry.priority].popleft()
+            SCHEDULER_QUEUE_DEPTH.labels(priority=entry.priority.value).set(len(self.queues[entry.priority]))
+
+            if entry.future.done():
+                continue
+
+            self.virtual_time = max(self.virtual_time, entry.virtual_finish - 1.0 / self.weights.get(entry.priority, 1.0))
+            self._admit(entry.priority)
+            entry.future.set_result(None)
+
+    def requests_ahead(self, priority: RequestPriority) -> float:
+        """
+        Dispatches expected before a new request of this class gets a slot
+        Other classes only get ahead in proportion to their weight
+        """
+        own_queue = len(self.queues[priority])
+        weight = self.weights.get(priority, 1.0)
+        ahead = float(own_queue)
+        for other, queue in self.queues.items():
+            if other is not priority and queue:
+                ahead += min(len(queue), (own_queue + 1) * self.weights.get(other, 1.0) / weight)
+        # When every slot is busy, one has to free up before anything moves
+        return ahead + max(0, self.in_flight - self.max_concurrency + 1)
+
+    def snapshot(self) -> Dict[str, int]:
+        return {
+            "in_flight": self.in_flight,
+            "deferrable_in_flight": self.deferrable_in_flight,
+            **{f"queued_{p.value}": len(q) for p, q in self.queues.items()}
+        }
@@ -0,0 +1,50 @@
+"""
+Request Signing
+HMAC-SHA256 over canonical JSON, with the keyed state prepared once per key
+"""
+
+import hashlib
+import hmac
+from typing import Any, Dict, List, Sequence, Tuple
+
+from serialization import canonical_json
+
+SIGNATURE_FIELD = "signature"
+
+def canonical_request(request_data: Dict[str, Any]) -> bytes:
+    """Sorted, compact JSON of the request without its signature; stable for nested values"""
+    if SIGNATURE_FIELD in request_data:
+        request_data = {key: value for key, value in request_data.items() if key != SIGNATURE_FIELD}
+    return canonical_json(request_data)
+
+class RequestSigner:
+    """
+    Signs and verifies requests with one key
+    - The key is absorbed into an HMAC state once; each message copies that state
+    - Comparisons are constant time
+    """
+
+    def __init__(self, key: bytes):
+        self._keyed = hmac.new(key, digestmod=hashlib.sha256)
+
+    def _digest(self, message: bytes) -> str:
+        mac = self._keyed.copy()
+        mac.update(message)
+        return mac.hexdigest()
+
+    def sign(self, request_data: Dict[str, Any]) -> str:
+        return self._digest(canonical_request(request_data))
+
+    def verify(self, request_data: Dict[str, Any], signature: str) -> bool:
+        return isinstance(signature, str) and hmac.compare_digest(signature, self.sign(request_data))
+
+    def sign_batch(self, requests: Sequence[Dict[str, Any]]) -> List[str]:
+        return [self._digest(canonical_request(request_data)) for request_data in requests]
+
+    def verify_batch(self, signed: Sequence[Tuple[Dict[str, Any], str]]) -> List[bool]:
+        """Verdict per (request, signature) pair; one bad entry does not fail the rest"""
+        return [
+            isinstance(signature, str)
+            and hmac.compare_digest(signature, self._digest(canonical_request(request_data)))
+            for request_data, signature in signed
+        ]
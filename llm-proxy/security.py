@@ -3,30 +3,77 @@ Security Manager with VibeCoding Principles
 Lightweight security utilities for LLM proxy
 """
 
-import secrets
-import hashlib
-import time
-from typing import Dict, Any, Optional
+import asyncio
+import os
+from typing import Dict, Any, List, Optional, Sequence, Tuple
 from datetime import datetime
 import structlog
+import redis.asyncio as redis
+from prometheus_client import Counter
+
+from ip_reputation import IPReputationStore
+from rate_window import RateDecision, SlidingWindowCounter
+from request_ids import RequestIdGenerator
+from threat_patterns import STATE_TOPIC as THREAT_PATTERNS_TOPIC, ThreatPatternIndex
 
 logger = structlog.get_logger()
 
+THREAT_PATTERN_MATCHES = Counter(
+    'security_threat_pattern_matches_total', 'Prompts matching a threat pattern', ['threat_type', 'action']
+)
+
 class SecurityManager:
     """Security manager implementing VibeCoding reliability standards"""
     
-    def __init__(self, vibecoding_core=None):
+    def __init__(self, vibecoding_core=None, redis_client: Optional[redis.Redis] = None):
         self.vibecoding_core = vibecoding_core
-        self.request_counter = 0
+        self.request_ids = RequestIdGenerator()
+        
+        # Opt-in per-IP limit shared across workers through Redis (requests per window);
+        # off by default, so no extra round trip per request unless SECURITY_RATE_LIMIT is set
+        self.rate_limit = int(os.getenv("SECURITY_RATE_LIMIT", "0"))
+        self.rate_window_seconds = float(os.getenv("SECURITY_RATE_WINDOW_SECONDS", "60"))
+        self.rate_counter = None
+        if redis_client is not None and self.rate_limit > 0:
+            self.rate_counter = SlidingWindowCounter(
+                redis_client, "client", self.rate_limit, self.rate_window_seconds
+            )
+        
+        # Known-bad client IPs, answered from an in-memory filter once synced
+        self.ip_reputation = IPReputationStore(redis_client) if redis_client is not None else None
+        
+        # Built-in plus learned threat patterns; matches are counted, and only the
+        # types in SECURITY_BLOCKING_THREAT_TYPES reject the request
+        self.threat_patterns = ThreatPatternIndex(redis_client) if redis_client is not None else None
+        self.blocking_threat_types = frozenset(
+            threat_type for threat_type in os.getenv("SECURITY_BLOCKING_THREAT_TYPES", "").split(",") if threat_type
+        )
+        # Longest text screened per message; request fields are capped at 50k already
+        self.screen_max_chars = int(os.getenv("SECURITY_SCREEN_MAX_CHARS", "50000"))
+
+    async def start(self, state_bus=None):
+        """
+        Load learned patterns, follow other workers' updates and start background syncs
+        Call once the event loop is running, before state_bus.start()
+        """
+        if self.threat_patterns is not None:
+            if state_bus is not None:
+                self.threat_patterns.state_bus = state_bus
+                state_bus.subscribe(THREAT_PATTERNS_TOPIC, self.threat_patterns.reload)
+            try:
+                await self.threat_patterns.reload({})
+            except Exception as e:
+                logger.warning("Learned threat patterns unavailable, using built-ins", error=str(e))
+        if self.ip_reputation is not None:
+            self.ip_reputation.start()
+
+    async def stop(self):
+        if self.ip_reputation is not None:
+            await self.ip_reputation.stop()
 
     def generate_request_id(self) -> str:
-        """Generate secure request ID with Pizza Kitchen reliability"""
-        timestamp = int(time.time() * 1000)  # Millisecond precision
-        random_part = secrets.token_hex(8)
-        self.request_counter += 1
-        
-        id_string = f"{timestamp}_{self.request_counter}_{random_part}"
-        return hashlib.sha256(id_string.encode()).hexdigest()[:16]
+        """Generate a unique, time-ordered request ID with Pizza Kitchen reliability"""
+        return self.request_ids.next_id()
 
     def validate_request_structure(self, request_data: Dict[str, Any]) -> bool:
         """Validate basic request structure with VibeCoding standards"""
@@ -49,10 +96,74 @@ class SecurityManager:
             return False
 
     async def check_rate_limits(self, client_ip: str) -> bool:
-        """Basic rate limit check"""
-        # This would integrate with Redis in full implementation
-        # For now, return True (allow all requests)
-        return True
+        """Sliding-window rate limit per client IP, shared across workers through Redis"""
+        decision = await self.rate_limit_decision(client_ip)
+        return decision is None or decision.allowed
+
+    async def rate_limit_decision(self, client_ip: str) -> Optional[RateDecision]:
+        """
+        Count one request and return the verdict with its retry delay
+        None when limiting is disabled or Redis is unavailable (fail open)
+        """
+        if self.rate_counter is None:
+            return None
+        try:
+            decision = await self.rate_counter.hit(client_ip)
+        except Exception as e:
+            logger.warning("Rate limit check failed, allowing request", error=str(e))
+            return None
+        
+        if not decision.allowed:
+            logger.info("Client rate limited", client_ip=client_ip,
+                        count=decision.count, limit=decision.limit)
+        return decision
+
+    async def is_known_bad_ip(self, client_ip: str) -> bool:
+        """Reputation screen; fails open when Redis is unavailable"""
+        if self.ip_reputation is None:
+            return False
+        try:
+            return await self.ip_reputation.is_known_bad(client_ip)
+        except Exception as e:
+            logger.debug("IP reputation lookup failed", error=str(e))
+            return False
+
+    async def screen_prompt(self, prompt: str, history: Sequence[str] = ()) -> List[Tuple[str, str]]:
+        """
+        Threat pattern matches in the prompt or history that should block the request
+        - Skipped entirely unless some threat type is configured to block
+        - Runs in a thread with each text capped at screen_max_chars, so a
+          pathological prompt can't stall the event loop
+        """
+        if self.threat_patterns is None or not self.blocking_threat_types:
+            return []
+        texts = [text[:self.screen_max_chars].lower() for text in (prompt, *history)]
+        return await asyncio.to_thread(self._screen_texts, texts)
+
+    def _screen_texts(self, texts: List[str]) -> List[Tuple[str, str]]:
+        matches = {}
+        for text in texts:
+            for threat_type, pattern in self.threat_patterns.match(text):
+                matches.setdefault(threat_type, pattern)
+
+        blocking = []
+        for threat_type, pattern in matches.items():
+            block = threat_type in self.blocking_threat_types
+            THREAT_PATTERN_MATCHES.labels(threat_type=threat_type, action="block" if block else "observe").inc()
+            if block:
+                blocking.append((threat_type, pattern))
+        return blocking
+
+    async def report_threat(self, client_ip: Optional[str], threat_type: str, confidence: float,
+                            pattern: Optional[str] = None) -> Dict[str, Any]:
+        """Fold external threat intelligence into reputation scores and learned patterns"""
+        result: Dict[str, Any] = {"pattern_added": False}
+        if self.ip_reputation is not None and client_ip:
+            result["reputation_score"] = await self.ip_reputation.record(client_ip, confidence)
+        if self.threat_patterns is not None and pattern and confidence > 0.8:
+            # Every worker recompiles on the version announcement
+            result["pattern_added"] = await self.threat_patterns.add_pattern(threat_type, pattern)
+        return result
 
     def sanitize_log_data(self, data: Dict[str, Any]) -> Dict[str, Any]:
         """Sanitize data for logging - remove sensitive information"""
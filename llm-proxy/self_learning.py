@@ -4,21 +4,29 @@ Continuously improves performance and decision-making quality
 """
 
 import asyncio
+import os
+import statistics
 import time
-import json
-import numpy as np
 from typing import Dict, List, Optional, Any, Tuple
 from dataclasses import dataclass, asdict
 from datetime import datetime, timedelta
 import structlog
 import redis.asyncio as redis
-from sklearn.linear_model import LinearRegression
-from sklearn.ensemble import RandomForestRegressor
-from sklearn.metrics import mean_squared_error
-import joblib
+from prometheus_client import Counter
+
+from serialization import record_serializer
+from startup_timing import lazy_import
 
 logger = structlog.get_logger()
 
+LEARNING_METRICS = Counter('self_learning_improvements', 'Self-learning improvements', ['category', 'improvement_type'])
+
+def _mean(values: List[float]) -> float:
+    """Mean without pulling in numpy; NaN for empty input, as np.mean gives"""
+    return statistics.fmean(values) if values else float("nan")
+
+LEARNING_MODEL_NAMES = ("response_quality", "timing_optimization", "user_satisfaction", "vibecoding_optimization")
+
 @dataclass
 class LearningInsight:
     """Learning insight from interaction analysis"""
@@ -39,6 +47,9 @@ class LearningResult:
     performance_impact: float
     success_rate: float
 
+# Bulk-loaded interactions waiting for the learning cycle, oldest first
+BACKFILL_INTERACTIONS_KEY = "vibecoding_interactions_backfill"
+
 class SelfLearningEngine:
     """
     Self-learning engine that embodies VibeCoding principles
@@ -51,6 +62,10 @@ class SelfLearningEngine:
         self.learning_models = {}
         self.improvement_history = []
         self.wisdom_accumulation = {}
+        # Bulk backfills get their own queue, so they never displace live traffic;
+        # each learning cycle takes the next backfill_window of them
+        self.backfill_limit = int(os.getenv("LEARNING_BACKFILL_MAX", "100000"))
+        self.backfill_window = int(os.getenv("LEARNING_BACKFILL_WINDOW", "1000"))
         
         # Learning parameters aligned with VibeCoding principles
         self.learning_config = {
@@ -75,13 +90,19 @@ class SelfLearningEngine:
                 "metrics": ["ethical_alignment", "long_term_thinking", "prudence"]
             }
         }
-        
-        # Initialize learning models
-        self._initialize_learning_models()
 
     def _initialize_learning_models(self):
-        """Initialize ML models for different aspects of learning"""
+        """
+        Initialize ML models for different aspects of learning
+        Deferred until training so serving workers never import sklearn
+        Models stay local to the worker that trains them; nothing is shared as a pickle
+        """
+        if self.learning_models:
+            return
         try:
+            LinearRegression = lazy_import("sklearn.linear_model").LinearRegression
+            RandomForestRegressor = lazy_import("sklearn.ensemble").RandomForestRegressor
+            
             # Model for response quality prediction
             self.learning_models["response_quality"] = RandomForestRegressor(
                 n_estimators=100,
@@ -106,6 +127,9 @@ class SelfLearningEngine:
             
             logger.info("Self-learning models initialized with VibeCoding consciousness")
             
+        except ImportError as e:
+            # Slim serving image; install requirements-learning.txt to train models
+            logger.debug("Learning models unavailable", error=str(e))
         except Exception as e:
             logger.error("Learning model initialization failed", error=str(e))
 
@@ -296,7 +320,7 @@ class SelfLearningEngine:
         ]
         
         # High synergy when all domains perform well together
-        cross_insights["synergy_score"] = min(domain_scores) * 0.3 + np.mean(domain_scores) * 0.7
+        cross_insights["synergy_score"] = min(domain_scores) * 0.3 + _mean(domain_scores) * 0.7
         
         # Identify integration opportunities
         if cross_insights["synergy_score"] > 0.8:
@@ -305,7 +329,7 @@ class SelfLearningEngine:
             )
         else:
             # Identify which domains need better integration
-            avg_score = np.mean(domain_scores)
+            avg_score = _mean(domain_scores)
             domain_names = ["pizza_kitchen", "rhythm_gaming", "vrchat_social", "classical_philosophy"]
             
             for i, score in enumerate(domain_scores):
@@ -460,17 +484,27 @@ class SelfLearningEngine:
         try:
             interactions = []
             
-            # Get from Redis cache
-            cached_interactions = await self.redis_client.lrange("vibecoding_interactions", 0, 99)
+            # Get from Redis cache, plus the next window of bulk-loaded history
+            async with self.redis_client.pipeline(transaction=False) as pipe:
+                pipe.lrange("vibecoding_interactions", 0, 99)
+                pipe.lpop(BACKFILL_INTERACTIONS_KEY, self.backfill_window)
+                cached_interactions, backfilled = await pipe.execute()
             
             for interaction_json in cached_interactions:
                 try:
-                    interaction = json.loads(interaction_json)
+                    interaction = record_serializer.loads(interaction_json)
                     interactions.append(interaction)
-                except json.JSONDecodeError:
+                except ValueError:
+                    continue
+            interactions = interactions[-50:]  # Last 50 interactions
+            
+            for interaction_json in backfilled or []:
+                try:
+                    interactions.append(record_serializer.loads(interaction_json))
+                except ValueError:
                     continue
             
-            return interactions[-50:]  # Last 50 interactions
+            return interactions
             
         except Exception as e:
             logger.debug("Failed to get recent interactions", error=str(e))
@@ -502,8 +536,8 @@ class SelfLearningEngine:
             
             # Calculate trends
             if len(patterns["response_quality_trends"]) >= 10:
-                recent_quality = np.mean(patterns["response_quality_trends"][-10:])
-                earlier_quality = np.mean(patterns["response_quality_trends"][-20:-10])
+                recent_quality = _mean(patterns["response_quality_trends"][-10:])
+                earlier_quality = _mean(patterns["response_quality_trends"][-20:-10])
                 patterns["quality_trend"] = recent_quality - earlier_quality
             
             return patterns
@@ -543,7 +577,7 @@ class SelfLearningEngine:
             # Timing optimization insights
             timing_patterns = patterns.get("timing_patterns", [])
             if timing_patterns:
-                avg_timing = np.mean(timing_patterns)
+                avg_timing = _mean(timing_patterns)
                 if avg_timing > 3.0:  # More than 3 seconds
                     insights.append(LearningInsight(
                         insight_type="timing_optimization",
@@ -617,7 +651,9 @@ class SelfLearningEngine:
         """Get current learning system status"""
         try:
             return {
-                "models_trained": len(self.learning_models),
+                # Models are created lazily by the first training cycle and fitted later
+                "models_configured": len(LEARNING_MODEL_NAMES),
+                "models_trained": sum(hasattr(model, "n_features_in_") for model in self.learning_models.values()),
                 "improvements_applied": len(self.improvement_history),
                 "wisdom_domains": len(self.wisdom_accumulation),
                 "learning_active": True,
@@ -671,7 +707,7 @@ class SelfLearningEngine:
 
     async def _update_learning_models(self, interactions: List[Dict[str, Any]]):
         """Update ML models with new interaction data"""
-        pass
+        self._initialize_learning_models()
 
     async def _accumulate_wisdom(self, patterns: Dict[str, Any], insights: List[LearningInsight]):
         """Accumulate wisdom from successful patterns"""
@@ -693,6 +729,22 @@ class SelfLearningEngine:
 
     async def process_explicit_learning(self, learning_data: Dict[str, Any]) -> LearningResult:
         """Process explicit learning session"""
+        return self._explicit_learning_result(learning_data)
+
+    async def process_explicit_learning_batch(self, records: List[Dict[str, Any]]) -> List[LearningResult]:
+        """Process many explicit learning records in one call (bulk backfills)"""
+        results = [self._explicit_learning_result(learning_data) for learning_data in records]
+        
+        # Same counters as /v1/vibecoding/learn, updated once per category per batch
+        categories: Dict[str, int] = {}
+        for learning_data in records:
+            category = learning_data.get("category", "general")
+            categories[category] = categories.get(category, 0) + 1
+        for category, count in categories.items():
+            LEARNING_METRICS.labels(category=category, improvement_type="explicit").inc(count)
+        return results
+
+    def _explicit_learning_result(self, learning_data: Dict[str, Any]) -> LearningResult:
         try:
             improvements = []
             vibecoding_integration = {}
@@ -750,7 +802,7 @@ class SelfLearningEngine:
                 "timestamp": datetime.now().isoformat()
             }
             
-            await self.redis_client.lpush("filter_events", json.dumps(filter_data))
+            await self.redis_client.lpush("filter_events", record_serializer.dumps(filter_data))
             await self.redis_client.ltrim("filter_events", 0, 999)  # Keep last 1000
             
         except Exception as e:
@@ -766,7 +818,7 @@ class SelfLearningEngine:
                 "learning_opportunity": True
             }
             
-            await self.redis_client.lpush("error_learning", json.dumps(error_data))
+            await self.redis_client.lpush("error_learning", record_serializer.dumps(error_data))
             await self.redis_client.ltrim("error_learning", 0, 499)  # Keep last 500
             
         except Exception as e:
@@ -776,8 +828,28 @@ class SelfLearningEngine:
         """Update learning models with new interaction data"""
         try:
             # Store interaction for batch learning
-            await self.redis_client.lpush("model_training_data", json.dumps(interaction_data))
+            await self.redis_client.lpush("model_training_data", record_serializer.dumps(interaction_data))
             await self.redis_client.ltrim("model_training_data", 0, 9999)  # Keep last 10k
             
         except Exception as e:
-            logger.debug("Learning model update failed", error=str(e))
\ No newline at end of file
+            logger.debug("Learning model update failed", error=str(e))
+
+    async def ingest_interactions(self, interactions: List[Dict[str, Any]]) -> int:
+        """
+        Backfill historical interactions in one round trip
+        - Queued on their own list, so live traffic is never trimmed away; the
+          learning cycle consumes the queue a window at a time, oldest first
+        - Over backfill_limit the oldest queued records are dropped, so the
+          latest upload always survives
+        - Returns how many of these interactions are still queued
+        """
+        if not interactions:
+            return 0
+        encoded = [record_serializer.dumps(interaction) for interaction in interactions]
+        async with self.redis_client.pipeline(transaction=False) as pipe:
+            pipe.rpush(BACKFILL_INTERACTIONS_KEY, *encoded)
+            pipe.ltrim(BACKFILL_INTERACTIONS_KEY, -self.backfill_limit, -1)
+            await pipe.execute()
+        
+        # The newest records are at the tail, so only a batch larger than the cap loses any
+        return min(len(encoded), self.backfill_limit)
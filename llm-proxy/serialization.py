@@ -0,0 +1,93 @@
+"""
+Fast Serialization for Responses and Redis Records
+orjson for JSON, optional msgpack for compact Redis records, stdlib json as a fallback
+"""
+
+import json
+import os
+from datetime import date, datetime
+from enum import Enum
+from typing import Any, Union
+import structlog
+
+try:
+    import orjson
+except ImportError:  # pragma: no cover - orjson is in requirements, but keep the proxy bootable
+    orjson = None
+
+try:
+    import msgpack
+except ImportError:
+    msgpack = None
+
+logger = structlog.get_logger()
+
+# Leading bytes of a JSON document; anything else is treated as msgpack
+_JSON_LEADING_BYTES = frozenset(b'{["-0123456789tfn')
+
+def _fallback_default(value: Any) -> Any:
+    """Mirror the json.dumps(default=str) behaviour the stores relied on"""
+    if isinstance(value, (datetime, date)):
+        return value.isoformat()
+    if isinstance(value, Enum):
+        return value.value
+    if isinstance(value, (set, frozenset)):
+        return list(value)
+    return str(value)
+
+def dumps_json(value: Any) -> bytes:
+    """Serialize to compact JSON bytes"""
+    if orjson is not None:
+        return orjson.dumps(
+            value,
+            default=_fallback_default,
+            option=orjson.OPT_NON_STR_KEYS | orjson.OPT_SERIALIZE_NUMPY
+        )
+    return json.dumps(value, default=_fallback_default, separators=(",", ":")).encode()
+
+def canonical_json(value: Any) -> bytes:
+    """Deterministic JSON bytes (sorted keys, compact, UTF-8) for signing and hashing"""
+    if orjson is not None:
+        return orjson.dumps(
+            value,
+            default=_fallback_default,
+            option=orjson.OPT_SORT_KEYS | orjson.OPT_NON_STR_KEYS
+        )
+    return json.dumps(
+        value, default=_fallback_default, sort_keys=True, separators=(",", ":"), ensure_ascii=False
+    ).encode()
+
+def loads_json(data: Union[bytes, bytearray, memoryview, str]) -> Any:
+    if orjson is not None:
+        return orjson.loads(data)
+    if isinstance(data, (bytes, bytearray, memoryview)):
+        data = bytes(data).decode()
+    return json.loads(data)
+
+class RecordSerializer:
+    """
+    Serializer for records stored in Redis
+    Writes the configured format and reads both JSON and msgpack, so switching
+    formats never strands records written before the switch
+    """
+
+    def __init__(self, record_format: str = "json"):
+        if record_format == "msgpack" and msgpack is None:
+            logger.warning("msgpack not installed, storing Redis records as JSON")
+            record_format = "json"
+        self.record_format = record_format
+
+    def dumps(self, value: Any) -> bytes:
+        if self.record_format == "msgpack":
+            return msgpack.packb(value, default=_fallback_default, use_bin_type=True)
+        return dumps_json(value)
+
+    def loads(self, data: Union[bytes, bytearray, memoryview, str]) -> Any:
+        if isinstance(data, str):
+            return loads_json(data)
+        if data and data[0] not in _JSON_LEADING_BYTES and msgpack is not None:
+            return msgpack.unpackb(data, raw=False)
+        return loads_json(data)
+
+# Shared instance used by the stores; REDIS_RECORD_FORMAT=msgpack for smaller records
+record_serializer = RecordSerializer(os.getenv("REDIS_RECORD_FORMAT", "json"))
@@ -0,0 +1,149 @@
+"""
+Cross-Worker Shared State
+Redis leader election for background loops and pub/sub invalidation across workers
+"""
+
+import asyncio
+import os
+import secrets
+import socket
+from typing import Awaitable, Callable, Dict, List, Optional, Any
+import structlog
+import redis.asyncio as redis
+
+from serialization import dumps_json, loads_json
+
+logger = structlog.get_logger()
+
+# Renew only if we still hold the lock, so a stalled worker can't extend someone else's lease
+RENEW_LOCK_SCRIPT = """
+if redis.call('get', KEYS[1]) == ARGV[1] then
+    return redis.call('pexpire', KEYS[1], ARGV[2])
+end
+return 0
+"""
+
+RELEASE_LOCK_SCRIPT = """
+if redis.call('get', KEYS[1]) == ARGV[1] then
+    return redis.call('del', KEYS[1])
+end
+return 0
+"""
+
+def generate_worker_id() -> str:
+    """Unique identity for this worker process"""
+    return f"{socket.gethostname()}:{os.getpid()}:{secrets.token_hex(4)}"
+
+class LeaderElection:
+    """
+    Lease-based leader election on a Redis key
+    Exactly one worker holds the lease; it is renewed at a third of its TTL
+    """
+
+    def __init__(self, redis_client: redis.Redis, name: str, worker_id: str, ttl_seconds: float = 30.0):
+        self.redis_client = redis_client
+        self.lock_key = f"leader:{name}"
+        self.worker_id = worker_id
+        self.ttl_ms = int(ttl_seconds * 1000)
+        self.is_leader = False
+        self._task: Optional[asyncio.Task] = None
+
+    async def _try_acquire_or_renew(self) -> bool:
+        if self.is_leader:
+            renewed = await self.redis_client.eval(RENEW_LOCK_SCRIPT, 1, self.lock_key, self.worker_id, self.ttl_ms)
+            return bool(renewed)
+        acquired = await self.redis_client.set(self.lock_key, self.worker_id, nx=True, px=self.ttl_ms)
+        return bool(acquired)
+
+    async def _run(self):
+        while True:
+            try:
+                was_leader = self.is_leader
+                self.is_leader = await self._try_acquire_or_renew()
+                if self.is_leader != was_leader:
+                    logger.info("Leadership changed", lock=self.lock_key,
+                                worker_id=self.worker_id, leader=self.is_leader)
+            except Exception as e:
+                # Without Redis we can't prove leadership; stand down rather than double-run
+                if self.is_leader:
+                    logger.warning("Leadership renewal failed, standing down", error=str(e))
+                self.is_leader = False
+            await asyncio.sleep(self.ttl_ms / 3000)
+
+    def start(self):
+        if self._task is None:
+            self._task = asyncio.create_task(self._run())
+
+    async def stop(self):
+        if self._task is not None:
+            self._task.cancel()
+            self._task = None
+        if self.is_leader:
+            try:
+                await self.redis_client.eval(RELEASE_LOCK_SCRIPT, 1, self.lock_key, self.worker_id)
+            except Exception as e:
+                logger.debug("Leadership release failed", error=str(e))
+            self.is_leader = False
+
+class SharedStateBus:
+    """
+    Pub/sub invalidation channel between workers
+    Messages carry a topic and the publishing worker; handlers reload state from Redis
+    """
+
+    def __init__(self, redis_client: redis.Redis, worker_id: str, channel: str = "llm_proxy:shared_state"):
+        self.redis_client = redis_client
+        self.worker_id = worker_id
+        self.channel = channel
+        self.handlers: Dict[str, List[Callable[[Dict[str, Any]], Awaitable[None]]]] = {}
+        self._task: Optional[asyncio.Task] = None
+
+    def subscribe(self, topic: str, handler: Callable[[Dict[str, Any]], Awaitable[None]]):
+        self.handlers.setdefault(topic, []).append(handler)
+
+    async def publish(self, topic: str, data: Optional[Dict[str, Any]] = None):
+        try:
+            message = dumps_json({"topic": topic, "origin": self.worker_id, "data": data or {}})
+            await self.redis_client.publish(self.channel, message)
+        except Exception as e:
+            logger.debug("Shared state publish failed", topic=topic, error=str(e))
+
+    async def _listen(self):
+        while True:
+            pubsub = self.redis_client.pubsub()
+            try:
+                await pubsub.subscribe(self.channel)
+                async for message in pubsub.listen():
+                    if message.get("type") != "message":
+                        continue
+                    await self._dispatch(message["data"])
+            except asyncio.CancelledError:
+                await pubsub.close()
+                raise
+            except Exception as e:
+                logger.warning("Shared state subscription lost, reconnecting", error=str(e))
+                await pubsub.close()
+                await asyncio.sleep(1)
+
+    async def _dispatch(self, raw: Any):
+        try:
+            message = loads_json(raw)
+        except (TypeError, ValueError):
+            return
+        if message.get("origin") == self.worker_id:
+            return  # Our own update is already applied locally
+
+        for handler in self.handlers.get(message.get("topic"), []):
+            try:
+                await handler(message.get("data", {}))
+            except Exception as e:
+                logger.error("Shared state handler failed", topic=message.get("topic"), error=str(e))
+
+    def start(self):
+        if self._task is None:
+            self._task = asyncio.create_task(self._listen())
+
+    async def stop(self):
+        if self._task is not None:
+            self._task.cancel()
+            self._task = None
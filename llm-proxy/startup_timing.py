@@ -0,0 +1,66 @@
+"""
+Startup Timing
+Records startup phases and deferred heavy imports so cold-start cost is visible in /health
+"""
+
+import importlib
+import sys
+import time
+from contextlib import contextmanager
+from types import ModuleType
+from typing import Any, Dict
+import structlog
+from prometheus_client import Gauge
+
+logger = structlog.get_logger()
+
+IMPORT_SECONDS = Gauge('llm_proxy_deferred_import_seconds', 'Time taken by deferred module imports', ['module'])
+STARTUP_PHASE_SECONDS = Gauge('llm_proxy_startup_phase_seconds', 'Time taken by each startup phase', ['phase'])
+
+# Packages worth reporting as loaded or not; the slim image should keep most of these out
+HEAVY_MODULES = (
+    "numpy", "sklearn", "joblib", "torch", "transformers",
+    "pandas", "matplotlib", "cryptography", "yappi", "opentelemetry"
+)
+
+_import_times: Dict[str, float] = {}
+_startup_phases: Dict[str, float] = {}
+
+def lazy_import(name: str) -> ModuleType:
+    """Import a heavy module on first use and record how long it took"""
+    module = sys.modules.get(name)
+    if module is not None:
+        return module
+
+    start = time.perf_counter()
+    module = importlib.import_module(name)
+    elapsed = time.perf_counter() - start
+
+    _import_times[name] = elapsed
+    IMPORT_SECONDS.labels(module=name).set(elapsed)
+    logger.info("Deferred import loaded", module=name, seconds=round(elapsed, 3))
+    return module
+
+def record_startup_phase(name: str, seconds: float):
+    _startup_phases[name] = seconds
+    STARTUP_PHASE_SECONDS.labels(phase=name).set(seconds)
+
+@contextmanager
+def startup_phase(name: str):
+    start = time.perf_counter()
+    try:
+        yield
+    finally:
+        record_startup_phase(name, time.perf_counter() - start)
+
+def startup_report() -> Dict[str, Any]:
+    """
+    Startup phases, deferred imports paid so far and which heavy packages are loaded
+    For a full per-module breakdown run the worker under `python -X importtime`
+    """
+    return {
+        "startup_phases_ms": {name: round(seconds * 1000, 1) for name, seconds in _startup_phases.items()},
+        "deferred_imports_ms": {name: round(seconds * 1000, 1) for name, seconds in _import_times.items()},
+        "heavy_modules_loaded": [name for name in HEAVY_MODULES if name in sys.modules],
+        "modules_loaded": len(sys.modules)
+    }
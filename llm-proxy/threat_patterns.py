@@ -0,0 +1,201 @@
+"""
+Compiled Threat Pattern Index
+One combined regex per threat type, rebuilt off the event loop and swapped atomically
+"""
+
+import asyncio
+import re
+import time
+from dataclasses import dataclass
+from typing import Any, Callable, Dict, List, Mapping, Optional, Pattern, Sequence, Tuple
+import structlog
+import redis.asyncio as redis
+
+logger = structlog.get_logger()
+
+VERSION_KEY = "threat_patterns:version"
+LEARNED_KEY_PREFIX = "threat_patterns:learned:"
+STATE_TOPIC = "threat_patterns"
+
+# Gaps are bounded (.{0,100}, not .*): an unbounded gap backtracks quadratically
+# on long prompts that repeat the first keyword without the second
+DEFAULT_THREAT_PATTERNS: Dict[str, List[str]] = {
+    "injection_attacks": [
+        r"';.{0,100}--",
+        r"union.{0,100}select",
+        r"<script[^>]{0,100}>",
+        r"javascript:",
+        r"eval\s*\(",
+        r"exec\s*\("
+    ],
+    "data_exfiltration": [
+        r"\.{2,}/",
+        r"file://",
+        r"ftp://",
+        r"\.\./.{0,100}passwd",
+        r"SELECT.{0,100}FROM.{0,100}information_schema"
+    ],
+    "rate_limit_abuse": [
+        # Detected via behavior analysis, not patterns
+    ],
+    "credential_stuffing": [
+        # Credential pairs such as admin:admin, not prose mentioning the words twice
+        r"\badmin\s*[:/]\s*admin\b",
+        r"\btest\s*[:/]\s*test\b",
+        r"password.{0,20}123"
+    ]
+}
+
+# Numbered or named backreferences and named groups would change meaning inside
+# the combined alternation, so those patterns are compiled on their own
+_STANDALONE = re.compile(r"\\\d|\(\?P[=<]")
+
+class InvalidPatternError(ValueError):
+    """Raised when a pattern from threat intelligence does not compile"""
+
+def validate_pattern(pattern: str):
+    try:
+        re.compile(pattern, re.IGNORECASE)
+    except re.error as e:
+        raise InvalidPatternError(f"Invalid threat pattern {pattern!r}: {e}")
+
+# A compiled regex and the index of the pattern it stands for; None marks the
+# combined alternation, where the matching group's name carries the index
+CompiledEntry = Tuple[Pattern, Optional[int]]
+
+def _compile_type(patterns: Sequence[str]) -> Tuple[CompiledEntry, ...]:
+    """
+    Combined alternation with one named group per pattern, so a single scan
+    reports which pattern hit. Patterns that can't be combined (backreferences,
+    their own group names) are compiled on their own.
+    """
+    standalone = [index for index, pattern in enumerate(patterns) if _STANDALONE.search(pattern)]
+    combinable = [index for index in range(len(patterns)) if index not in standalone]
+    entries: List[CompiledEntry] = []
+    if len(combinable) > 1:
+        combined = "|".join(f"(?P<p{index}>{patterns[index]})" for index in combinable)
+        try:
+            entries.append((re.compile(combined, re.IGNORECASE), None))
+        except re.error:
+            standalone = list(range(len(patterns)))
+    elif combinable:
+        standalone = sorted(standalone + combinable)
+    entries.extend((re.compile(patterns[index], re.IGNORECASE), index) for index in standalone)
+    return tuple(entries)
+
+@dataclass(frozen=True)
+class CompiledPatternSet:
+    """Immutable snapshot of every threat type's patterns and their compiled form"""
+    version: int
+    patterns: Mapping[str, Tuple[str, ...]]
+    compiled: Mapping[str, Tuple[CompiledEntry, ...]]
+
+    @classmethod
+    def build(cls, version: int, patterns: Mapping[str, Sequence[str]]) -> "CompiledPatternSet":
+        frozen = {threat_type: tuple(items) for threat_type, items in patterns.items()}
+        compiled = {threat_type: _compile_type(items) for threat_type, items in frozen.items() if items}
+        return cls(version=version, patterns=frozen, compiled=compiled)
+
+    def match(self, text: str) -> List[Tuple[str, str]]:
+        """(threat_type, pattern) for the first matching pattern of each type"""
+        matches = []
+        for threat_type, entries in self.compiled.items():
+            patterns = self.patterns[threat_type]
+            for compiled, index in entries:
+                found = compiled.search(text)
+                if found:
+                    index = int(found.lastgroup[1:]) if index is None else index
+                    matches.append((threat_type, patterns[index]))
+                    break  # One match per type sufficient
+        return matches
+
+class ThreatPatternIndex:
+    """
+    Versioned pattern index shared by every worker
+    - Built-in patterns plus learned ones, which live in Redis sorted sets
+    - Rebuilds compile in a thread; the new set replaces the old in one assignment
+    - Version bumps are announced on the shared state bus so other workers reload
+    """
+
+    def __init__(self, redis_client: redis.Redis,
+                 defaults: Optional[Mapping[str, Sequence[str]]] = None,
+                 max_learned: int = 50, keep_learned: int = 40):
+        self.redis_client = redis_client
+        self.defaults = {threat_type: list(items) for threat_type, items in (defaults or DEFAULT_THREAT_PATTERNS).items()}
+        self.max_learned = max_learned
+        self.keep_learned = keep_learned
+        self.state_bus = None  # Optional SharedStateBus for cross-worker pattern updates
+        self.on_swap: Optional[Callable[[CompiledPatternSet], None]] = None
+        self.current = CompiledPatternSet.build(0, self.defaults)
+        self._rebuild_lock = asyncio.Lock()
+
+    @property
+    def version(self) -> int:
+        return self.current.version
+
+    def match(self, text: str) -> List[Tuple[str, str]]:
+        return self.current.match(text)
+
+    def _swap(self, compiled: CompiledPatternSet):
+        previous = self.current.version
+        self.current = compiled
+        logger.info("Threat patterns swapped", previous_version=previous, version=compiled.version,
+                    patterns=sum(len(items) for items in compiled.patterns.values()))
+        if self.on_swap:
+            self.on_swap(compiled)
+
+    async def add_pattern(self, threat_type: str, pattern: str) -> bool:
+        """Record a learned pattern for every worker; False if it is already known"""
+        if threat_type not in self.defaults:
+            return False
+        if pattern in self.current.patterns.get(threat_type, ()):
+            return False
+        validate_pattern(pattern)
+
+        key = f"{LEARNED_KEY_PREFIX}{threat_type}"
+        async with self.redis_client.pipeline(transaction=True) as pipe:
+            pipe.zadd(key, {pattern: time.time()}, nx=True)
+            pipe.zcard(key)
+            pipe.incr(VERSION_KEY)
+            added, size, version = await pipe.execute()
+        if not added:
+            return False
+        if size > self.max_learned:
+            # Oldest learned patterns go first
+            await self.redis_client.zremrangebyrank(key, 0, size - self.keep_learned - 1)
+
+        await self.reload({"version": version})
+        if self.state_bus:
+            await self.state_bus.publish(STATE_TOPIC, {"version": version})
+        return True
+
+    async def reload(self, data: Dict[str, Any]):
+        """Fetch learned patterns and swap in a freshly compiled set if it is newer"""
+        announced = int(data.get("version", 0))
+        if announced and announced <= self.current.version:
+            return
+
+        async with self._rebuild_lock:
+            threat_types = list(self.defaults)
+            async with self.redis_client.pipeline(transaction=True) as pipe:
+                pipe.get(VERSION_KEY)
+                for threat_type in threat_types:
+                    pipe.zrange(f"{LEARNED_KEY_PREFIX}{threat_type}", 0, -1)
+                version_raw, *learned = await pipe.execute()
+
+            version = int(version_raw or 0)
+            if version <= self.current.version:
+                return
+
+            patterns = {}
+            for threat_type, members in zip(threat_types, learned):
+                combined = list(self.defaults[threat_type])
+                for member in members:
+                    pattern = member.decode() if isinstance(member, bytes) else member
+                    if pattern not in combined:
+                        combined.append(pattern)
+                patterns[threat_type] = combined
+
+            compiled = await asyncio.to_thread(CompiledPatternSet.build, version, patterns)
+            if compiled.version > self.current.version:
+                self._swap(compiled)
@@ -0,0 +1,106 @@
+"""
+Tool Calling
+Provider-neutral tool definitions and calls, plus a server-side executor that
+runs a model's independent tool calls concurrently
+"""
+
+import asyncio
+import os
+import time
+from dataclasses import dataclass, field
+from typing import Any, Awaitable, Callable, Dict, List, Optional, Sequence
+import structlog
+from prometheus_client import Counter, Histogram
+
+from serialization import dumps_json
+
+logger = structlog.get_logger()
+
+TOOL_CALLS = Counter(
+    'tool_calls_total', 'Tool calls returned by providers', ['tool', 'outcome']
+)
+TOOL_CALL_SECONDS = Histogram(
+    'tool_call_seconds', 'Server-side tool execution time', ['tool']
+)
+TOOL_ROUNDS = Histogram(
+    'tool_rounds_per_request', 'Provider round trips spent on server-side tool calls',
+    buckets=(0, 1, 2, 3, 4, 6, 8)
+)
+
+TOOL_CHOICES = ("auto", "none", "required")
+
+ToolHandler = Callable[[Dict[str, Any]], Awaitable[Any]]
+
+@dataclass
+class ToolDefinition:
+    """A tool the model may call; parameters is a JSON Schema object"""
+    name: str
+    description: str = ""
+    parameters: Dict[str, Any] = field(default_factory=lambda: {"type": "object", "properties": {}})
+
+@dataclass
+class ToolCall:
+    """Normalized tool call; arguments is the raw string when the model sent invalid JSON"""
+    id: str
+    name: str
+    arguments: Any
+
+    def to_dict(self) -> Dict[str, Any]:
+        return {"id": self.id, "name": self.name, "arguments": self.arguments}
+
+@dataclass
+class ToolResult:
+    """Outcome of one server-side tool call, in the form sent back to the model"""
+    call_id: str
+    name: str
+    content: str
+    is_error: bool = False
+
+class ToolExecutor:
+    """
+    Server-side tool handlers, keyed by tool name
+    - A round runs only if every requested tool is registered; otherwise the
+      calls go back to the client untouched
+    - Calls in one round are independent by construction (the model issued them
+      together), so they run concurrently, bounded by max_concurrency
+    - Handler failures and timeouts become error results the model can see
+    """
+
+    def __init__(self, max_concurrency: Optional[int] = None, timeout: Optional[float] = None,
+                 max_rounds: Optional[int] = None):
+        self.handlers: Dict[str, ToolHandler] = {}
+        self.timeout = timeout or float(os.getenv("TOOL_CALL_TIMEOUT_SECONDS", "10"))
+        self.max_rounds = max_rounds or int(os.getenv("TOOL_MAX_ROUNDS", "4"))
+        self._semaphore = asyncio.Semaphore(max_concurrency or int(os.getenv("TOOL_MAX_CONCURRENCY", "8")))
+
+    def register(self, name: str, handler: ToolHandler):
+        self.handlers[name] = handler
+
+    def handles(self, calls: Sequence[ToolCall]) -> bool:
+        return bool(calls) and all(call.name in self.handlers for call in calls)
+
+    async def run(self, calls: Sequence[ToolCall]) -> List[ToolResult]:
+        return list(await asyncio.gather(*(self._run_one(call) for call in calls)))
+
+    async def _run_one(self, call: ToolCall) -> ToolResult:
+        if not isinstance(call.arguments, dict):
+            TOOL_CALLS.labels(tool=call.name, outcome="invalid_arguments").inc()
+            return ToolResult(call.id, call.name, "Arguments must be a JSON object", is_error=True)
+
+        started = time.perf_counter()
+        try:
+            async with self._semaphore:
+                output = await asyncio.wait_for(self.handlers[call.name](call.arguments), timeout=self.timeout)
+        except asyncio.TimeoutError:
+            TOOL_CALLS.labels(tool=call.name, outcome="timeout").inc()
+            return ToolResult(call.id, call.name, f"Tool timed out after {self.timeout:g}s", is_error=True)
+        except Exception as e:
+            TOOL_CALLS.labels(tool=call.name, outcome="error").inc()
+            logger.warning("Tool call failed", tool=call.name, error=str(e))
+            return ToolResult(call.id, call.name, f"Tool failed: {e}", is_error=True)
+        finally:
+            TOOL_CALL_SECONDS.labels(tool=call.name).observe(time.perf_counter() - started)
+
+        TOOL_CALLS.labels(tool=call.name, outcome="executed").inc()
+        content = output if isinstance(output, str) else dumps_json(output).decode()
+        return ToolResult(call.id, call.name, content)
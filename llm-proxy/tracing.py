@@ -0,0 +1,120 @@
+"""
+Per-Stage Latency Tracing
+Prometheus histograms per pipeline stage, with optional OpenTelemetry spans
+"""
+
+import os
+import time
+from contextlib import contextmanager
+from contextvars import ContextVar
+from typing import Dict, Optional
+import structlog
+from prometheus_client import Histogram
+
+try:
+    from opentelemetry import trace
+except ImportError:
+    trace = None
+
+logger = structlog.get_logger()
+
+STAGE_DURATION = Histogram(
+    'llm_proxy_stage_duration_seconds', 'Time spent in each request pipeline stage', ['stage'],
+    buckets=(0.0005, 0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0)
+)
+
+# Per-request state set by StageTimingMiddleware
+_request_received_at: ContextVar[Optional[float]] = ContextVar("request_received_at", default=None)
+_stage_timings: ContextVar[Optional[Dict[str, float]]] = ContextVar("stage_timings", default=None)
+# Last stage entered, left set on exit so a cancelled request can report where it stopped
+_last_stage: ContextVar[Optional[str]] = ContextVar("last_stage", default=None)
+
+_tracer = trace.get_tracer("llm-proxy") if trace is not None else None
+
+def configure_tracing():
+    """
+    Install an OTLP exporter when OTEL_EXPORTER_OTLP_ENDPOINT is set
+    Without it spans go to the no-op provider and cost next to nothing
+    """
+    if trace is None or not os.getenv("OTEL_EXPORTER_OTLP_ENDPOINT"):
+        return
+    try:
+        from opentelemetry.sdk.resources import Resource
+        from opentelemetry.sdk.trace import TracerProvider
+        from opentelemetry.sdk.trace.export import BatchSpanProcessor
+        from opentelemetry.exporter.otlp.proto.http.trace_exporter import OTLPSpanExporter
+    except ImportError as e:
+        logger.warning("OpenTelemetry SDK not installed, tracing disabled", error=str(e))
+        return
+
+    provider = TracerProvider(resource=Resource.create({
+        "service.name": os.getenv("OTEL_SERVICE_NAME", "llm-proxy")
+    }))
+    provider.add_span_processor(BatchSpanProcessor(OTLPSpanExporter()))
+    trace.set_tracer_provider(provider)
+    logger.info("OpenTelemetry tracing enabled", endpoint=os.getenv("OTEL_EXPORTER_OTLP_ENDPOINT"))
+
+def record_stage(name: str, duration: float):
+    """Record a stage measured elsewhere"""
+    STAGE_DURATION.labels(stage=name).observe(duration)
+    timings = _stage_timings.get()
+    if timings is not None:
+        timings[name] = timings.get(name, 0.0) + duration
+
+@contextmanager
+def stage(name: str):
+    """Time a pipeline stage; works around awaits since context follows the task"""
+    _last_stage.set(name)
+    start = time.perf_counter()
+    if _tracer is None:
+        try:
+            yield
+        finally:
+            record_stage(name, time.perf_counter() - start)
+        return
+
+    with _tracer.start_as_current_span(name):
+        try:
+            yield
+        finally:
+            record_stage(name, time.perf_counter() - start)
+
+def time_since_received() -> Optional[float]:
+    """Seconds since the middleware saw the request, i.e. parsing, validation and auth"""
+    received_at = _request_received_at.get()
+    return None if received_at is None else time.perf_counter() - received_at
+
+def last_stage() -> Optional[str]:
+    return _last_stage.get()
+
+def stage_timings() -> Dict[str, float]:
+    """Stage durations recorded so far for the current request"""
+    return dict(_stage_timings.get() or {})
+
+class StageTimingMiddleware:
+    """
+    Pure ASGI middleware so the endpoint runs in the same context
+    Starts the request span and the per-request stage timing record
+    """
+
+    def __init__(self, app):
+        self.app = app
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+
+        received_token = _request_received_at.set(time.perf_counter())
+        timings_token = _stage_timings.set({})
+        stage_token = _last_stage.set(None)
+        try:
+            if _tracer is None:
+                await self.app(scope, receive, send)
+            else:
+                with _tracer.start_as_current_span(f"{scope['method']} {scope['path']}"):
+                    await self.app(scope, receive, send)
+        finally:
+            _request_received_at.reset(received_token)
+            _stage_timings.reset(timings_token)
+            _last_stage.reset(stage_token)
@@ -0,0 +1,59 @@
+"""
+In-Process TTL Cache
+Bounded LRU with per-entry expiry and negative entries, used in front of Redis
+"""
+
+import time
+from collections import OrderedDict
+from typing import Any, Callable, Hashable, Optional, Tuple
+
+# Stored for keys known to be absent upstream, so repeated misses skip the round trip
+NEGATIVE = object()
+
+_MISSING = object()
+
+class TTLCache:
+    """
+    LRU cache where every entry also expires
+    - get() refreshes recency; expired entries are dropped lazily on access
+    - When full, the least recently used entry is evicted
+    """
+
+    def __init__(self, max_entries: int = 10000, default_ttl: float = 60.0,
+                 clock: Callable[[], float] = time.monotonic):
+        self.max_entries = max_entries
+        self.default_ttl = default_ttl
+        self.clock = clock
+        self._entries: "OrderedDict[Hashable, Tuple[float, Any]]" = OrderedDict()
+        self.evictions = 0
+
+    def __len__(self) -> int:
+        return len(self._entries)
+
+    def get(self, key: Hashable, default: Any = None) -> Any:
+        """Cached value, NEGATIVE for a cached miss, or default when nothing usable is cached"""
+        entry = self._entries.get(key, _MISSING)
+        if entry is _MISSING:
+            return default
+        expires_at, value = entry
+        if expires_at <= self.clock():
+            del self._entries[key]
+            return default
+        self._entries.move_to_end(key)
+        return value
+
+    def set(self, key: Hashable, value: Any, ttl: Optional[float] = None):
+        self._entries[key] = (self.clock() + (self.default_ttl if ttl is None else ttl), value)
+        self._entries.move_to_end(key)
+        while len(self._entries) > self.max_entries:
+            self._entries.popitem(last=False)
+            self.evictions += 1
+
+    def set_negative(self, key: Hashable, ttl: float):
+        self.set(key, NEGATIVE, ttl)
+
+    def delete(self, key: Hashable):
+        self._entries.pop(key, None)
+
+    def clear(self):
+        self._entries.clear()
@@ -386,6 +386,30 @@ class VibeCodingCore:
         """Cultivate deeper philosophical understanding"""
         await self._cultivate_wisdom()
 
+    def export_shared_state(self) -> Dict[str, Any]:
+        """Snapshot of the evolving consciousness state for other workers"""
+        return {
+            "level": self.consciousness_state.level,
+            "principles": self.consciousness_state.principles,
+            "wisdom_depth": self.consciousness_state.wisdom_depth,
+            "reliability_score": self.consciousness_state.reliability_score,
+            "precision_metrics": self.consciousness_state.precision_metrics,
+            "social_intelligence": self.consciousness_state.social_intelligence,
+            "last_update": self.consciousness_state.last_update.isoformat()
+        }
+
+    def apply_shared_state(self, state: Dict[str, Any]):
+        """Adopt a consciousness snapshot published by the leader worker"""
+        self.consciousness_state = ConsciousnessState(
+            level=state["level"],
+            principles=dict(state["principles"]),
+            wisdom_depth=state["wisdom_depth"],
+            reliability_score=state["reliability_score"],
+            precision_metrics=dict(state["precision_metrics"]),
+            social_intelligence=state["social_intelligence"],
+            last_update=datetime.fromisoformat(state["last_update"])
+        )
+
     def get_principle_weights(self) -> Dict[str, float]:
         """Get current principle weights for scoring"""
         return self.consciousness_state.principles.copy()
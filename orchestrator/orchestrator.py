@@ -12,12 +12,29 @@ from typing import Dict, List, Optional, Any
 from dataclasses import dataclass, asdict
 from datetime import datetime, timedelta
 import structlog
-import redis.asyncio as redis
 from prometheus_client import CollectorRegistry, Gauge, Counter, push_to_gateway
 import httpx
 
+from redis_access import create_redis_client
+
+try:
+    import orjson
+except ImportError:
+    orjson = None
+
 logger = structlog.get_logger()
 
+def _dumps(value: Any) -> bytes:
+    """Compact JSON for Redis records; orjson when available"""
+    if orjson is not None:
+        return orjson.dumps(value, default=str, option=orjson.OPT_NON_STR_KEYS)
+    return json.dumps(value, default=str, separators=(",", ":")).encode()
+
+def _loads(data: Any) -> Any:
+    if orjson is not None:
+        return orjson.loads(data)
+    return json.loads(data)
+
 @dataclass
 class ContainerHealth:
     """Container health assessment"""
@@ -103,7 +120,7 @@ class AutonomousOrchestrator:
         try:
             # Connect to Redis
             redis_url = "redis://agent-redis:6379"
-            self.redis_client = redis.from_url(redis_url, decode_responses=True)
+            self.redis_client = create_redis_client(redis_url, decode_responses=True)
             
             # Test Redis connection
             await self.redis_client.ping()
@@ -113,7 +130,7 @@ class AutonomousOrchestrator:
         except Exception as e:
             logger.error("Orchestrator initialization failed", error=str(e))
             # Use local Redis as fallback
-            self.redis_client = redis.from_url("redis://localhost:6379", decode_responses=True)
+            self.redis_client = create_redis_client("redis://localhost:6379", decode_responses=True)
 
     async def run_orchestration_loop(self):
         """Main orchestration loop"""
@@ -179,7 +196,7 @@ class AutonomousOrchestrator:
                 "timestamp": datetime.now().isoformat()
             }
             
-            await self.redis_client.setex("container_health_summary", 300, json.dumps(health_summary))
+            await self.redis_client.setex("container_health_summary", 300, _dumps(health_summary))
             
         except Exception as e:
             logger.error("Container health monitoring failed", error=str(e))
@@ -382,7 +399,7 @@ class AutonomousOrchestrator:
                 await self.redis_client.setex(
                     "recent_optimizations",
                     3600,
-                    json.dumps([asdict(opt) for opt in optimizations])
+                    _dumps([asdict(opt) for opt in optimizations])
                 )
                 
         except Exception as e:
@@ -539,7 +556,7 @@ class AutonomousOrchestrator:
                 "reason": "high_load"
             }
             
-            await self.redis_client.lpush("scaling_events", json.dumps(scaling_event))
+            await self.redis_client.lpush("scaling_events", _dumps(scaling_event))
             await self.redis_client.ltrim("scaling_events", 0, 99)  # Keep last 100
             
         except Exception as e:
@@ -557,7 +574,7 @@ class AutonomousOrchestrator:
                 "reason": "low_load"
             }
             
-            await self.redis_client.lpush("scaling_events", json.dumps(scaling_event))
+            await self.redis_client.lpush("scaling_events", _dumps(scaling_event))
             await self.redis_client.ltrim("scaling_events", 0, 99)
             
         except Exception as e:
@@ -587,7 +604,7 @@ class AutonomousOrchestrator:
                 "timestamp": datetime.now().isoformat()
             }
             
-            await self.redis_client.setex("system_wisdom", 600, json.dumps(wisdom_assessment))
+            await self.redis_client.setex("system_wisdom", 600, _dumps(wisdom_assessment))
             
         except Exception as e:
             logger.error("System wisdom assessment failed", error=str(e))
@@ -602,7 +619,7 @@ class AutonomousOrchestrator:
                 return 0.8  # Default good score
             
             # Look for oscillating behavior (bad prudence)
-            recent_events = [json.loads(event) for event in scaling_events[:5]]
+            recent_events = [_loads(event) for event in scaling_events[:5]]
             oscillations = 0
             
             for i in range(1, len(recent_events)):
@@ -764,13 +781,13 @@ class AutonomousOrchestrator:
             await self.redis_client.setex(
                 "current_system_metrics",
                 300,
-                json.dumps(asdict(metrics), default=str)
+                _dumps(asdict(metrics))
             )
             
             # Store historical data
             await self.redis_client.lpush(
                 "system_metrics_history",
-                json.dumps(asdict(metrics), default=str)
+                _dumps(asdict(metrics))
             )
             await self.redis_client.ltrim("system_metrics_history", 0, 999)
             
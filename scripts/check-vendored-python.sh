@@ -0,0 +1,33 @@
+#!/bin/bash
+
+# Vendored Python Module Checker
+# Each Python service image copies only its own directory, so shared modules are
+# vendored into every service that uses them. The copies must stay identical:
+# edit one, copy it to the others, and run this script.
+
+set -euo pipefail
+
+cd "$(dirname "$0")/.."
+
+# Each line: the canonical copy, then the copies that must match it
+VENDORED=(
+    "llm-proxy/redis_access.py orchestrator/redis_access.py server/redis_access.py"
+    "llm-proxy/key_management.py solana-bot/key_management.py"
+    "llm-proxy/aead_envelope.py solana-bot/aead_envelope.py"
+)
+
+status=0
+for group in "${VENDORED[@]}"; do
+    read -r canonical copies <<< "$group"
+    for copy in $copies; do
+        if ! cmp -s "$canonical" "$copy"; then
+            echo "❌ $copy differs from $canonical"
+            status=1
+        fi
+    done
+done
+
+if [ "$status" -eq 0 ]; then
+    echo "✅ Vendored Python modules are in sync"
+fi
+exit "$status"
@@ -22,6 +22,8 @@ from pydantic import BaseModel, Field
 import redis.asyncio as redis
 import os
 
+from redis_access import create_redis_client
+
 logger = structlog.get_logger()
 
 # Security bearer token authentication
@@ -80,7 +82,7 @@ async def startup():
     try:
         # Connect to Redis
         redis_url = os.getenv("REDIS_URL", "redis://agent-redis:6379")
-        redis_client = redis.from_url(redis_url, decode_responses=True)
+        redis_client = create_redis_client(redis_url, decode_responses=True)
         await redis_client.ping()
         
         logger.info("Agent Zero Gateway initialized - Master control active")
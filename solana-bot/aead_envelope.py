@@ -0,0 +1,124 @@
+"""
+AES-GCM Envelope Encryption
+Batch encrypt/decrypt into a compact, versioned binary envelope
+
+Vendored: identical copies live in llm-proxy/ and solana-bot/, since each
+service image copies only its own directory. Change both together;
+scripts/check-vendored-python.sh (run in CI) fails if they drift.
+"""
+
+import os
+import struct
+from typing import Dict, List, Sequence, Union
+from cryptography.hazmat.primitives.ciphers.aead import AESGCM
+
+from key_management import KeyManagementError, KeyManager
+
+BytesLike = Union[bytes, bytearray, memoryview]
+
+# Envelope layout (header is authenticated as associated data):
+#   magic "QE" | version u8 | key_id length u8 | key_id | nonce (12) | ciphertext + tag (16)
+ENVELOPE_MAGIC = b"QE"
+ENVELOPE_VERSION = 1
+NONCE_SIZE = 12
+TAG_SIZE = 16
+_PREFIX = struct.Struct(">2sBB")
+
+class EnvelopeError(Exception):
+    """Raised for malformed envelopes or failed authentication"""
+
+class EnvelopeCipher:
+    """
+    AES-256-GCM over the key manager's versions
+    - One AESGCM context per key version, reused for every record
+    - Batches draw all nonces in one call and write all envelopes into one buffer
+    - Decryption reads from memoryviews without copying the input
+    """
+
+    def __init__(self, key_manager: KeyManager):
+        self.key_manager = key_manager
+        self._contexts: Dict[str, AESGCM] = {}
+        self._headers: Dict[str, bytes] = {}
+
+    def _context(self, key_id: str) -> AESGCM:
+        context = self._contexts.get(key_id)
+        if context is None:
+            context = AESGCM(self.key_manager.get(key_id).master_key)
+            self._contexts[key_id] = context
+        return context
+
+    def _header(self, key_id: str) -> bytes:
+        header = self._headers.get(key_id)
+        if header is None:
+            encoded = key_id.encode("ascii")
+            header = _PREFIX.pack(ENVELOPE_MAGIC, ENVELOPE_VERSION, len(encoded)) + encoded
+            self._headers[key_id] = header
+        return header
+
+    def encrypt(self, plaintext: BytesLike) -> bytes:
+        return bytes(self.encrypt_batch([plaintext])[0])
+
+    def decrypt(self, envelope: BytesLike) -> bytes:
+        return self.decrypt_batch([envelope])[0]
+
+    def encrypt_batch(self, plaintexts: Sequence[BytesLike]) -> List[memoryview]:
+        """Encrypt records under the active key; results are views into one shared buffer"""
+        key_id = self.key_manager.active.key_id
+        context = self._context(key_id)
+        header = self._header(key_id)
+        header_size = len(header)
+
+        nonces = memoryview(os.urandom(NONCE_SIZE * len(plaintexts)))
+        sizes = [header_size + NONCE_SIZE + len(plaintext) + TAG_SIZE for plaintext in plaintexts]
+        buffer = bytearray(sum(sizes))
+        view = memoryview(buffer)
+
+        envelopes = []
+        offset = 0
+        for index, plaintext in enumerate(plaintexts):
+            nonce = nonces[index * NONCE_SIZE:(index + 1) * NONCE_SIZE]
+            body_start = offset + header_size + NONCE_SIZE
+            end = offset + sizes[index]
+
+            view[offset:offset + header_size] = header
+            view[offset + header_size:body_start] = nonce
+            view[body_start:end] = context.encrypt(nonce, plaintext, header)
+
+            envelopes.append(view[offset:end])
+            offset = end
+        return envelopes
+
+    def decrypt_batch(self, envelopes: Sequence[BytesLike]) -> List[bytes]:
+        """Decrypt envelopes, each with whichever key version it names"""
+        plaintexts = []
+        for envelope in envelopes:
+            view = memoryview(envelope)
+            if len(view) < _PREFIX.size:
+                raise EnvelopeError("Envelope too short")
+            magic, version, key_id_length = _PREFIX.unpack_from(view)
+            if magic != ENVELOPE_MAGIC:
+                raise EnvelopeError("Not an encryption envelope")
+            if version != ENVELOPE_VERSION:
+                raise EnvelopeError(f"Unsupported envelope version: {version}")
+
+            header_size = _PREFIX.size + key_id_length
+            if len(view) < header_size + NONCE_SIZE + TAG_SIZE:
+                raise EnvelopeError("Envelope truncated")
+            key_id = bytes(view[_PREFIX.size:header_size]).decode("ascii")
+
+            try:
+                context = self._context(key_id)
+                plaintexts.append(context.decrypt(
+                    view[header_size:header_size + NONCE_SIZE],
+                    view[header_size + NONCE_SIZE:],
+                    view[:header_size]
+                ))
+            except KeyManagementError as e:
+                raise EnvelopeError(str(e))
+            except Exception:
+                raise EnvelopeError(f"Envelope failed authentication under key {key_id}")
+        return plaintexts
+
+    @staticmethod
+    def is_envelope(data: BytesLike) -> bool:
+        return len(data) >= _PREFIX.size and bytes(data[:2]) == ENVELOPE_MAGIC
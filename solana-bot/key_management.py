@@ -0,0 +1,279 @@
+"""
+Key Management
+Persisted, versioned key material shared by every worker, with rotation
+
+Vendored: identical copies live in llm-proxy/ and solana-bot/, since each
+service image copies only its own directory. Change both together;
+scripts/check-vendored-python.sh (run in CI) fails if they drift.
+"""
+
+import base64
+import fcntl
+import json
+import os
+import secrets
+import time
+from contextlib import contextmanager
+from dataclasses import dataclass
+from typing import Any, Dict, Optional
+import structlog
+from cryptography.hazmat.primitives import hashes, serialization
+from cryptography.hazmat.primitives.asymmetric import rsa
+from cryptography.hazmat.primitives.ciphers.aead import AESGCM
+from cryptography.hazmat.primitives.kdf.hkdf import HKDF
+
+logger = structlog.get_logger()
+
+KEYSTORE_FORMAT = 1
+
+class KeyManagementError(Exception):
+    """Raised when key material is missing or cannot be unwrapped"""
+
+@dataclass
+class KeyVersion:
+    """One generation of key material"""
+    key_id: str
+    created_at: float
+    master_key: bytes
+    private_key: rsa.RSAPrivateKey
+
+    @property
+    def public_key(self) -> rsa.RSAPublicKey:
+        return self.private_key.public_key()
+
+def _b64(data: bytes) -> str:
+    return base64.b64encode(data).decode()
+
+def _unb64(data: str) -> bytes:
+    return base64.b64decode(data.encode())
+
+class KeyManager:
+    """
+    Versioned keys in a local keystore file, wrapped by a root secret
+    - The root secret comes from KEYSTORE_ROOT_SECRET or an existing root key
+      file, which stands in for a KMS key
+    - KEYSTORE_PATH must name storage every replica shares; replicas with their
+      own keystores would each mint different keys
+    - KEYSTORE_DEV_MODE=1 allows a default path under ./data and a generated
+      local root key, for development only
+    - AES master keys are derived from the root secret and a per-version salt
+      and never written to disk
+    - RSA private keys are generated once per version and stored AES-GCM wrapped
+    - Rotation adds a new active version and keeps older ones for decryption
+    """
+
+    def __init__(self, service: str, keystore_path: Optional[str] = None,
+                 root_secret: Optional[bytes] = None, root_key_path: Optional[str] = None,
+                 rsa_key_size: int = 4096, retained_versions: Optional[int] = None,
+                 reload_interval: float = 30.0, dev_mode: Optional[bool] = None):
+        self.service = service
+        self.dev_mode = (os.getenv("KEYSTORE_DEV_MODE", "").lower() in ("1", "true", "yes")
+                         if dev_mode is None else dev_mode)
+        configured_path = keystore_path or os.getenv("KEYSTORE_PATH")
+        if configured_path is None and not self.dev_mode:
+            raise KeyManagementError(
+                "KEYSTORE_PATH must point at storage shared by every replica (KEYSTORE_DEV_MODE=1 for local use)"
+            )
+        self.keystore_path = configured_path or f"data/{service}_keystore.json"
+        self.root_key_path = root_key_path or os.getenv("KEYSTORE_ROOT_KEY_PATH", f"{self.keystore_path}.root")
+        self.rsa_key_size = rsa_key_size
+        self.retained_versions = retained_versions or int(os.getenv("KEYSTORE_RETAINED_VERSIONS", "3"))
+        self.reload_interval = reload_interval
+
+        env_secret = os.getenv("KEYSTORE_ROOT_SECRET")
+        self._root_secret = root_secret or (env_secret.encode() if env_secret else None)
+
+        self.versions: Dict[str, KeyVersion] = {}
+        self.active_key_id: Optional[str] = None
+        self._loaded_mtime: Optional[float] = None
+        self._next_reload_check = 0.0
+
+    @property
+    def active(self) -> KeyVersion:
+        self.reload_if_changed()
+        if self.active_key_id is None:
+            raise KeyManagementError("Keystore not loaded")
+        return self.versions[self.active_key_id]
+
+    def get(self, key_id: str) -> KeyVersion:
+        """Key version by id, re-reading the keystore once if another worker rotated"""
+        version = self.versions.get(key_id)
+        if version is None and self.reload_if_changed(force=True):
+            version = self.versions.get(key_id)
+        if version is None:
+            raise KeyManagementError(f"Unknown key version: {key_id}")
+        return version
+
+    def load(self) -> "KeyManager":
+        """Load the keystore, creating the first key version if it doesn't exist yet"""
+        start_time = time.time()
+        with self._locked():
+            data = self._read()
+            if data is None or not data.get("keys"):
+                data = {"format": KEYSTORE_FORMAT, "service": self.service, "keys": []}
+                self._add_version(data)
+                self._write(data)
+                logger.info("Keystore created", service=self.service, path=self.keystore_path)
+            self._apply(data)
+
+        logger.info("Key material loaded", service=self.service, active_key_id=self.active_key_id,
+                    versions=len(self.versions), load_ms=round((time.time() - start_time) * 1000, 1))
+        return self
+
+    def rotate(self) -> KeyVersion:
+        """Create a new active key version; older versions stay available for decryption"""
+        with self._locked():
+            # Re-read under the lock so a concurrent rotation elsewhere isn't lost
+            data = self._read() or {"format": KEYSTORE_FORMAT, "service": self.service, "keys": []}
+            self._add_version(data)
+            data["keys"] = data["keys"][-self.retained_versions:]
+            self._write(data)
+            self._apply(data)
+
+        logger.info("Key material rotated", service=self.service, active_key_id=self.active_key_id)
+        return self.versions[self.active_key_id]
+
+    def rotate_if_older_than(self, max_age_seconds: float) -> Optional[KeyVersion]:
+        if time.time() - self.active.created_at < max_age_seconds:
+            return None
+        return self.rotate()
+
+    def reload_if_changed(self, force: bool = False) -> bool:
+        """Pick up rotations made by other workers; checks the file at most every reload_interval"""
+        now = time.monotonic()
+        if not force and now < self._next_reload_check:
+            return False
+        self._next_reload_check = now + self.reload_interval
+
+        try:
+            mtime = os.stat(self.keystore_path).st_mtime
+        except FileNotFoundError:
+            return False
+        if mtime == self._loaded_mtime:
+            return False
+
+        data = self._read()
+        if data:
+            self._apply(data)
+            return True
+        return False
+
+    def _root(self) -> bytes:
+        if self._root_secret is None:
+            try:
+                with open(self.root_key_path, "rb") as f:
+                    self._root_secret = f.read()
+            except FileNotFoundError:
+                if not self.dev_mode:
+                    raise KeyManagementError(
+                        f"No root secret: set KEYSTORE_ROOT_SECRET or provision {self.root_key_path}"
+                    )
+                # Development only: create a local root key on first boot
+                self._root_secret = secrets.token_bytes(32)
+                self._write_private_file(self.root_key_path, self._root_secret)
+                logger.warning("Generated local root key; set KEYSTORE_ROOT_SECRET to manage it externally",
+                               path=self.root_key_path)
+        return self._root_secret
+
+    def _derive(self, salt: bytes, purpose: str, key_id: str) -> bytes:
+        return HKDF(
+            algorithm=hashes.SHA256(),
+            length=32,
+            salt=salt,
+            info=f"{self.service}:{purpose}:{key_id}".encode()
+        ).derive(self._root())
+
+    def _add_version(self, data: Dict[str, Any]):
+        key_id = f"{time.strftime('%Y%m%dT%H%M%SZ', time.gmtime())}-{secrets.token_hex(3)}"
+        salt = secrets.token_bytes(16)
+
+        # The only RSA generation: once per version, not once per process
+        private_key = rsa.generate_private_key(public_exponent=65537, key_size=self.rsa_key_size)
+        private_der = private_key.private_bytes(
+            encoding=serialization.Encoding.DER,
+            format=serialization.PrivateFormat.PKCS8,
+            encryption_algorithm=serialization.NoEncryption()
+        )
+        nonce = secrets.token_bytes(12)
+        wrapped = AESGCM(self._derive(salt, "rsa-wrap", key_id)).encrypt(nonce, private_der, key_id.encode())
+
+        data["keys"].append({
+            "key_id": key_id,
+            "created_at": time.time(),
+            "salt": _b64(salt),
+            "wrapped_private_key": _b64(nonce + wrapped)
+        })
+        data["active_key_id"] = key_id
+
+    def _apply(self, data: Dict[str, Any]):
+        versions = {}
+        for entry in data["keys"]:
+            key_id = entry["key_id"]
+            existing = self.versions.get(key_id)
+            if existing is not None:
+                versions[key_id] = existing
+                continue
+
+            salt = _unb64(entry["salt"])
+            wrapped = _unb64(entry["wrapped_private_key"])
+            try:
+                private_der = AESGCM(self._derive(salt, "rsa-wrap", key_id)).decrypt(
+                    wrapped[:12], wrapped[12:], key_id.encode()
+                )
+            except Exception:
+                raise KeyManagementError(f"Cannot unwrap key {key_id}; wrong root secret?")
+
+            versions[key_id] = KeyVersion(
+                key_id=key_id,
+                created_at=entry["created_at"],
+                master_key=self._derive(salt, "master", key_id),
+                private_key=serialization.load_der_private_key(private_der, password=None)
+            )
+
+        self.versions = versions
+        self.active_key_id = data["active_key_id"]
+        try:
+            self._loaded_mtime = os.stat(self.keystore_path).st_mtime
+        except FileNotFoundError:
+            self._loaded_mtime = None
+
+    def _read(self) -> Optional[Dict[str, Any]]:
+        try:
+            with open(self.keystore_path, "r") as f:
+                data = json.load(f)
+        except FileNotFoundError:
+            return None
+        if data.get("format") != KEYSTORE_FORMAT:
+            raise KeyManagementError(f"Unsupported keystore format: {data.get('format')}")
+        return data
+
+    def _write(self, data: Dict[str, Any]):
+        self._write_private_file(self.keystore_path, json.dumps(data, indent=2).encode())
+
+    @staticmethod
+    def _write_private_file(path: str, content: bytes):
+        """Atomic write readable only by the service user"""
+        directory = os.path.dirname(path)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+        tmp_path = f"{path}.{os.getpid()}.tmp"
+        fd = os.open(tmp_path, os.O_WRONLY | os.O_CREAT | os.O_TRUNC, 0o600)
+        try:
+            os.write(fd, content)
+            os.fsync(fd)
+        finally:
+            os.close(fd)
+        os.replace(tmp_path, path)
+
+    @contextmanager
+    def _locked(self):
+        """Cross-process lock so workers booting together create one keystore, not one each"""
+        directory = os.path.dirname(self.keystore_path)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+        with open(f"{self.keystore_path}.lock", "a") as lock_file:
+            fcntl.flock(lock_file, fcntl.LOCK_EX)
+            try:
+                yield
+            finally:
+                fcntl.flock(lock_file, fcntl.LOCK_UN)
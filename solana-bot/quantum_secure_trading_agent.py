@@ -10,19 +10,22 @@ import json
 import hashlib
 import hmac
 import secrets
-from typing import Dict, List, Optional, Any, Tuple
+from typing import Dict, List, Optional, Any, Sequence, Tuple, Union
 from dataclasses import dataclass, asdict
 from datetime import datetime, timedelta
 import structlog
 import redis.asyncio as redis
 from cryptography.hazmat.primitives import hashes, serialization
 from cryptography.hazmat.primitives.asymmetric import rsa, padding
-from cryptography.hazmat.primitives.ciphers import Cipher, algorithms, modes
+from cryptography.hazmat.primitives.ciphers.aead import AESGCM
 from cryptography.hazmat.backends import default_backend
 import httpx
 import base64
 import os
 
+from aead_envelope import ENVELOPE_VERSION, EnvelopeCipher, EnvelopeError
+from key_management import KeyManager
+
 logger = structlog.get_logger()
 
 @dataclass
@@ -98,26 +101,39 @@ class QuantumSecureTradingAgent:
     def _init_quantum_security(self):
         """Initialize quantum-resistant security components"""
         try:
-            # Generate quantum-resistant key pair
-            self.private_key = rsa.generate_private_key(
-                public_exponent=65537,
-                key_size=4096,  # Quantum-resistant until large-scale quantum computers
-                backend=default_backend()
-            )
-            self.public_key = self.private_key.public_key()
-            
-            # Master encryption key for trading data
-            self.master_encryption_key = secrets.token_bytes(32)  # 256-bit AES key
+            # RSA-4096 key pair and master encryption key come from the persisted
+            # keystore: generated once, shared by every process of this agent
+            self.key_manager = KeyManager("solana_trading_agent").load()
+            self.envelope_cipher = EnvelopeCipher(self.key_manager)
+            self._apply_active_key()
             
             # Session keys rotated regularly
             self.session_keys = {}
             
-            logger.info("Quantum security infrastructure initialized")
+            logger.info("Quantum security infrastructure initialized", key_id=self.key_id)
             
         except Exception as e:
             logger.error("Quantum security initialization failed", error=str(e))
             raise SecurityError("Failed to initialize quantum security")
 
+    def _apply_active_key(self):
+        active = self.key_manager.active
+        self.key_id = active.key_id
+        self.private_key = active.private_key
+        self.public_key = active.public_key
+        self.master_encryption_key = active.master_key
+
+    def _sync_active_key(self):
+        """Follow rotations made by other processes"""
+        if self.key_manager.active.key_id != self.key_id:
+            self._apply_active_key()
+
+    def rotate_keys(self) -> str:
+        """Rotate to a new key version; trading data encrypted earlier still decrypts"""
+        self.key_manager.rotate()
+        self._apply_active_key()
+        return self.key_id
+
     def _generate_agent_zero_key(self) -> bytes:
         """Generate the master key that only Agent Zero possesses"""
         # In production, this would be generated once and securely distributed to Agent Zero
@@ -312,66 +328,53 @@ class QuantumSecureTradingAgent:
     async def quantum_encrypt_trading_data(self, data: str) -> Tuple[str, str]:
         """
         Encrypt trading data with quantum-resistant encryption
-        Returns (encrypted_data, encryption_metadata)
+        Returns (encrypted_data, encryption_metadata); use encrypt_trade_records for binary batches
         """
         try:
-            # Generate random nonce
-            nonce = secrets.token_bytes(12)
-            
-            # Create AES-GCM cipher
-            cipher = Cipher(
-                algorithms.AES(self.master_encryption_key),
-                modes.GCM(nonce),
-                backend=default_backend()
-            )
-            encryptor = cipher.encryptor()
-            
-            # Encrypt data
-            data_bytes = data.encode('utf-8')
-            ciphertext = encryptor.update(data_bytes) + encryptor.finalize()
-            
-            # Package encrypted data
-            encrypted_package = nonce + encryptor.tag + ciphertext
-            encrypted_data = base64.b64encode(encrypted_package).decode()
+            self._sync_active_key()
+            envelope = self.envelope_cipher.encrypt(data.encode('utf-8'))
             
-            # Generate metadata
+            # Algorithm version and key id travel in the authenticated envelope header
             metadata = {
-                "algorithm": "AES-256-GCM",
-                "key_rotation": int(time.time() // 3600),  # Hourly rotation
-                "quantum_secure": True,
-                "timestamp": time.time()
+                "envelope": ENVELOPE_VERSION,
+                "key_id": self.key_id,
+                "quantum_secure": True
             }
             
-            return encrypted_data, json.dumps(metadata)
+            return base64.b64encode(envelope).decode(), json.dumps(metadata, separators=(",", ":"))
             
         except Exception as e:
             logger.error("Quantum encryption failed", error=str(e))
             raise SecurityError("Failed to encrypt trading data")
 
+    def encrypt_trade_records(self, records: Sequence[bytes]) -> List[memoryview]:
+        """Encrypt a batch of trade records into binary envelopes (views into one buffer)"""
+        self._sync_active_key()
+        return self.envelope_cipher.encrypt_batch(records)
+
+    def decrypt_trade_records(self, envelopes: Sequence[Union[bytes, memoryview]]) -> List[bytes]:
+        try:
+            return self.envelope_cipher.decrypt_batch(envelopes)
+        except EnvelopeError as e:
+            logger.error("Trade record decryption failed", error=str(e))
+            raise SecurityError("Failed to decrypt trade records")
+
     async def quantum_decrypt_trading_data(self, encrypted_data: str, metadata: str) -> str:
         """Decrypt quantum-encrypted trading data"""
         try:
-            # Parse metadata
             meta = json.loads(metadata)
-            
-            # Decode encrypted package
             encrypted_package = base64.b64decode(encrypted_data.encode())
             
-            # Extract components
+            if meta.get("envelope"):
+                return self.envelope_cipher.decrypt(encrypted_package).decode('utf-8')
+            
+            # Legacy layout: nonce | tag | ciphertext, from before envelopes
+            key_id = meta.get("key_id")
+            master_key = self.key_manager.get(key_id).master_key if key_id else self.master_encryption_key
             nonce = encrypted_package[:12]
             tag = encrypted_package[12:28]
             ciphertext = encrypted_package[28:]
-            
-            # Create cipher for decryption
-            cipher = Cipher(
-                algorithms.AES(self.master_encryption_key),
-                modes.GCM(nonce, tag),
-                backend=default_backend()
-            )
-            decryptor = cipher.decryptor()
-            
-            # Decrypt
-            plaintext = decryptor.update(ciphertext) + decryptor.finalize()
+            plaintext = AESGCM(master_key).decrypt(nonce, ciphertext + tag, None)
             
             return plaintext.decode('utf-8')
             